@@ -16,6 +16,7 @@ from app.core.database import Base
 from app.models.user import User
 from app.models.workflow import Workflow, WorkflowExecution
 from app.models.ai_agent import AIAgent
+from app.models.ai_usage import AIUsageRollup
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -3,34 +3,66 @@ AI Services endpoints for FlowsyAI Backend
 AI processing and orchestration endpoints
 """
 
+import time
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.deps import get_current_active_user
 from app.models.user import User
 from app.core.logging import get_logger
+from app.services.ai_orchestrator import AIProvider, AIRequest, RequestPriority, orchestrator
+from app.services.ai_analytics import usage_analytics
 
 logger = get_logger(__name__)
 router = APIRouter()
 
 
-# Placeholder endpoints - will be implemented with AI orchestrator
 @router.post("/process")
 async def process_ai_request(
     request_data: Dict[str, Any],
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Process AI request - placeholder for AI orchestrator"""
+    """Process interactive AI request (served ahead of batch traffic)"""
     
     logger.info(f"AI request from user {current_user.email}")
     
+    try:
+        provider = AIProvider(request_data.get("provider", "openai"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Unsupported provider: {request_data.get('provider')}")
+    
+    prompt = request_data.get("prompt")
+    if not prompt:
+        raise HTTPException(status_code=400, detail="Prompt is required")
+    
+    request = AIRequest(
+        provider=provider,
+        model=request_data.get("model", "gpt-3.5-turbo"),
+        prompt=prompt,
+        max_tokens=request_data.get("max_tokens", 1000),
+        temperature=request_data.get("temperature", 0.7),
+        user_id=current_user.id,
+        metadata=request_data.get("metadata", {}),
+        priority=RequestPriority.INTERACTIVE,
+        deadline=time.time() + settings.AI_INTERACTIVE_DEADLINE
+    )
+    
+    response = await orchestrator.process_request(request)
+    if not response.success:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=response.error)
+    
     return {
-        "message": "AI processing endpoint - to be implemented with orchestrator",
-        "user_id": current_user.id,
-        "request_data": request_data
+        "content": response.content,
+        "provider": response.provider,
+        "model": response.model,
+        "tokens_used": response.tokens_used,
+        "processing_time": response.processing_time,
+        "metadata": response.metadata or {}
     }
 
 
@@ -59,5 +91,5 @@ async def get_ai_usage_stats(
         "user_id": current_user.id,
         "api_calls_count": current_user.api_calls_count,
         "subscription_tier": current_user.subscription_tier,
-        "usage_stats": "To be implemented with detailed tracking"
+        "usage_stats": await usage_analytics.get_summary(f"user:{current_user.id}")
     }
@@ -0,0 +1,160 @@
+"""
+Cache value codec for FlowsyAI Backend
+Type-tagged binary encoding of cached values with optional compression
+"""
+
+import json
+import pickle
+import struct
+import zlib
+from typing import Any, Optional, Tuple
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# First byte of every encoded value: format in the low bits, compression flags above.
+# All tags are control bytes, which values written before tagging (JSON or text)
+# never start with in practice; anything else is decoded the legacy way.
+TAG_JSON = 0x01
+TAG_STR = 0x02
+TAG_BYTES = 0x03
+TAG_PICKLE = 0x04
+TAG_ENTRY = 0x05  # Encoded value preceded by compute time and logical expiry (see encode_entry)
+FLAG_ZLIB = 0x08
+FLAG_LZ4 = 0x10
+
+_ENTRY_HEADER = struct.Struct("<dd")
+_FORMAT_MASK = 0x07
+_FLAG_MASK = FLAG_ZLIB | FLAG_LZ4
+
+# Values of other types skip the JSON attempt and go straight to pickle
+_JSON_TYPES = (dict, list, tuple, int, float, bool, type(None))
+
+# Types orjson would otherwise serialize lossily (datetime -> str, dataclass -> dict)
+# are passed through to pickle so they come back as the same type
+_ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS
+    if orjson else 0
+)
+
+
+def _dumps_json(value: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(value, option=_ORJSON_OPTIONS)
+    return json.dumps(value, separators=(",", ":"), allow_nan=False).encode()
+
+
+def _loads_json(data: bytes) -> Any:
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def _compress(body: bytes) -> tuple:
+    if lz4_frame:
+        return lz4_frame.compress(body), FLAG_LZ4
+    return zlib.compress(body, 1), FLAG_ZLIB
+
+
+def encode(value: Any, compress_threshold: Optional[int] = None) -> bytes:
+    """Encode value as a tag byte followed by its payload
+
+    Strings and bytes are stored as-is, JSON-compatible values as JSON
+    (orjson when installed) and anything else is pickled. Payloads of at
+    least compress_threshold bytes are compressed when that makes them
+    smaller.
+    """
+    if isinstance(value, str):
+        tag, body = TAG_STR, value.encode()
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        tag, body = TAG_BYTES, bytes(value)
+    elif type(value) in _JSON_TYPES:
+        try:
+            tag, body = TAG_JSON, _dumps_json(value)
+        except (TypeError, ValueError, OverflowError):
+            # Nested values JSON cannot represent faithfully
+            tag, body = TAG_PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        tag, body = TAG_PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    threshold = settings.CACHE_COMPRESSION_THRESHOLD if compress_threshold is None else compress_threshold
+    if threshold and len(body) >= threshold:
+        compressed, flag = _compress(body)
+        if len(compressed) < len(body):
+            tag, body = tag | flag, compressed
+
+    return bytes((tag,)) + body
+
+
+def _decode_tagged(tag: int, body: bytes) -> Any:
+    if tag & FLAG_LZ4:
+        body = lz4_frame.decompress(body)
+    elif tag & FLAG_ZLIB:
+        body = zlib.decompress(body)
+
+    kind = tag & _FORMAT_MASK
+    if kind == TAG_ENTRY:
+        return decode(body[_ENTRY_HEADER.size:])
+    if kind == TAG_JSON:
+        return _loads_json(body)
+    if kind == TAG_STR:
+        return body.decode()
+    if kind == TAG_BYTES:
+        return body
+    return pickle.loads(body)
+
+
+def decode_legacy(data: bytes) -> Any:
+    """Decode a value written before tagging: JSON, plain text, or a pickle stored as latin1 text"""
+    text = data.decode("utf-8", errors="replace")
+    if text.startswith("\x80"):
+        try:
+            return pickle.loads(text.encode("latin1"))
+        except Exception:
+            return text
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def decode(data: Optional[bytes]) -> Any:
+    """Decode a value produced by encode(), falling back to the legacy formats"""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode()
+
+    tag = data[0] if data else 0
+    if tag & _FORMAT_MASK in (TAG_JSON, TAG_STR, TAG_BYTES, TAG_PICKLE, TAG_ENTRY) and not tag & ~(_FORMAT_MASK | _FLAG_MASK):
+        try:
+            return _decode_tagged(tag, data[1:])
+        except Exception:
+            # A legacy text value that happens to start with a control character
+            pass
+    return decode_legacy(data)
+
+
+def encode_entry(value: Any, compute_time: float, expires_at: float, compress_threshold: Optional[int] = None) -> bytes:
+    """Encode value with the metadata early recomputation needs
+
+    decode() of an entry returns just the value, so plain reads of the key
+    keep working.
+    """
+    return bytes((TAG_ENTRY,)) + _ENTRY_HEADER.pack(compute_time, expires_at) + encode(value, compress_threshold)
+
+
+def decode_entry(data: Optional[bytes]) -> Optional[Tuple[Any, float, float]]:
+    """(value, compute_time, expires_at) of an entry, or None if data is not one"""
+    if not data or data[0] != TAG_ENTRY or len(data) <= 1 + _ENTRY_HEADER.size:
+        return None
+    compute_time, expires_at = _ENTRY_HEADER.unpack_from(data, 1)
+    return decode(data[1 + _ENTRY_HEADER.size:]), compute_time, expires_at
@@ -4,7 +4,10 @@ Task queue setup for async processing
 """
 
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
 from app.core.config import settings
+from app.core.worker_loop import worker_loop
 
 # Create Celery instance
 celery_app = Celery(
@@ -53,5 +56,61 @@ celery_app.conf.task_annotations = {
     },
 }
 
+# Periodic tasks (run with `celery beat`)
+celery_app.conf.beat_schedule = {
+    "rollup-ai-usage": {
+        "task": "rollup_ai_usage",
+        "schedule": crontab(hour=0, minute=15),  # Yesterday's usage, after the last flushes
+    },
+}
+
+
+
+# Worker-lifetime event loop: async resources (DB pool, HTTP sessions) persist across tasks
+async def _open_worker_resources():
+    """Connect shared async resources on the worker loop"""
+    from app.core.redis import init_redis
+    from app.services.ai_analytics import usage_analytics
+    try:
+        await init_redis()
+    except Exception:
+        # Cache and rate limiting fall back to in-process state
+        pass
+    usage_analytics.start()
+
+
+async def _close_worker_resources():
+    """Release async resources held by the worker loop"""
+    from app.core.database import close_db
+    from app.core.http_client import close_http_client
+    from app.core.redis import close_redis
+    from app.services.ai_analytics import usage_analytics
+    await usage_analytics.stop()
+    await close_http_client()
+    await close_redis()
+    await close_db()
+
+
+worker_loop.on_startup(_open_worker_resources)
+worker_loop.on_shutdown(_close_worker_resources)
+
+
+@worker_process_init.connect
+def start_worker_loop(**kwargs):
+    """Start the persistent loop in each forked worker process"""
+    from app.core.database import engine
+
+    # Connections inherited from the parent process must not be reused after fork
+    engine.sync_engine.dispose(close=False)
+    worker_loop.start()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_worker_loop(**kwargs):
+    """Stop the persistent loop and close its resources"""
+    worker_loop.stop()
+
+
 if __name__ == "__main__":
     celery_app.start()
@@ -4,7 +4,7 @@ Handles environment variables and application settings
 """
 
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 from functools import lru_cache
@@ -32,6 +32,15 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_CACHE_TTL: int = 3600  # 1 hour
+    CACHE_COMPRESSION_THRESHOLD: int = 4096  # Encoded values at least this many bytes are compressed (0 = never)
+    CACHE_L1_NAMESPACES: str = ""  # Key prefixes ("workflow,user") also cached in-process in front of Redis
+    CACHE_L1_SIZE: int = 1024  # In-process entries per namespace
+    CACHE_L1_TTL: float = 30.0  # Seconds an in-process entry is trusted, even without invalidations
+    CACHE_STALE_TTL: int = 60  # Seconds past its TTL a get_or_compute value may be served while it refreshes
+    CACHE_LOCK_TTL: float = 10.0  # Seconds a get_or_compute recompute lock is held at most
+    CACHE_XFETCH_BETA: float = 1.0  # > 1 refreshes earlier, < 1 later
+    CACHE_INVALIDATE_BATCH: int = 500  # Keys per UNLINK when invalidating tags or patterns
+    CACHE_BULK_CHUNK: int = 1000  # Keys per MGET / per MULTI transaction in get_many and set_many
     
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
@@ -45,10 +54,63 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: Optional[str] = None
     ANTHROPIC_API_KEY: Optional[str] = None
     GOOGLE_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"  # Point at benchmarks/mock_provider.py for load tests
+    ANTHROPIC_BASE_URL: str = "https://api.anthropic.com/v1"
+    
+    # Outbound HTTP (shared connection pools)
+    HTTP_TIMEOUT: int = 30
+    HTTP_POOL_LIMIT: int = 100  # Connections per pool
+    HTTP_POOL_LIMIT_PER_HOST: int = 20
+    HTTP_POOL_LIMITS_PER_HOST: Dict[str, int] = {}  # Per-pool overrides, e.g. {"openai": 50}
+    HTTP_DNS_CACHE_TTL: int = 300
+    HTTP_KEEPALIVE_TIMEOUT: int = 30
     
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 100
     RATE_LIMIT_BURST: int = 200
+    AI_RATE_LIMIT_PER_USER: bool = False  # Additional per-user bucket for AI calls
+    AI_USER_RATE_LIMIT_PER_MINUTE: int = 20
+    AI_USER_RATE_LIMIT_BURST: int = 10
+    AI_RATE_LIMIT_MAX_WAIT: float = 10.0  # Seconds a request may wait for a token
+    AI_BATCH_RATE_LIMIT_MAX_WAIT: float = 300.0  # Same, for batch-priority requests
+    AI_INTERACTIVE_TOKEN_RESERVE: float = 0.2  # Bucket fraction batch traffic must leave for interactive
+    AI_INTERACTIVE_DEADLINE: float = 30.0  # Seconds an interactive /ai/process request may take
+    AI_MAX_CONCURRENCY: int = 32  # Upper bound for adaptive per-provider concurrency
+    AI_LATENCY_TOLERANCE: float = 2.0  # Latency/baseline ratio treated as congestion
+    AI_RESPONSE_CACHE_TTL: int = 3600
+    AI_RESPONSE_CACHE_LOCAL_SIZE: int = 1024  # In-process entries in front of Redis
+    AI_COALESCE_REQUESTS: bool = True  # Identical concurrent requests share one provider call
+    AI_COALESCE_DISTRIBUTED: bool = False  # Also coalesce across workers (Redis lock + pub/sub)
+    AI_HEDGE_PERCENTILE: float = 95.0  # Fire the fallback once the primary exceeds this latency percentile
+    AI_HEDGE_DEFAULT_DELAY: float = 2.0  # Hedge delay until enough latencies are observed
+    AI_HEDGE_MIN_SAMPLES: int = 20
+    AI_HEDGE_BUDGET_RATIO: float = 0.1  # Hedged calls per primary call (capped at 1.0 = 2x spend)
+    AI_PROMPT_PREFIX_MIN_CHARS: int = 256  # Shortest shared prefix split off batch prompts
+    AI_PROMPT_CACHE_MIN_CHARS: int = 4096  # Prefixes marked for provider prompt caching (~1024 tokens)
+    AI_ENSEMBLE_CONFIDENCE_THRESHOLD: float = 0.8  # Cascade ensembles answer with the first member this confident
+    AI_RETRY_MAX_ATTEMPTS: int = 4  # Provider calls per request, first attempt included
+    AI_RETRY_BASE_DELAY: float = 0.1  # Seconds; decorrelated jitter grows from here
+    AI_RETRY_MAX_DELAY: float = 5.0
+    AI_RETRY_BUDGET: float = 10.0  # Seconds after which no further retry is scheduled
+    AI_CIRCUIT_WINDOW: float = 60.0  # Seconds of outcomes used for error/slow-call rates
+    AI_CIRCUIT_MIN_REQUESTS: int = 10  # Outcomes required in the window before the circuit can open
+    AI_CIRCUIT_FAILURE_RATE: float = 0.5
+    AI_CIRCUIT_SLOW_CALL_SECONDS: float = 20.0
+    AI_CIRCUIT_SLOW_CALL_RATE: float = 0.8
+    AI_CIRCUIT_OPEN_SECONDS: float = 30.0  # Cooldown before a half-open probe
+    AI_ROUTER_EWMA_ALPHA: float = 0.2  # Weight of the newest sample in router statistics
+    AI_ROUTER_DEFAULT_LATENCY: float = 2.0  # Assumed latency for models without samples
+    AI_ROUTER_MAX_ATTEMPTS: int = 3  # Ranked candidates tried by process_routed
+    AI_CONTEXT_PREFLIGHT: bool = True  # Reject requests that can't fit the model context before sending
+    AI_TOKENIZER_BPE_FILE: Optional[str] = None  # tiktoken-format rank file for offline exact counts
+    AI_CONTEXT_ESTIMATE_MARGIN: float = 0.25  # Estimated counts must exceed the limit by this fraction to reject
+    AI_USAGE_FLUSH_INTERVAL: float = 10.0  # Seconds between flushes of per-worker usage aggregates
+    AI_USAGE_RETENTION_DAYS: int = 8  # Days raw aggregates stay in Redis (daily rollups go to the database)
+    
+    # Workflow Execution
+    WORKFLOW_MAX_CONCURRENCY: int = 10  # Parallel nodes per execution
+    WORKFLOW_PLAN_CACHE_SIZE: int = 512  # Compiled plans kept per worker
+    WORKFLOW_TOKEN_FRAME_INTERVAL: float = 0.05  # Seconds between streamed token frames
     
     # File Upload
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
@@ -67,6 +129,10 @@ class Settings(BaseSettings):
             return [i.strip() for i in self.ALLOWED_ORIGINS.split(",")]
         return self.ALLOWED_ORIGINS
 
+    def get_cache_l1_namespaces(self) -> List[str]:
+        """Get in-process cache namespaces as list"""
+        return [i.strip() for i in self.CACHE_L1_NAMESPACES.split(",") if i.strip()]
+
     def get_allowed_hosts(self) -> List[str]:
         """Get allowed hosts as list"""
         if isinstance(self.ALLOWED_HOSTS, str):
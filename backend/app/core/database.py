@@ -61,7 +61,7 @@ async def init_db():
     """Initialize database tables"""
     async with engine.begin() as conn:
         # Import all models here to ensure they are registered
-        from app.models import user, workflow, ai_agent  # noqa
+        from app.models import user, workflow, ai_agent, ai_usage  # noqa
         
         await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
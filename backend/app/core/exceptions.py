@@ -6,8 +6,9 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from multidict import CIMultiDict
 import logging
-from typing import Union
+from typing import Mapping, Optional, Union
 
 logger = logging.getLogger(__name__)
 
@@ -32,12 +33,51 @@ class WorkflowExecutionException(FlowsyAIException):
         super().__init__(f"Workflow execution failed: {message}", 500)
 
 
+class InvalidExpressionException(FlowsyAIException):
+    """Workflow expression parse/validation exception"""
+    def __init__(self, expression: str, message: str):
+        super().__init__(f"Invalid expression '{expression}': {message}", 400)
+
+
 class AIServiceException(FlowsyAIException):
     """AI service exception"""
     def __init__(self, service: str, message: str):
         super().__init__(f"AI service {service} error: {message}", 503)
 
 
+class AIProviderHTTPException(AIServiceException):
+    """AI provider returned an error HTTP status"""
+    def __init__(self, service: str, status: int, message: str, headers: Optional[Mapping[str, str]] = None):
+        self.status = status
+        self.headers = CIMultiDict(headers or {})  # Header names are case-insensitive
+        super().__init__(service, f"HTTP {status}: {message}")
+
+
+class CircuitOpenException(AIServiceException):
+    """AI provider circuit is open; request rejected without calling it"""
+    def __init__(self, service: str, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(service, f"circuit open, retry in {retry_after:.1f}s")
+
+
+class DeadlineExceededException(FlowsyAIException):
+    """Request deadline passed before it could be served"""
+    def __init__(self, message: str = "Request deadline exceeded"):
+        super().__init__(message, 504)
+
+
+class ContextLengthExceededException(FlowsyAIException):
+    """Prompt plus requested completion don't fit the model's context window"""
+    def __init__(self, model: str, prompt_tokens: int, max_tokens: int, limit: int):
+        self.prompt_tokens = prompt_tokens
+        self.limit = limit
+        super().__init__(
+            f"Request for {model} needs {prompt_tokens} prompt + {max_tokens} completion tokens, "
+            f"context limit is {limit}",
+            400
+        )
+
+
 class AuthenticationException(FlowsyAIException):
     """Authentication exception"""
     def __init__(self, message: str = "Authentication failed"):
@@ -0,0 +1,115 @@
+"""
+Shared HTTP client for FlowsyAI Backend
+Process-wide pooled aiohttp sessions with keep-alive and DNS caching
+"""
+
+import asyncio
+from typing import Dict, Optional
+
+import aiohttp
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class HTTPClientManager:
+    """Named connection pools (one per upstream provider) shared by the whole process"""
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_session(self, pool: str) -> aiohttp.ClientSession:
+        """Create session with its own connector so pools don't starve each other"""
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_LIMIT,
+            limit_per_host=settings.HTTP_POOL_LIMITS_PER_HOST.get(pool, settings.HTTP_POOL_LIMIT_PER_HOST),
+            use_dns_cache=True,
+            ttl_dns_cache=settings.HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+            enable_cleanup_closed=True,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=settings.HTTP_TIMEOUT),
+        )
+
+    async def get_session(self, pool: str = "default") -> aiohttp.ClientSession:
+        """Get (or lazily create) the session for a pool"""
+        loop = asyncio.get_running_loop()
+
+        # Sessions are bound to the loop that created them
+        if self._loop is not loop:
+            sessions, previous_loop = self._sessions, self._loop
+            self._sessions = {}
+            self._loop = loop
+            if sessions:
+                logger.warning("Event loop changed; closing HTTP sessions from previous loop")
+                await self._close_stale(sessions, previous_loop)
+
+        session = self._sessions.get(pool)
+        if session is None or session.closed:
+            session = self._create_session(pool)
+            self._sessions[pool] = session
+            logger.debug(f"Created HTTP connection pool: {pool}")
+
+        return session
+
+    async def _close_stale(self, sessions: Dict[str, aiohttp.ClientSession], loop: Optional[asyncio.AbstractEventLoop]):
+        """Close sessions left behind by another event loop"""
+        for pool, session in sessions.items():
+            if session.closed:
+                continue
+            try:
+                if loop is not None and loop.is_running():
+                    # Still serving another thread: close there, where its transports live
+                    asyncio.run_coroutine_threadsafe(session.close(), loop)
+                else:
+                    # Loop stopped or closed: closing only drops the pooled connections
+                    await session.close()
+            except Exception as e:
+                logger.error(f"Error closing HTTP pool {pool} from previous loop: {e}")
+
+    async def close(self):
+        """Close all sessions and their connection pools"""
+        sessions, self._sessions = self._sessions, {}
+        for pool, session in sessions.items():
+            try:
+                await session.close()
+            except Exception as e:
+                logger.error(f"Error closing HTTP pool {pool}: {e}")
+
+        if sessions:
+            # Give SSL transports a moment to close cleanly
+            await asyncio.sleep(0.25)
+            logger.info("HTTP connection pools closed")
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get per-pool connection statistics"""
+        stats = {}
+        for pool, session in self._sessions.items():
+            connector = session.connector
+            if connector is None or session.closed:
+                continue
+            stats[pool] = {
+                "limit": connector.limit,
+                "limit_per_host": connector.limit_per_host,
+                "acquired": len(getattr(connector, "_acquired", ())),
+            }
+        return stats
+
+
+# Global HTTP client instance
+http_client = HTTPClientManager()
+
+
+async def get_http_session(pool: str = "default") -> aiohttp.ClientSession:
+    """Get pooled HTTP session"""
+    return await http_client.get_session(pool)
+
+
+async def close_http_client():
+    """Close pooled HTTP sessions"""
+    await http_client.close()
@@ -0,0 +1,137 @@
+"""
+Distributed rate limiting for FlowsyAI Backend
+Redis-backed token buckets with an in-process fallback
+"""
+
+import time
+from typing import Dict, Tuple
+
+from app.core.logging import get_logger
+from app.core.redis import RedisManager, redis_manager
+
+logger = get_logger(__name__)
+
+# Refill and take atomically; Redis TIME keeps every worker on the same clock.
+# Tokens are only granted while `reserve` more remain in the bucket afterwards.
+# Returns {granted, seconds_until_enough_tokens} (wait as string: Lua numbers truncate).
+TOKEN_BUCKET_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local reserve = tonumber(ARGV[4] or '0')
+
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local granted = 0
+local wait = 0
+if tokens >= requested + reserve then
+    tokens = tokens - requested
+    granted = 1
+else
+    wait = (requested + reserve - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+
+return {granted, tostring(wait)}
+"""
+
+
+class LocalTokenBucket:
+    """In-process token bucket used when Redis is unavailable"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self, tokens: float = 1, reserve: float = 0) -> float:
+        """Take tokens if available; return 0 or seconds until they would be"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= tokens + reserve:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens + reserve - self.tokens) / self.rate
+
+
+class TokenBucketRateLimiter:
+    """Token bucket rate limiter shared by all workers through Redis"""
+
+    def __init__(self, redis_manager: RedisManager, prefix: str = "ratelimit"):
+        self.redis_manager = redis_manager
+        self.prefix = prefix
+        self._scripts = {}
+        self._local_buckets: Dict[Tuple[str, float, float], LocalTokenBucket] = {}
+        self._redis_failed_at = 0.0
+
+    def _get_script(self, client):
+        """Register the Lua script once per client (EVALSHA with EVAL fallback)"""
+        script = self._scripts.get(id(client))
+        if script is None:
+            script = client.register_script(TOKEN_BUCKET_SCRIPT)
+            self._scripts = {id(client): script}
+        return script
+
+    def _local_bucket(self, key: str, rate: float, capacity: float) -> LocalTokenBucket:
+        bucket_id = (key, rate, capacity)
+        bucket = self._local_buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self._local_buckets[bucket_id] = LocalTokenBucket(rate, capacity)
+        return bucket
+
+    @property
+    def backend(self) -> str:
+        """Which bucket store is currently in use"""
+        client = self.redis_manager.redis_client
+        if client is None or time.monotonic() - self._redis_failed_at < 5:
+            return "local"
+        return "redis"
+
+    async def try_acquire(
+        self,
+        key: str,
+        rate: float,
+        capacity: float,
+        tokens: float = 1,
+        reserve: float = 0
+    ) -> float:
+        """Take tokens without waiting; return 0 if granted, else seconds to wait
+
+        reserve keeps that many tokens in the bucket for other (higher priority) callers.
+        """
+        if self.backend == "redis":
+            try:
+                script = self._get_script(self.redis_manager.redis_client)
+                granted, wait = await script(
+                    keys=[f"{self.prefix}:{key}"],
+                    args=[rate, capacity, tokens, reserve]
+                )
+                return 0.0 if int(granted) else float(wait)
+            except Exception as e:
+                # Back off from Redis briefly and keep limiting in-process
+                self._redis_failed_at = time.monotonic()
+                logger.warning(f"Redis rate limiter unavailable, using local bucket: {e}")
+
+        return self._local_bucket(key, rate, capacity).try_acquire(tokens, reserve)
+
+
+# Global rate limiter instance
+rate_limiter = TokenBucketRateLimiter(redis_manager)
@@ -3,14 +3,22 @@ Redis configuration and utilities for FlowsyAI Backend
 Handles caching, session storage, and Celery broker
 """
 
+import asyncio
+import fnmatch
+import inspect
 import json
-import pickle
-from typing import Any, Optional, Union, Dict, List
+import math
+import random
+import time
+import uuid
+from typing import Any, Callable, Optional, Union, Dict, List
 from datetime import timedelta
 
 import redis.asyncio as redis
 from redis.asyncio import Redis
+from app.core.cache_codec import decode, decode_entry, encode, encode_entry
 from app.core.config import settings
+from app.core.local_cache import LRUCache
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -38,11 +46,10 @@ class RedisManager:
                 socket_keepalive_options={},
             )
             
-            # Cache client (database 0)
+            # Cache client (database 0); raw bytes, values go through app.core.cache_codec
             self.cache_client = redis.from_url(
                 settings.REDIS_URL.replace('/0', '/0'),
-                encoding="utf-8",
-                decode_responses=True,
+                decode_responses=False,
                 max_connections=10,
             )
             
@@ -63,6 +70,7 @@ class RedisManager:
             
         except Exception as e:
             logger.error(f"Failed to initialize Redis: {e}")
+            await self.close()
             raise
     
     async def close(self):
@@ -77,6 +85,10 @@ class RedisManager:
             logger.info("Redis connections closed")
         except Exception as e:
             logger.error(f"Error closing Redis connections: {e}")
+        finally:
+            self.redis_client = None
+            self.cache_client = None
+            self.session_client = None
     
     async def health_check(self) -> Dict[str, Any]:
         """Check Redis health"""
@@ -111,33 +123,228 @@ class RedisManager:
             }
 
 
+# Channel carrying "<sender id>|<kind>|<target>" for in-process cache eviction,
+# kind being "key", "pattern" (a glob) or "generation" (a versioned namespace)
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Result of a background refresh left to another process
+_SKIPPED = object()
+
+# Deletes a recompute lock only if this caller still holds it
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Adds ARGV[1] to tag set KEYS[1], which lives as long as its longest-lived member:
+# a member without expiry (ARGV[2] = 0) makes the set persistent for good
+_TAG_KEY = """
+local current = redis.call("ttl", KEYS[1])
+redis.call("sadd", KEYS[1], ARGV[1])
+local ttl = tonumber(ARGV[2])
+if ttl <= 0 then
+    redis.call("persist", KEYS[1])
+elseif current == -2 or (current >= 0 and current < ttl) then
+    redis.call("expire", KEYS[1], ttl)
+end
+return 1
+"""
+
+
+def _seconds(ttl: Optional[Union[int, timedelta]]) -> Optional[int]:
+    """TTL in whole seconds (None for no expiry)"""
+    if isinstance(ttl, timedelta):
+        return int(ttl.total_seconds())
+    return ttl
+
+
 class CacheManager:
-    """Redis cache operations manager"""
+    """Redis cache operations manager
+    
+    Namespaces listed in CACHE_L1_NAMESPACES (the key part before the first
+    ":") are also kept in a per-process LRU in front of Redis. Writes through
+    any process evict the key everywhere over Redis pub/sub; the in-process
+    tier is bypassed whenever that subscription is down.
+    """
     
     def __init__(self, redis_manager: RedisManager):
         self.redis_manager = redis_manager
+        self.instance_id = uuid.uuid4().hex
+        self.local: Dict[str, LRUCache] = {}
+        for namespace in settings.get_cache_l1_namespaces():
+            self.enable_local(namespace)
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self._reads: Dict[str, object] = {}  # Key -> token of the Redis read that may fill the local tier
+        self._subscribed = False
+        self._listener: Optional[asyncio.Task] = None
+        self._generations = LRUCache(1024, ttl=settings.CACHE_L1_TTL)  # Versioned namespace -> generation
+        self._computing: Dict[str, asyncio.Task] = {}  # get_or_compute loads in flight in this process
+        self.compute_stats = {"computes": 0, "early_refreshes": 0, "stale_served": 0, "lock_waits": 0}
     
     @property
     def client(self) -> Redis:
         """Get cache client"""
         return self.redis_manager.cache_client
     
+    def enable_local(self, namespace: str, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        """Cache keys of a namespace in-process too (entries are trusted for at most ttl seconds)
+        
+        Call before init_redis(), or call start() afterwards.
+        """
+        self.local[namespace] = LRUCache(
+            maxsize or settings.CACHE_L1_SIZE,
+            ttl=ttl if ttl is not None else settings.CACHE_L1_TTL
+        )
+    
+    def _namespace_local(self, key: str) -> Optional[LRUCache]:
+        """In-process tier of the key's namespace; writes to it must be broadcast"""
+        return self.local.get(key.split(":", 1)[0]) if self.local else None
+    
+    def _local_for(self, key: str) -> Optional[LRUCache]:
+        """In-process tier of the key's namespace, if enabled and kept coherent"""
+        return self._namespace_local(key) if self._subscribed else None
+    
+    def start(self):
+        """Start listening for invalidations (local entries, namespace generations) on the running loop"""
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+    
+    async def stop(self):
+        """Stop listening for invalidations and drop in-process entries"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._subscribed = False
+        self._clear_local()
+    
+    async def _listen(self):
+        delay = 1.0
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Anything published while unsubscribed was missed
+                self._clear_local()
+                self._subscribed = True
+                delay = 1.0
+                async for message in pubsub.listen():
+                    self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation subscription lost: {e}")
+            finally:
+                self._subscribed = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    
+    def _apply_invalidation(self, data: Union[bytes, str]):
+        if isinstance(data, bytes):
+            data = data.decode()
+        sender, kind, target = data.split("|", 2)
+        if sender == self.instance_id:
+            return
+        if kind == "pattern":
+            self._evict_pattern(target)
+        elif kind == "generation":
+            self._reads.pop(f"generation:{target}", None)
+            self._generations.delete(target)
+        else:
+            self._reads.pop(target, None)
+            local = self.local.get(target.split(":", 1)[0])
+            if local is not None:
+                local.delete(target)
+    
+    def _evict_pattern(self, pattern: str):
+        self._reads.clear()
+        for local in self.local.values():
+            for key in [key for key in local.keys() if fnmatch.fnmatchcase(key, pattern)]:
+                local.delete(key)
+    
+    def _clear_local(self):
+        self._reads.clear()
+        self._generations.clear()
+        for local in self.local.values():
+            local.clear()
+    
+    def _publish(self, pipe, kind: str, target: str):
+        pipe.publish(INVALIDATION_CHANNEL, f"{self.instance_id}|{kind}|{target}")
+    
+    async def _get_raw(self, key: str) -> Optional[bytes]:
+        """Encoded value from the local tier or Redis (Redis errors propagate)"""
+        local = self._local_for(key)
+        if local is not None:
+            data = local.get(key)
+            if data is not None:
+                return data
+        
+        token = None
+        if local is not None:
+            token = self._reads[key] = object()
+        try:
+            value = await self.client.get(key)
+        finally:
+            # An invalidation arriving during the read drops the token: the value may be stale
+            filled = local is not None and self._reads.get(key) is token
+            if filled:
+                del self._reads[key]
+        
+        if value is None:
+            self.l2_misses += 1
+            return None
+        self.l2_hits += 1
+        if filled:
+            local.set(key, value)
+        return value
+    
+    async def _set_raw(self, key: str, data: bytes, ttl: Optional[int] = None, tags: Optional[List[str]] = None):
+        """Store an encoded value, evicting local copies everywhere (Redis errors propagate)"""
+        local = self._namespace_local(key)
+        if local is None and not tags:
+            await self.client.set(key, data, ex=ttl or None)
+            return
+        
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(key, data, ex=ttl or None)
+        self._tag(pipe, key, tags, ttl)
+        if local is not None:
+            self._publish(pipe, "key", key)
+        await pipe.execute()
+        # A read still in flight may return the old value: keep it out of the local tier
+        self._reads.pop(key, None)
+        if local is not None and self._subscribed:
+            # Never trust the local copy past the Redis expiry
+            local.set(key, data, ttl=min(ttl, local.ttl or ttl) if ttl else None)
+    
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f"cache:tag:{tag}"
+    
+    def _tag(self, pipe, key: str, tags: Optional[List[str]], ttl: Optional[int]):
+        """Queue key's registration in its tag sets, which live as long as their longest-lived key"""
+        for tag in tags or ():
+            pipe.eval(_TAG_KEY, 1, self._tag_key(tag), key, ttl or 0)
+    
     async def get(self, key: str, default: Any = None) -> Any:
         """Get value from cache"""
         try:
-            value = await self.client.get(key)
+            value = await self._get_raw(key)
             if value is None:
                 return default
-            
-            # Try to deserialize JSON first, then pickle
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                try:
-                    return pickle.loads(value.encode('latin1'))
-                except:
-                    return value
-                    
+            return decode(value)
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
             return default
@@ -146,36 +353,181 @@ class CacheManager:
         self, 
         key: str, 
         value: Any, 
-        ttl: Optional[Union[int, timedelta]] = None
+        ttl: Optional[Union[int, timedelta]] = None,
+        tags: Optional[List[str]] = None
     ) -> bool:
-        """Set value in cache"""
+        """Set value in cache, optionally registered under tags for invalidate_tags()"""
         try:
-            # Serialize value
-            if isinstance(value, (dict, list, tuple)):
-                serialized_value = json.dumps(value)
-            elif isinstance(value, (str, int, float, bool)):
-                serialized_value = value
-            else:
-                serialized_value = pickle.dumps(value).decode('latin1')
-            
-            # Set with TTL
-            if ttl:
-                if isinstance(ttl, timedelta):
-                    ttl = int(ttl.total_seconds())
-                await self.client.setex(key, ttl, serialized_value)
-            else:
-                await self.client.set(key, serialized_value)
-            
+            if isinstance(ttl, timedelta):
+                ttl = int(ttl.total_seconds())
+            await self._set_raw(key, encode(value), ttl, tags)
             return True
             
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}")
             return False
     
+    async def get_or_compute(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Union[int, timedelta],
+        stale_ttl: Optional[int] = None,
+        beta: Optional[float] = None,
+        tags: Optional[List[str]] = None
+    ) -> Any:
+        """Cached value of key, computed with loader() (sync or async) when needed
+        
+        Protects hot keys from stampedes when they expire:
+        - XFetch: each read refreshes early with a probability that rises as
+          the expiry nears, scaled by how long the value took to compute
+        - only the holder of a short Redis lock computes; other processes
+          wait for its result and callers in this process share it
+        - a hit due for refresh (or up to stale_ttl seconds past its TTL) is
+          returned at once while the refresh runs in the background
+        
+        Values are stored with their compute time and expiry, so the key
+        should only be written through this method; get() still reads it.
+        """
+        if isinstance(ttl, timedelta):
+            ttl = ttl.total_seconds()
+        stale_ttl = settings.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        beta = settings.CACHE_XFETCH_BETA if beta is None else beta
+        
+        try:
+            entry = decode_entry(await self._get_raw(key))
+        except Exception as e:
+            logger.error(f"Cache get error for key {key}: {e}")
+            entry = None
+        
+        if entry is not None:
+            value, compute_time, expires_at = entry
+            now = time.time()
+            # XFetch: refresh once now + compute_time * beta * -ln(U) reaches the expiry
+            if now - compute_time * beta * math.log(1.0 - random.random()) < expires_at:
+                return value
+            self.compute_stats["early_refreshes" if now < expires_at else "stale_served"] += 1
+            if key not in self._computing:
+                self._start_compute(key, loader, ttl, stale_ttl, tags, wait=False)
+            return value
+        
+        task = self._computing.get(key)
+        # Shielded so one cancelled caller does not cancel the computation for the others
+        value = await asyncio.shield(task) if task is not None else _SKIPPED
+        if value is _SKIPPED:
+            # Nothing in flight here, or only a background refresh another process took over
+            value = await asyncio.shield(self._start_compute(key, loader, ttl, stale_ttl, tags, wait=True))
+        return value
+    
+    def _start_compute(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: float,
+        stale_ttl: int,
+        tags: Optional[List[str]],
+        wait: bool
+    ) -> asyncio.Task:
+        task = asyncio.ensure_future(self._compute(key, loader, ttl, stale_ttl, tags, wait))
+        self._computing[key] = task
+        task.add_done_callback(lambda done: self._compute_done(key, done, background=not wait))
+        return task
+    
+    def _compute_done(self, key: str, task: asyncio.Task, background: bool):
+        if self._computing.get(key) is task:
+            del self._computing[key]
+        if background and not task.cancelled() and task.exception() is not None:
+            logger.error(f"Cache background refresh failed for key {key}: {task.exception()}")
+    
+    async def _compute(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: float,
+        stale_ttl: int,
+        tags: Optional[List[str]],
+        wait: bool
+    ) -> Any:
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            locked = bool(await self.client.set(lock_key, token, nx=True, px=int(settings.CACHE_LOCK_TTL * 1000)))
+            busy = not locked
+        except Exception as e:
+            # Redis unavailable: compute without coordination
+            logger.error(f"Cache lock error for key {key}: {e}")
+            locked = busy = False
+        
+        if busy:
+            if not wait:
+                return _SKIPPED  # Another process is already refreshing
+            self.compute_stats["lock_waits"] += 1
+            entry = await self._wait_for_entry(key, lock_key)
+            if entry is not None:
+                return entry[0]
+        
+        try:
+            self.compute_stats["computes"] += 1
+            started = time.monotonic()
+            value = loader()
+            if inspect.isawaitable(value):
+                value = await value
+            compute_time = time.monotonic() - started
+            
+            try:
+                await self._set_raw(
+                    key,
+                    encode_entry(value, compute_time, time.time() + ttl),
+                    int(math.ceil(ttl + stale_ttl)),
+                    tags
+                )
+            except Exception as e:
+                logger.error(f"Cache set error for key {key}: {e}")
+            return value
+        finally:
+            if locked:
+                try:
+                    await self.client.eval(_RELEASE_LOCK, 1, lock_key, token)
+                except Exception as e:
+                    logger.error(f"Cache unlock error for key {key}: {e}")
+    
+    async def _wait_for_entry(self, key: str, lock_key: str) -> Optional[tuple]:
+        """Entry stored by the lock holder, or None once the lock is released or expires without one"""
+        deadline = time.monotonic() + settings.CACHE_LOCK_TTL
+        delay = 0.01
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            try:
+                pipe = self.client.pipeline(transaction=False)
+                pipe.get(key)
+                pipe.exists(lock_key)
+                data, locked = await pipe.execute()
+            except Exception as e:
+                logger.error(f"Cache get error for key {key}: {e}")
+                return None
+            entry = decode_entry(data)
+            if entry is not None:
+                return entry
+            if not locked:
+                return None
+        return None
+    
     async def delete(self, key: str) -> bool:
         """Delete key from cache"""
         try:
-            result = await self.client.delete(key)
+            local = self._namespace_local(key)
+            if local is None:
+                result = await self.client.delete(key)
+                return result > 0
+            
+            pipe = self.client.pipeline(transaction=False)
+            pipe.delete(key)
+            self._publish(pipe, "key", key)
+            result, _ = await pipe.execute()
+            # After the write, so a read in flight can't refill the old value
+            self._reads.pop(key, None)
+            local.delete(key)
             return result > 0
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}")
@@ -192,7 +544,18 @@ class CacheManager:
     async def increment(self, key: str, amount: int = 1) -> Optional[int]:
         """Increment counter in cache"""
         try:
-            return await self.client.incrby(key, amount)
+            local = self._namespace_local(key)
+            if local is None:
+                return await self.client.incrby(key, amount)
+            
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incrby(key, amount)
+            self._publish(pipe, "key", key)
+            result, _ = await pipe.execute()
+            # After the write, so a read in flight can't refill the old value
+            self._reads.pop(key, None)
+            local.delete(key)
+            return result
         except Exception as e:
             logger.error(f"Cache increment error for key {key}: {e}")
             return None
@@ -208,56 +571,94 @@ class CacheManager:
             return False
     
     async def get_many(self, keys: List[str]) -> Dict[str, Any]:
-        """Get multiple values from cache"""
+        """Get multiple values from cache
+        
+        Keys missing locally are fetched with one MGET per CACHE_BULK_CHUNK
+        keys, all sent in a single pipeline: one round trip, while Redis
+        serves other clients between the chunks.
+        """
+        result = {}
+        missing = []
+        for key in keys:
+            local = self._local_for(key)
+            data = local.get(key) if local is not None else None
+            if data is not None:
+                result[key] = decode(data)
+            else:
+                missing.append(key)
+        if not missing:
+            return result
+        
+        # The local tier is resolved before the await: the subscription may drop meanwhile
+        tokens = {}
+        for key in missing:
+            local = self._local_for(key)
+            if local is not None:
+                token = self._reads[key] = object()
+                tokens[key] = (token, local)
         try:
-            values = await self.client.mget(keys)
-            result = {}
+            chunk = settings.CACHE_BULK_CHUNK
+            pipe = self.client.pipeline(transaction=False)
+            for start in range(0, len(missing), chunk):
+                pipe.mget(missing[start:start + chunk])
+            values = [value for part in await pipe.execute() for value in part]
             
-            for key, value in zip(keys, values):
-                if value is not None:
-                    try:
-                        result[key] = json.loads(value)
-                    except (json.JSONDecodeError, TypeError):
-                        try:
-                            result[key] = pickle.loads(value.encode('latin1'))
-                        except:
-                            result[key] = value
+            for key, value in zip(missing, values):
+                token, local = tokens.get(key, (None, None))
+                if token is not None and self._reads.get(key) is token:
+                    del self._reads[key]
+                    if value is not None:
+                        local.set(key, value)
+                if value is None:
+                    self.l2_misses += 1
+                    continue
+                self.l2_hits += 1
+                result[key] = decode(value)
             
             return result
             
         except Exception as e:
+            for key, (token, _) in tokens.items():
+                if self._reads.get(key) is token:
+                    del self._reads[key]
             logger.error(f"Cache get_many error: {e}")
-            return {}
+            return result
     
     async def set_many(
         self, 
         mapping: Dict[str, Any], 
-        ttl: Optional[Union[int, timedelta]] = None
+        ttl: Optional[Union[int, timedelta, Dict[str, Union[int, timedelta]]]] = None,
+        tags: Optional[List[str]] = None
     ) -> bool:
-        """Set multiple values in cache"""
+        """Set multiple values in cache, optionally registered under tags
+        
+        ttl is one TTL for every key or a dict of per-key TTLs (keys missing
+        from it get none). Keys are written as SET ... EX inside MULTI/EXEC
+        transactions of CACHE_BULK_CHUNK keys, one round trip each, so no key
+        ever exists without its TTL. Each chunk is atomic; a failure can
+        leave earlier chunks written.
+        """
         try:
-            # Serialize all values
-            serialized_mapping = {}
-            for key, value in mapping.items():
-                if isinstance(value, (dict, list, tuple)):
-                    serialized_mapping[key] = json.dumps(value)
-                elif isinstance(value, (str, int, float, bool)):
-                    serialized_mapping[key] = value
-                else:
-                    serialized_mapping[key] = pickle.dumps(value).decode('latin1')
+            per_key_ttl = ttl if isinstance(ttl, dict) else None
+            shared_ttl = None if per_key_ttl is not None else _seconds(ttl)
+            items = list(mapping.items())
+            chunk = settings.CACHE_BULK_CHUNK
             
-            # Set all values
-            await self.client.mset(serialized_mapping)
-            
-            # Set TTL if specified
-            if ttl:
-                if isinstance(ttl, timedelta):
-                    ttl = int(ttl.total_seconds())
-                
-                pipe = self.client.pipeline()
-                for key in mapping.keys():
-                    pipe.expire(key, ttl)
+            for start in range(0, len(items), chunk):
+                pipe = self.client.pipeline(transaction=True)
+                local_keys = []
+                for key, value in items[start:start + chunk]:
+                    key_ttl = _seconds(per_key_ttl.get(key)) if per_key_ttl is not None else shared_ttl
+                    pipe.set(key, encode(value), ex=key_ttl or None)
+                    self._tag(pipe, key, tags, key_ttl)
+                    if self._namespace_local(key) is not None:
+                        local_keys.append(key)
+                        self._publish(pipe, "key", key)
                 await pipe.execute()
+                
+                for key in local_keys:
+                    self._reads.pop(key, None)
+                    self._namespace_local(key).delete(key)
             
             return True
             
@@ -266,34 +667,137 @@ class CacheManager:
             return False
     
     async def clear_pattern(self, pattern: str) -> int:
-        """Clear keys matching pattern"""
+        """Clear keys matching pattern
+        
+        Walks the whole keyspace; prefer tags (invalidate_tags) or versioned
+        namespaces (invalidate_namespace) for routine invalidation. Keys are
+        unlinked in batches of CACHE_INVALIDATE_BATCH as the scan finds them.
+        """
         try:
-            keys = []
-            async for key in self.client.scan_iter(match=pattern):
-                keys.append(key)
+            batch_size = settings.CACHE_INVALIDATE_BATCH
+            deleted = 0
+            batch = []
+            async for key in self.client.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += await self.client.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += await self.client.unlink(*batch)
             
-            if keys:
-                return await self.client.delete(*keys)
-            return 0
+            if self.local:
+                self._evict_pattern(pattern)
+                await self.client.publish(INVALIDATION_CHANNEL, f"{self.instance_id}|pattern|{pattern}")
+            
+            return deleted
             
         except Exception as e:
             logger.error(f"Cache clear_pattern error for pattern {pattern}: {e}")
             return 0
     
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Delete every key written with any of the tags
+        
+        Cost is proportional to the tagged keys, not the keyspace. Each tag
+        set is first renamed away, so keys tagged while this runs survive it,
+        then drained CACHE_INVALIDATE_BATCH members at a time with UNLINK.
+        """
+        deleted = 0
+        batch_size = settings.CACHE_INVALIDATE_BATCH
+        for tag in tags:
+            try:
+                draining = f"{self._tag_key(tag)}:draining:{uuid.uuid4().hex}"
+                pipe = self.client.pipeline(transaction=False)
+                pipe.rename(self._tag_key(tag), draining)
+                # Left behind only if this process dies mid-drain
+                pipe.expire(draining, 3600)
+                renamed, _ = await pipe.execute(raise_on_error=False)
+                if isinstance(renamed, Exception):
+                    continue  # No key carries this tag
+                
+                while True:
+                    keys = await self.client.spop(draining, batch_size)
+                    if not keys:
+                        break
+                    pipe = self.client.pipeline(transaction=False)
+                    pipe.unlink(*keys)
+                    for key in keys:
+                        key = key.decode() if isinstance(key, bytes) else key
+                        local = self._namespace_local(key)
+                        if local is not None:
+                            local.delete(key)
+                            self._publish(pipe, "key", key)
+                    results = await pipe.execute()
+                    deleted += results[0]
+            except Exception as e:
+                logger.error(f"Cache invalidate error for tag {tag}: {e}")
+        return deleted
+    
+    @staticmethod
+    def _generation_key(namespace: str) -> str:
+        return f"cache:generation:{namespace}"
+    
+    async def namespace_key(self, namespace: str, key: str) -> str:
+        """Key of key inside a versioned namespace: "<namespace>:v<generation>:<key>"
+        
+        invalidate_namespace() bumps the generation, orphaning every key of
+        the namespace in O(1). Orphans are never read again and go away with
+        their TTL, so keys built here should always be written with one.
+        """
+        generation = self._generations.get(namespace) if self._subscribed else None
+        if generation is None:
+            read = f"generation:{namespace}"
+            token = self._reads[read] = object()
+            try:
+                generation = int(await self.client.get(self._generation_key(namespace)) or 0)
+            finally:
+                filled = self._reads.get(read) is token
+                if filled:
+                    del self._reads[read]
+            if filled and self._subscribed:
+                self._generations.set(namespace, generation)
+        return f"{namespace}:v{generation}:{key}"
+    
+    async def invalidate_namespace(self, namespace: str) -> int:
+        """Invalidate every key of a versioned namespace by bumping its generation"""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(self._generation_key(namespace))
+        self._publish(pipe, "generation", namespace)
+        generation, _ = await pipe.execute()
+        if self._subscribed:
+            self._generations.set(namespace, generation)
+        return generation
+    
+    def get_tier_stats(self) -> Dict[str, Any]:
+        """Hit counters of the in-process (L1) and Redis (L2) tiers"""
+        l1_hits = sum(local.hits for local in self.local.values())
+        l1_misses = sum(local.misses for local in self.local.values())
+        l2_lookups = self.l2_hits + self.l2_misses
+        return {
+            "l1": {namespace: local.get_stats() for namespace, local in self.local.items()},
+            "l1_hit_ratio": l1_hits / (l1_hits + l1_misses) if l1_hits + l1_misses else 0.0,
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "l2_hit_ratio": self.l2_hits / l2_lookups if l2_lookups else 0.0,
+            "invalidation_subscribed": self._subscribed,
+            "compute": dict(self.compute_stats),
+        }
+    
     async def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
+        stats = self.get_tier_stats()
         try:
             info = await self.client.info()
-            return {
+            stats.update({
                 "keyspace_hits": info.get("keyspace_hits", 0),
                 "keyspace_misses": info.get("keyspace_misses", 0),
                 "used_memory": info.get("used_memory_human"),
                 "connected_clients": info.get("connected_clients"),
                 "total_commands_processed": info.get("total_commands_processed"),
-            }
+            })
         except Exception as e:
             logger.error(f"Cache stats error: {e}")
-            return {}
+        return stats
 
 
 class SessionManager:
@@ -395,8 +899,10 @@ async def get_session_manager() -> SessionManager:
 async def init_redis():
     """Initialize Redis connections"""
     await redis_manager.initialize()
+    cache_manager.start()
 
 
 async def close_redis():
     """Close Redis connections"""
+    await cache_manager.stop()
     await redis_manager.close()
@@ -0,0 +1,184 @@
+"""
+Request coalescing for FlowsyAI Backend
+Single-flight execution of identical concurrent calls, in-process and across workers
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.exceptions import FlowsyAIException
+from app.core.logging import get_logger
+from app.core.redis import RedisManager, redis_manager
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Delete the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_RETRY = object()
+
+
+class SingleFlightException(FlowsyAIException):
+    """The coalesced call failed in another worker"""
+    def __init__(self, message: str):
+        super().__init__(message, 503)
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result"""
+
+    def __init__(
+        self,
+        redis_manager: RedisManager,
+        prefix: str = "singleflight",
+        lock_ttl: float = 60.0,
+        result_ttl: float = 5.0
+    ):
+        self.redis_manager = redis_manager
+        self.prefix = prefix
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.remote_coalesced = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        distributed: bool = False,
+        encode: Callable[[T], Any] = lambda value: value,
+        decode: Callable[[Any], T] = lambda value: value
+    ) -> T:
+        """Run fn, or wait for the identical call already in flight
+
+        With distributed=True, a Redis lock elects one caller across all
+        processes; the others receive its (JSON-encoded) result over pub/sub.
+        """
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+
+            self.coalesced += 1
+            result = await asyncio.shield(inflight)
+            if result is not _RETRY:
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            if distributed and self.redis_manager.redis_client is not None:
+                result = await self._do_distributed(key, fn, encode, decode)
+            else:
+                self.executions += 1
+                result = await fn()
+        except asyncio.CancelledError:
+            # Waiters shouldn't inherit our cancellation; let one of them take over
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _do_distributed(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[T]],
+        encode: Callable[[T], Any],
+        decode: Callable[[Any], T]
+    ) -> T:
+        client = self.redis_manager.redis_client
+        lock_key = f"{self.prefix}:lock:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        token = uuid.uuid4().hex
+
+        while True:
+            if await client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000)):
+                return await self._lead(client, key, lock_key, result_key, token, fn, encode)
+
+            payload = await self._follow(client, lock_key, result_key)
+            if payload is not None:
+                self.remote_coalesced += 1
+                message = json.loads(payload)
+                if "error" in message:
+                    raise SingleFlightException(message["error"])
+                return decode(message["result"])
+            # Leader vanished without publishing; compete for the lock again
+
+    async def _lead(self, client, key, lock_key, result_key, token, fn, encode):
+        """Execute the call and broadcast its outcome"""
+        self.executions += 1
+        payload = None
+        try:
+            result = await fn()
+            payload = json.dumps({"result": encode(result)})
+            return result
+        except Exception as e:
+            payload = json.dumps({"error": str(e)})
+            raise
+        finally:
+            # On cancellation nothing is published; followers see the lock vanish and retry
+            try:
+                if payload is not None:
+                    pipe = client.pipeline(transaction=False)
+                    pipe.set(result_key, payload, px=int(self.result_ttl * 1000))
+                    pipe.publish(result_key, payload)
+                    await pipe.execute()
+                await client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                logger.warning(f"Single-flight publish failed for {key}: {e}")
+
+    async def _follow(self, client, lock_key: str, result_key: str) -> Optional[str]:
+        """Wait for the leader's result; None if the leader disappeared"""
+        pubsub = client.pubsub()
+        await pubsub.subscribe(result_key)
+        try:
+            deadline = time.monotonic() + self.lock_ttl
+            while time.monotonic() < deadline:
+                # Covers results published before we subscribed
+                payload = await client.get(result_key)
+                if payload is not None:
+                    return payload
+
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None:
+                    return message["data"]
+
+                if not await client.exists(lock_key):
+                    return await client.get(result_key)
+            return None
+        finally:
+            await pubsub.unsubscribe(result_key)
+            await pubsub.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters"""
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "remote_coalesced": self.remote_coalesced,
+        }
+
+
+# Global single-flight instance
+single_flight = SingleFlight(redis_manager)
@@ -5,6 +5,7 @@ Real-time communication for workflow execution and updates
 
 import asyncio
 import json
+import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
@@ -252,6 +253,71 @@ async def emit_workflow_failed(workflow_id: int, execution_id: int, error: str):
     
     await sio.emit('workflow_failed', data, room=f'workflow_{workflow_id}')
 
+class TokenStreamEmitter:
+    """Forwards streamed AI tokens to a workflow room as `workflow_token` frames
+
+    Tokens are buffered and sent at most once per frame interval, so a fast
+    stream costs a few dozen emits per second instead of one per token.
+    """
+    
+    def __init__(self, workflow_id: int, execution_id: int, step_id: str, interval: Optional[float] = None):
+        self.workflow_id = workflow_id
+        self.execution_id = execution_id
+        self.step_id = step_id
+        self.interval = settings.WORKFLOW_TOKEN_FRAME_INTERVAL if interval is None else interval
+        self.frames_sent = 0
+        self._buffer: List[str] = []
+        self._last_emit = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._pending: Optional[asyncio.Task] = None
+    
+    async def push(self, content: str):
+        """Buffer a chunk; emit now if the frame interval has elapsed"""
+        if not content:
+            return
+        self._buffer.append(content)
+        
+        delay = self._last_emit + self.interval - time.monotonic()
+        if delay <= 0:
+            await self.flush()
+        elif self._timer is None:
+            # Don't let a stalled stream hold back already-received text
+            self._timer = asyncio.get_running_loop().call_later(delay, self._flush_later)
+    
+    def _flush_later(self):
+        self._timer = None
+        self._pending = asyncio.ensure_future(self.flush())
+    
+    async def flush(self, done: bool = False):
+        """Emit buffered text as one frame"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer and not done:
+            return
+        
+        content, self._buffer = "".join(self._buffer), []
+        self._last_emit = time.monotonic()
+        self.frames_sent += 1
+        
+        try:
+            await sio.emit('workflow_token', {
+                'workflow_id': self.workflow_id,
+                'execution_id': self.execution_id,
+                'step_id': self.step_id,
+                'seq': self.frames_sent,
+                'content': content,
+                'done': done
+            }, room=f'workflow_{self.workflow_id}')
+        except Exception as e:
+            logger.error(f"Failed to emit workflow tokens: {e}")
+    
+    async def close(self):
+        """Emit remaining text and mark the stream finished"""
+        if self._pending is not None:
+            await self._pending
+        await self.flush(done=True)
+
 # Utility functions
 def mount_websocket(app: FastAPI):
     """Mount WebSocket on FastAPI app"""
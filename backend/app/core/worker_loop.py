@@ -0,0 +1,134 @@
+"""
+Persistent asyncio event loop for Celery workers
+Runs task coroutines on one worker-lifetime loop so async resources stay warm
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, List, Optional
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+LifecycleHook = Callable[[], Awaitable[Any]]
+
+
+class WorkerLoop:
+    """Event loop running in a background thread for the lifetime of a worker process"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks: List[LifecycleHook] = []
+        self._startup_hooks: List[LifecycleHook] = []
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """Running loop, if started"""
+        return self._loop
+
+    def is_running(self) -> bool:
+        """Check if the loop thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def on_startup(self, hook: LifecycleHook):
+        """Register coroutine function run on the loop right after it starts"""
+        self._startup_hooks.append(hook)
+
+    def on_shutdown(self, hook: LifecycleHook):
+        """Register coroutine function run on the loop before it stops"""
+        self._shutdown_hooks.append(hook)
+
+    def start(self):
+        """Start the loop thread (idempotent)"""
+        with self._lock:
+            if self.is_running():
+                return
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._loop = loop
+            self._thread = threading.Thread(target=run_loop, name="worker-event-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+        for hook in self._startup_hooks:
+            try:
+                self.run(hook())
+            except Exception as e:
+                logger.error(f"Worker loop startup hook failed: {e}")
+
+        logger.info("Worker event loop started")
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run coroutine on the worker loop and block until it finishes"""
+        if not self.is_running():
+            self.start()
+
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("WorkerLoop.run() cannot be called from the worker loop itself")
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Soft time limits and timeouts interrupt the caller; don't leave the coroutine running
+            future.cancel()
+            raise
+
+    def stop(self, timeout: float = 10.0):
+        """Run shutdown hooks, then stop and close the loop"""
+        with self._lock:
+            if not self.is_running():
+                return
+            loop, thread = self._loop, self._thread
+
+        for hook in reversed(self._shutdown_hooks):
+            try:
+                asyncio.run_coroutine_threadsafe(hook(), loop).result(timeout)
+            except Exception as e:
+                logger.error(f"Worker loop shutdown hook failed: {e}")
+
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+        with self._lock:
+            if not thread.is_alive():
+                loop.close()
+            self._loop = None
+            self._thread = None
+
+        logger.info("Worker event loop stopped")
+
+
+class TaskStateProxy:
+    """Celery task stand-in whose update_state works from the loop thread
+
+    Task.request is thread-local, so the task id is captured on the
+    Celery thread and passed explicitly.
+    """
+
+    def __init__(self, task):
+        self._task = task
+        self._task_id = task.request.id
+
+    def update_state(self, state: Optional[str] = None, meta: Optional[dict] = None, **kwargs):
+        self._task.update_state(task_id=self._task_id, state=state, meta=meta, **kwargs)
+
+
+# Global worker loop instance
+worker_loop = WorkerLoop()
+
+
+def run_async(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run coroutine on the persistent worker loop"""
+    return worker_loop.run(coro, timeout)
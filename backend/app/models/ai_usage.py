@@ -0,0 +1,38 @@
+"""
+AI usage rollup model for FlowsyAI Backend
+"""
+
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, JSON, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class AIUsageRollup(Base):
+    """Daily AI usage aggregate for one dimension ("all", "model:<provider>:<model>", "user:<id>")"""
+
+    __tablename__ = "ai_usage_rollups"
+    __table_args__ = (UniqueConstraint("day", "dimension", name="uq_ai_usage_rollups_day_dimension"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False, index=True)
+    dimension = Column(String(255), nullable=False, index=True)
+
+    # Counters
+    requests = Column(Integer, default=0, nullable=False)
+    errors = Column(Integer, default=0, nullable=False)
+    cache_hits = Column(Integer, default=0, nullable=False)
+    tokens = Column(BigInteger, default=0, nullable=False)
+    cost = Column(Float, default=0.0, nullable=False)
+
+    # Latency (seconds)
+    latency_sum = Column(Float, default=0.0, nullable=False)
+    latency_histogram = Column(JSON, nullable=True)  # Bucket counts, see app.services.ai_analytics.LATENCY_BUCKETS
+    p50_latency = Column(Float, nullable=True)
+    p95_latency = Column(Float, nullable=True)
+    p99_latency = Column(Float, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<AIUsageRollup(day={self.day}, dimension='{self.dimension}', requests={self.requests})>"
@@ -0,0 +1,98 @@
+"""
+Adaptive concurrency control for FlowsyAI Backend
+AIMD limits on in-flight AI requests driven by latency and throttling
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from app.core.config import settings
+
+
+class AdaptiveConcurrencyLimiter:
+    """Semaphore whose limit grows additively and shrinks multiplicatively
+
+    The limit increases by roughly one per window of successful requests
+    and is cut when the provider throttles (429) or when latency rises
+    well above the best latency seen recently.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        min_limit: float = 1,
+        max_limit: Optional[float] = None,
+        latency_tolerance: Optional[float] = None,
+        throttle_backoff: float = 0.5,
+        congestion_backoff: float = 0.9
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit or settings.AI_MAX_CONCURRENCY)
+        self.latency_tolerance = latency_tolerance or settings.AI_LATENCY_TOLERANCE
+        self.throttle_backoff = throttle_backoff
+        self.congestion_backoff = congestion_backoff
+
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self.throttled_count = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self):
+        """Wait for a free slot under the current limit"""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # We were woken but won't use the slot; pass it on
+                    self._wake_waiters()
+                raise
+        self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False, failed: bool = False):
+        """Free a slot and adapt the limit from the request outcome"""
+        self.in_flight -= 1
+
+        if throttled:
+            self.throttled_count += 1
+            self.limit = max(self.min_limit, self.limit * self.throttle_backoff)
+        elif latency is not None:
+            self._observe_latency(latency, failed)
+
+        self._wake_waiters()
+
+    def _observe_latency(self, latency: float, failed: bool):
+        # Baseline tracks the best recent latency but drifts up so it follows a slower provider
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+        else:
+            self.baseline_latency = min(latency, self.baseline_latency * 1.01)
+
+        if failed or latency > self.baseline_latency * self.latency_tolerance:
+            self.limit = max(self.min_limit, self.limit * self.congestion_backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _wake_waiters(self):
+        available = int(self.limit) - self.in_flight
+        while available > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                available -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter state"""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "baseline_latency": self.baseline_latency,
+            "throttled_count": self.throttled_count,
+        }
@@ -4,23 +4,50 @@ Provides custom models, fine-tuning, and AI model management
 """
 
 import json
+import re
+import uuid
 import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 
 from app.core.logging import get_logger
 from app.core.config import settings
-from app.services.ai_service import AIService
+from app.core.local_cache import LRUCache
+from app.core.redis import cache_manager
+from app.services.ai_orchestrator import AIProvider, AIRequest, orchestrator
+from app.services.ai_router import COST_PER_1K_TOKENS
 
 logger = get_logger(__name__)
 
+# Ensemble members rate their own answer; the rating drives cascade early exit and weighting
+CONFIDENCE_INSTRUCTION = (
+    "\n\nAfter your answer, add a final line \"Confidence: <number from 0 to 1>\" "
+    "saying how likely your answer is to be correct."
+)
+CONFIDENCE_LINE = re.compile(r"\s*\**\s*confidence\s*[:=]\s*\**\s*(\d+(?:\.\d+)?)\s*(%?)\**\s*$", re.IGNORECASE)
+# Confidence of a member whose reply carries no rating
+DEFAULT_CONFIDENCE = 0.5
+
+
+def parse_confidence(content: str) -> tuple:
+    """Split a member reply into its answer and self-reported confidence (None if absent)"""
+    match = CONFIDENCE_LINE.search(content or "")
+    if match is None:
+        return content, None
+    value = float(match.group(1))
+    if match.group(2) or value > 1:
+        value /= 100
+    return content[:match.start()].rstrip(), min(1.0, max(0.0, value))
+
+
 class AdvancedAIService:
     """Service for advanced AI features"""
     
     def __init__(self):
-        self.ai_service = AIService()
         self.custom_models = {}
         self.fine_tuning_jobs = {}
+        # Ensembles are immutable once created, so cached copies never go stale
+        self._ensembles = LRUCache(maxsize=256)
         
     async def create_custom_model(self, model_config: Dict[str, Any]) -> Dict[str, Any]:
         """Create a custom AI model configuration"""
@@ -187,7 +214,7 @@ class AdvancedAIService:
     async def create_model_ensemble(self, ensemble_config: Dict[str, Any]) -> Dict[str, Any]:
         """Create an ensemble of multiple models"""
         try:
-            ensemble_id = f"ensemble_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            ensemble_id = f"ensemble_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
             
             ensemble = {
                 'id': ensemble_id,
@@ -196,6 +223,9 @@ class AdvancedAIService:
                 'models': ensemble_config.get('models', []),
                 'strategy': ensemble_config.get('strategy', 'voting'),  # voting, weighted, cascade
                 'weights': ensemble_config.get('weights', {}),
+                'confidence_threshold': ensemble_config.get(
+                    'confidence_threshold', settings.AI_ENSEMBLE_CONFIDENCE_THRESHOLD
+                ),
                 'created_at': datetime.utcnow().isoformat(),
                 'status': 'active'
             }
@@ -204,6 +234,10 @@ class AdvancedAIService:
             if len(ensemble['models']) < 2:
                 raise ValueError("Ensemble requires at least 2 models")
             
+            if not await cache_manager.set(self._ensemble_key(ensemble_id), ensemble):
+                logger.warning(f"Ensemble {ensemble_id} not persisted, only this process can use it")
+            self._ensembles.set(ensemble_id, ensemble)
+            
             logger.info(f"Created model ensemble: {ensemble_id}")
             return ensemble
             
@@ -212,40 +246,87 @@ class AdvancedAIService:
             raise
     
     async def execute_ensemble_prediction(self, ensemble_id: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute prediction using model ensemble"""
+        """Execute prediction using model ensemble
+        
+        Members run concurrently. Cascade ensembles answer with the first
+        member reaching the confidence threshold, voting ensembles stop once
+        no outstanding vote can change the majority; the remaining members
+        are cancelled in both cases.
+        """
         try:
-            ensemble = self.get_ensemble(ensemble_id)
+            ensemble = await self.get_ensemble(ensemble_id)
             if not ensemble:
                 raise ValueError(f"Ensemble not found: {ensemble_id}")
             
-            predictions = []
-            
-            # Get predictions from all models in ensemble
-            for model_config in ensemble['models']:
-                model_id = model_config['model_id']
-                weight = model_config.get('weight', 1.0)
-                
-                # Get prediction from individual model
-                prediction = await self.ai_service.process_request({
-                    'model': model_id,
-                    'input': input_data
-                })
-                
-                predictions.append({
-                    'model_id': model_id,
-                    'prediction': prediction,
-                    'weight': weight,
-                    'confidence': prediction.get('confidence', 0.5)
-                })
+            strategy = ensemble['strategy']
+            threshold = ensemble.get('confidence_threshold', settings.AI_ENSEMBLE_CONFIDENCE_THRESHOLD)
+            members = ensemble['models']
+            tasks = {
+                asyncio.create_task(self._predict(model_config, input_data)): model_config
+                for model_config in members
+            }
+            pending = set(tasks)
             
-            # Combine predictions based on strategy
-            final_prediction = self._combine_predictions(predictions, ensemble['strategy'])
+            predictions = []
+            failed = []
+            votes = {}
+            decisive = None
+            early_exit = False
+            try:
+                while pending and not early_exit:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        model_config = tasks[task]
+                        model_id = model_config['model_id']
+                        if task.exception() is not None:
+                            logger.warning(f"Ensemble {ensemble_id} member {model_id} failed: {task.exception()}")
+                            failed.append(model_id)
+                            continue
+                        
+                        prediction = task.result()
+                        predictions.append({
+                            'model_id': model_id,
+                            'prediction': prediction,
+                            'weight': model_config.get('weight', 1.0),
+                            'confidence': prediction.get('confidence', DEFAULT_CONFIDENCE)
+                        })
+                        
+                        if strategy == 'cascade' and decisive is None and predictions[-1]['confidence'] >= threshold:
+                            decisive = predictions[-1]
+                            early_exit = True
+                        elif strategy == 'voting':
+                            result = prediction.get('result', '')
+                            votes[result] = votes.get(result, 0) + 1
+                    
+                    if strategy == 'voting' and votes and pending:
+                        early_exit = self._majority_decided(votes, len(pending))
+            finally:
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+            
+            if not predictions:
+                raise RuntimeError(f"All models in ensemble {ensemble_id} failed")
+            
+            # Members finish in any order; combine them in configured order so results don't race
+            order = {model_config['model_id']: index for index, model_config in enumerate(members)}
+            predictions.sort(key=lambda pred: order[pred['model_id']])
+            
+            if decisive is not None:
+                # Answer with the member that crossed the threshold
+                final_prediction = self._combine_predictions([decisive], strategy)
+            else:
+                final_prediction = self._combine_predictions(predictions, strategy, len(members) - len(failed))
             
             return {
                 'ensemble_id': ensemble_id,
                 'individual_predictions': predictions,
                 'final_prediction': final_prediction,
-                'strategy': ensemble['strategy'],
+                'strategy': strategy,
+                'early_exit': early_exit,
+                'cancelled_models': [tasks[task]['model_id'] for task in pending],
+                'failed_models': failed,
                 'timestamp': datetime.utcnow().isoformat()
             }
             
@@ -253,8 +334,69 @@ class AdvancedAIService:
             logger.error(f"Ensemble prediction failed: {e}")
             raise
     
-    def _combine_predictions(self, predictions: List[Dict], strategy: str) -> Dict[str, Any]:
-        """Combine multiple predictions using specified strategy"""
+    @staticmethod
+    def _majority_decided(votes: Dict[str, int], outstanding: int) -> bool:
+        """Whether the leading result wins even if every outstanding vote goes to the runner-up"""
+        counts = sorted(votes.values(), reverse=True)
+        runner_up = counts[1] if len(counts) > 1 else 0
+        return counts[0] > runner_up + outstanding
+    
+    async def _predict(self, model_config: Dict[str, Any], input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Prediction of one ensemble member through the orchestrator"""
+        model_id = model_config['model_id']
+        custom_model = self.custom_models.get(model_id, {})
+        model = custom_model.get('base_model', model_id)
+        
+        prompt = input_data.get('prompt') or json.dumps(input_data)
+        if custom_model.get('prompt_template'):
+            prompt = custom_model['prompt_template'].replace('{input}', prompt)
+        prompt += CONFIDENCE_INSTRUCTION
+        
+        response = await orchestrator.process_request(AIRequest(
+            provider=AIProvider(model_config.get('provider') or self._provider_for(model)),
+            model=model,
+            prompt=prompt,
+            max_tokens=model_config.get('max_tokens', custom_model.get('max_tokens', 1000)),
+            temperature=model_config.get('temperature', custom_model.get('temperature', 0.7)),
+            prompt_prefix=custom_model.get('system_prompt') or None,
+            metadata={'ensemble_member': model_id}
+        ))
+        if not response.success:
+            raise RuntimeError(response.error or f"Model {model_id} failed")
+        
+        result, confidence = parse_confidence(response.content)
+        if confidence is None:
+            confidence = (response.metadata or {}).get('confidence')
+        if confidence is None:
+            logger.debug(f"Ensemble member {model_id} gave no confidence rating")
+        
+        return {
+            'result': result,
+            'confidence': confidence if confidence is not None else DEFAULT_CONFIDENCE,
+            'confidence_reported': confidence is not None,
+            'tokens_used': response.tokens_used,
+            'processing_time': response.processing_time
+        }
+    
+    @staticmethod
+    def _provider_for(model: str) -> str:
+        """Provider serving a model, from the pricing table"""
+        for provider, models in COST_PER_1K_TOKENS.items():
+            if model in models:
+                return provider
+        return AIProvider.OPENAI.value
+    
+    def _combine_predictions(
+        self,
+        predictions: List[Dict],
+        strategy: str,
+        member_count: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Combine multiple predictions using specified strategy
+        
+        member_count is the number of members that could have voted, so a
+        majority decided before every vote is in is not overstated.
+        """
         if strategy == 'voting':
             # Simple majority voting
             votes = {}
@@ -263,7 +405,7 @@ class AdvancedAIService:
                 votes[result] = votes.get(result, 0) + 1
             
             final_result = max(votes.keys(), key=lambda k: votes[k])
-            confidence = votes[final_result] / len(predictions)
+            confidence = votes[final_result] / max(member_count or len(predictions), len(predictions))
             
         elif strategy == 'weighted':
             # Weighted average based on model weights
@@ -375,10 +517,18 @@ class AdvancedAIService:
         """Get fine-tuning job by ID"""
         return self.fine_tuning_jobs.get(job_id)
     
-    def get_ensemble(self, ensemble_id: str) -> Optional[Dict[str, Any]]:
-        """Get ensemble by ID"""
-        # This would typically be stored in database
-        return None
+    async def get_ensemble(self, ensemble_id: str) -> Optional[Dict[str, Any]]:
+        """Get ensemble by ID, from the local cache or Redis"""
+        ensemble = self._ensembles.get(ensemble_id)
+        if ensemble is None:
+            ensemble = await cache_manager.get(self._ensemble_key(ensemble_id))
+            if ensemble is not None:
+                self._ensembles.set(ensemble_id, ensemble)
+        return ensemble
+    
+    @staticmethod
+    def _ensemble_key(ensemble_id: str) -> str:
+        return f"ensemble:{ensemble_id}"
     
     def list_custom_models(self) -> List[Dict[str, Any]]:
         """List all custom models"""
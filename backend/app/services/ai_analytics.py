@@ -0,0 +1,270 @@
+"""
+AI usage analytics for FlowsyAI Backend
+Per-worker aggregates flushed to Redis, with percentile queries from latency histograms
+"""
+
+import asyncio
+import bisect
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.redis import RedisManager, redis_manager
+
+logger = get_logger(__name__)
+
+# Log-spaced latency buckets: 10ms to ~2min, each 25% wider than the last
+# (percentiles are accurate to within one bucket), plus an overflow bucket
+LATENCY_BUCKETS: List[float] = [0.01 * 1.25 ** index for index in range(43)]
+
+COUNTER_FIELDS = ("requests", "errors", "cache_hits", "tokens")
+FLOAT_FIELDS = ("cost", "latency_sum")
+
+
+def _bucket_index(latency: float) -> int:
+    return bisect.bisect_left(LATENCY_BUCKETS, latency)
+
+
+def histogram_percentile(histogram: List[int], percentile: float) -> Optional[float]:
+    """Approximate latency percentile (upper bound of the bucket it falls in)"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = math.ceil(percentile / 100 * total)
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            return LATENCY_BUCKETS[min(index, len(LATENCY_BUCKETS) - 1)]
+    return LATENCY_BUCKETS[-1]
+
+
+@dataclass
+class UsageAggregate:
+    """Counters and latency histogram for one dimension on one day"""
+    requests: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    tokens: int = 0
+    cost: float = 0.0
+    latency_sum: float = 0.0
+    histogram: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def add(self, latency: float, success: bool, tokens: int, cost: float, cache_hit: bool):
+        self.requests += 1
+        self.errors += not success
+        self.cache_hits += cache_hit
+        self.tokens += tokens
+        self.cost += cost
+        self.latency_sum += latency
+        self.histogram[_bucket_index(latency)] += 1
+
+    def merge(self, other: "UsageAggregate"):
+        self.requests += other.requests
+        self.errors += other.errors
+        self.cache_hits += other.cache_hits
+        self.tokens += other.tokens
+        self.cost += other.cost
+        self.latency_sum += other.latency_sum
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def to_fields(self) -> Dict[str, Any]:
+        """Redis hash fields (histogram buckets as h<index>, zero buckets omitted)"""
+        fields = {name: getattr(self, name) for name in COUNTER_FIELDS + FLOAT_FIELDS}
+        fields.update({f"h{index}": count for index, count in enumerate(self.histogram) if count})
+        return fields
+
+    @classmethod
+    def from_fields(cls, fields: Dict[str, Any]) -> "UsageAggregate":
+        aggregate = cls()
+        for name in COUNTER_FIELDS:
+            setattr(aggregate, name, int(fields.get(name, 0)))
+        for name in FLOAT_FIELDS:
+            setattr(aggregate, name, float(fields.get(name, 0.0)))
+        for key, count in fields.items():
+            if key.startswith("h") and key[1:].isdigit() and int(key[1:]) < len(aggregate.histogram):
+                aggregate.histogram[int(key[1:])] = int(count)
+        return aggregate
+
+    def summary(self) -> Dict[str, Any]:
+        """Derived metrics"""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else 0.0,
+            "cache_hits": self.cache_hits,
+            "tokens": self.tokens,
+            "cost": round(self.cost, 6),
+            "avg_cost_per_request": self.cost / self.requests if self.requests else 0.0,
+            "avg_latency": self.latency_sum / self.requests if self.requests else None,
+            "p50_latency": histogram_percentile(self.histogram, 50),
+            "p95_latency": histogram_percentile(self.histogram, 95),
+            "p99_latency": histogram_percentile(self.histogram, 99),
+        }
+
+
+class UsageAnalytics:
+    """Records AI usage per worker and periodically flushes it to Redis
+
+    Updates are plain in-memory increments on the event loop thread, so the
+    hot path takes no locks and does no I/O. Each flush swaps the pending
+    aggregates out and adds them to per-day Redis hashes, one per dimension
+    ("all", "model:<provider>:<model>", "user:<id>"); anything that can't be
+    written is merged back and retried on the next flush.
+    """
+
+    def __init__(self, redis_manager: RedisManager, prefix: str = "ai:usage"):
+        self.redis_manager = redis_manager
+        self.prefix = prefix
+        self._pending: Dict[Tuple[str, str], UsageAggregate] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        user_id: Optional[int],
+        latency: float,
+        success: bool,
+        tokens: int = 0,
+        cost: float = 0.0,
+        cache_hit: bool = False
+    ):
+        """Add one request outcome to today's aggregates"""
+        day = _today()
+        dimensions = ["all", f"model:{provider}:{model}"]
+        if user_id is not None:
+            dimensions.append(f"user:{user_id}")
+
+        for dimension in dimensions:
+            aggregate = self._pending.get((day, dimension))
+            if aggregate is None:
+                aggregate = self._pending[(day, dimension)] = UsageAggregate()
+            aggregate.add(latency, success, tokens, cost, cache_hit)
+
+    def _key(self, day: str, dimension: str) -> str:
+        return f"{self.prefix}:{day}:{dimension}"
+
+    async def flush(self):
+        """Write pending aggregates to Redis"""
+        client = self.redis_manager.redis_client
+        if client is None or not self._pending:
+            self._prune_pending()
+            return
+
+        pending, self._pending = self._pending, {}
+        ttl = settings.AI_USAGE_RETENTION_DAYS * 86400
+        try:
+            # MULTI/EXEC: a failed flush is retried, so it must not have been half applied
+            pipe = client.pipeline(transaction=True)
+            for (day, dimension), aggregate in pending.items():
+                key = self._key(day, dimension)
+                for name, value in aggregate.to_fields().items():
+                    if name in FLOAT_FIELDS:
+                        pipe.hincrbyfloat(key, name, value)
+                    elif value:
+                        pipe.hincrby(key, name, value)
+                pipe.expire(key, ttl)
+                pipe.sadd(self._key(day, "dimensions"), dimension)
+                pipe.expire(self._key(day, "dimensions"), ttl)
+            await pipe.execute()
+        except Exception as e:
+            # Keep the data for the next attempt
+            for bucket, aggregate in pending.items():
+                current = self._pending.get(bucket)
+                if current is None:
+                    self._pending[bucket] = aggregate
+                else:
+                    current.merge(aggregate)
+            logger.warning(f"Failed to flush AI usage analytics: {e}")
+
+    def _prune_pending(self):
+        # Without Redis, pending data is all there is; keep it for the retention period
+        oldest = (datetime.utcnow().date() - timedelta(days=settings.AI_USAGE_RETENTION_DAYS)).isoformat()
+        for bucket in [bucket for bucket in self._pending if bucket[0] < oldest]:
+            del self._pending[bucket]
+
+    async def _flush_periodically(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    def start(self, interval: Optional[float] = None):
+        """Start periodic flushing on the running loop"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(
+                self._flush_periodically(interval or settings.AI_USAGE_FLUSH_INTERVAL)
+            )
+
+    async def stop(self):
+        """Stop periodic flushing and flush what is left"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def get_aggregates(self, dimensions: List[str], day: Optional[str] = None) -> Dict[str, UsageAggregate]:
+        """Aggregates per dimension for a day: flushed data plus this worker's pending data"""
+        day = day or _today()
+        aggregates = {dimension: UsageAggregate() for dimension in dimensions}
+
+        client = self.redis_manager.redis_client
+        if client is not None and dimensions:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for dimension in dimensions:
+                    pipe.hgetall(self._key(day, dimension))
+                for dimension, fields in zip(dimensions, await pipe.execute()):
+                    aggregates[dimension].merge(UsageAggregate.from_fields(fields))
+            except Exception as e:
+                logger.warning(f"Failed to read AI usage analytics: {e}")
+
+        for dimension in dimensions:
+            pending = self._pending.get((day, dimension))
+            if pending is not None:
+                aggregates[dimension].merge(pending)
+        return aggregates
+
+    async def get_summary(self, dimension: str = "all", day: Optional[str] = None) -> Dict[str, Any]:
+        """Counts, error rate, cost and p50/p95/p99 latency for one dimension/day"""
+        return (await self.get_aggregates([dimension], day))[dimension].summary()
+
+    async def get_dimensions(self, day: Optional[str] = None, kind: Optional[str] = None) -> List[str]:
+        """Dimensions with data on a day, optionally only one kind ("model" or "user")"""
+        day = day or _today()
+        dimensions = {dimension for pending_day, dimension in self._pending if pending_day == day}
+
+        client = self.redis_manager.redis_client
+        if client is not None:
+            try:
+                dimensions.update(await client.smembers(self._key(day, "dimensions")))
+            except Exception as e:
+                logger.warning(f"Failed to read AI usage dimensions: {e}")
+
+        if kind:
+            dimensions = {dimension for dimension in dimensions if dimension.startswith(f"{kind}:")}
+        return sorted(dimensions)
+
+    async def get_breakdown(self, kind: str = "model", day: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Summary per model (provider:model) or per user id"""
+        aggregates = await self.get_aggregates(await self.get_dimensions(day, kind), day)
+        return {dimension.split(":", 1)[1]: aggregate.summary() for dimension, aggregate in aggregates.items()}
+
+    async def get_day(self, day: str) -> Dict[str, UsageAggregate]:
+        """Every dimension's aggregate for a day"""
+        return await self.get_aggregates(await self.get_dimensions(day), day)
+
+
+def _today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+
+# Global usage analytics instance
+usage_analytics = UsageAnalytics(redis_manager)
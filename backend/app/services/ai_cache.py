@@ -0,0 +1,127 @@
+"""
+AI Response Cache for FlowsyAI Backend
+Exact-match caching of provider responses (in-process LRU in front of Redis)
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+from app.core.config import settings
+from app.core.local_cache import LRUCache
+from app.core.logging import get_logger
+from app.core.redis import CacheManager, cache_manager
+
+if TYPE_CHECKING:
+    from app.services.ai_orchestrator import AIRequest, AIResponse
+
+logger = get_logger(__name__)
+
+
+class AIResponseCache:
+    """Two-tier exact-match cache for deterministic AI requests"""
+
+    def __init__(self, cache: CacheManager, local_size: int, ttl: int, prefix: str = "ai:response"):
+        self.cache = cache
+        self.ttl = ttl
+        self.prefix = prefix
+        self.local = LRUCache(local_size, ttl=ttl)
+        self.memory_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def is_cacheable(self, request: "AIRequest") -> bool:
+        """Cache deterministic requests, or any request whose metadata opts in/out explicitly"""
+        opt_in = (request.metadata or {}).get("cache")
+        if opt_in is not None:
+            return bool(opt_in)
+        return request.temperature == 0
+
+    def make_key(self, request: "AIRequest") -> str:
+        """Hash of the normalized request"""
+        normalized = {
+            "provider": request.provider.value,
+            "model": request.model.strip().lower(),
+            "temperature": round(float(request.temperature), 4),
+            "max_tokens": request.max_tokens,
+            "prompt": request.full_prompt.strip(),
+        }
+        payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+        return f"{self.prefix}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+    async def get(self, key: str) -> Optional["AIResponse"]:
+        """Look up response in memory, then Redis"""
+        data = self.local.get(key)
+        tier = "memory"
+
+        if data is None and self.cache.client is not None:
+            data = await self.cache.get(key)
+            tier = "redis"
+            if data is not None:
+                self.local.set(key, data)
+
+        if data is None:
+            self.misses += 1
+            return None
+
+        if tier == "memory":
+            self.memory_hits += 1
+        else:
+            self.redis_hits += 1
+
+        response = response_from_dict(data)
+        response.metadata = {**(response.metadata or {}), "cache_hit": True, "cache_tier": tier}
+        return response
+
+    async def set(self, key: str, response: "AIResponse"):
+        """Store successful response in both tiers"""
+        data = response_to_dict(response)
+        self.local.set(key, data)
+        if self.cache.client is not None:
+            await self.cache.set(key, data, ttl=self.ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        hits = self.memory_hits + self.redis_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "local_size": len(self.local),
+        }
+
+
+def response_to_dict(response: "AIResponse") -> Dict[str, Any]:
+    """Serialize successful response to JSON-safe dict"""
+    return {
+        "content": response.content,
+        "provider": response.provider.value if response.provider else None,
+        "model": response.model,
+        "tokens_used": response.tokens_used,
+        "metadata": response.metadata or {},
+    }
+
+
+def response_from_dict(data: Dict[str, Any]) -> "AIResponse":
+    """Rebuild successful response from response_to_dict output"""
+    from app.services.ai_orchestrator import AIProvider, AIResponse
+
+    return AIResponse(
+        success=True,
+        content=data.get("content"),
+        provider=AIProvider(data["provider"]) if data.get("provider") else None,
+        model=data.get("model"),
+        tokens_used=data.get("tokens_used", 0),
+        metadata=dict(data.get("metadata") or {}),
+    )
+
+
+# Global response cache instance
+response_cache = AIResponseCache(
+    cache_manager,
+    local_size=settings.AI_RESPONSE_CACHE_LOCAL_SIZE,
+    ttl=settings.AI_RESPONSE_CACHE_TTL,
+)
@@ -5,14 +5,34 @@ Manages AI service calls, rate limiting, and response processing
 
 import asyncio
 import aiohttp
+import json
 import time
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass
+import numpy as np
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, replace
 from enum import Enum
 
 from app.core.config import settings
+from app.core.http_client import http_client
 from app.core.logging import get_logger
-from app.core.exceptions import AIServiceException
+from app.core.rate_limiter import rate_limiter
+from app.core.single_flight import single_flight
+from app.core.exceptions import (
+    AIServiceException,
+    AIProviderHTTPException,
+    CircuitOpenException,
+    ContextLengthExceededException,
+    DeadlineExceededException
+)
+from app.services.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from app.services.ai_analytics import usage_analytics
+from app.services.ai_cache import response_cache, response_from_dict, response_to_dict
+from app.services.ai_router import ai_router, get_cost_per_1k_tokens, RouteConstraints, RouteStrategy
+from app.services.ai_scheduler import RequestPriority, token_scheduler
+from app.services.circuit_breaker import circuit_breaker
+from app.services.hedging import hedge_budget, latency_tracker
+from app.services.retry import RetryState, is_retryable, retry_stats
+from app.services.tokenizer import get_context_limit, token_counter
 
 logger = get_logger(__name__)
 
@@ -34,6 +54,14 @@ class AIRequest:
     temperature: float = 0.7
     user_id: int = None
     metadata: Dict[str, Any] = None
+    priority: RequestPriority = RequestPriority.NORMAL
+    deadline: Optional[float] = None  # Absolute (epoch seconds); dropped once passed
+    prompt_prefix: Optional[str] = None  # Shared leading part of the prompt; prompt then holds the rest
+    
+    @property
+    def full_prompt(self) -> str:
+        """Prompt as sent to the model"""
+        return self.prompt_prefix + self.prompt if self.prompt_prefix else self.prompt
 
 
 @dataclass
@@ -49,37 +77,184 @@ class AIResponse:
     metadata: Dict[str, Any] = None
 
 
+@dataclass
+class AIStreamChunk:
+    """Incremental piece of a streamed AI response"""
+    content: str = ""
+    tokens_used: Optional[int] = None
+
+
+# Process-wide adaptive concurrency limits, learned per provider
+concurrency_limiters: Dict[AIProvider, AdaptiveConcurrencyLimiter] = {}
+
+# Default routing strategy for batch_process_optimized priorities
+PRIORITY_STRATEGIES = {
+    "high": RouteStrategy.FASTEST,
+    "normal": RouteStrategy.BALANCED,
+    "low": RouteStrategy.CHEAPEST,
+}
+
+# Time-to-first-byte of streamed requests, per provider
+ttfb_stats: Dict[AIProvider, Dict[str, float]] = {}
+
+
 class AIOrchestrator:
     """AI Services Orchestrator"""
     
     def __init__(self):
-        self.session: Optional[aiohttp.ClientSession] = None
-        self.rate_limits = {
-            AIProvider.OPENAI: {"requests": 0, "reset_time": 0},
-            AIProvider.ANTHROPIC: {"requests": 0, "reset_time": 0},
-            AIProvider.GOOGLE: {"requests": 0, "reset_time": 0},
-        }
+        self.rate_limiter = rate_limiter
     
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30)
-        )
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit"""
-        if self.session:
-            await self.session.close()
+        """Async context manager exit (pooled sessions outlive the orchestrator)"""
+        pass
+    
+    async def _get_session(self, provider: AIProvider) -> aiohttp.ClientSession:
+        """Get the shared, keep-alive connection pool for a provider"""
+        return await http_client.get_session(provider.value)
     
     async def process_request(self, request: AIRequest) -> AIResponse:
         """Process AI request with appropriate provider"""
         start_time = time.time()
+        cache_key = None
         
         try:
-            # Check rate limits
-            await self._check_rate_limit(request.provider)
+            # Serve identical deterministic requests from cache
+            if response_cache.is_cacheable(request):
+                cache_key = response_cache.make_key(request)
+                cached = await response_cache.get(cache_key)
+                if cached:
+                    cached.processing_time = time.time() - start_time
+                    self._record_usage(request, cached)
+                    return cached
+            
+            if self._should_coalesce(request):
+                response, leader = await self._call_provider_coalesced(request)
+            else:
+                response, leader = await self._call_provider(request), True
+            
+            if cache_key and response.success and leader:
+                await response_cache.set(cache_key, response)
+                response.metadata = {**(response.metadata or {}), "cache_hit": False}
+            
+            response.processing_time = time.time() - start_time
+            if response.success:
+                latency_tracker.observe(request.provider.value, request.model, response.processing_time)
+            ai_router.observe(request.provider.value, request.model, response.processing_time, response.success)
+            self._record_usage(request, response)
+            return response
+            
+        except Exception as e:
+            logger.error(f"AI request failed: {str(e)}")
+            rejected = isinstance(e, (CircuitOpenException, ContextLengthExceededException, DeadlineExceededException))
+            if not rejected:
+                ai_router.observe(request.provider.value, request.model, time.time() - start_time, False)
+            response = AIResponse(
+                success=False,
+                error=str(e),
+                provider=request.provider,
+                model=request.model,
+                processing_time=time.time() - start_time,
+                metadata={
+                    "status_code": getattr(e, "status", None),
+                    "circuit_open": isinstance(e, CircuitOpenException),
+                    "rejected": rejected,
+                    **getattr(e, "retry_metadata", {})
+                }
+            )
+            self._record_usage(request, response)
+            return response
+    
+    def _should_coalesce(self, request: AIRequest) -> bool:
+        """Coalesce by default; metadata can opt a request out (or in)"""
+        opt_in = (request.metadata or {}).get("coalesce")
+        if opt_in is not None:
+            return bool(opt_in)
+        return settings.AI_COALESCE_REQUESTS
+
+    async def _call_provider_coalesced(self, request: AIRequest) -> Tuple[AIResponse, bool]:
+        """Share one provider call among identical concurrent requests
+
+        Returns the response (a private copy for each caller) and whether
+        this caller made the provider call itself.
+        """
+        leader = False
+
+        async def call() -> AIResponse:
+            nonlocal leader
+            leader = True
+            return await self._call_provider(request)
+
+        # Keep priority classes apart so interactive callers never wait on a queued batch leader
+        response = await single_flight.do(
+            f"{response_cache.make_key(request)}:{int(request.priority)}",
+            call,
+            distributed=settings.AI_COALESCE_DISTRIBUTED,
+            encode=response_to_dict,
+            decode=response_from_dict
+        )
+
+        metadata = dict(response.metadata or {})
+        if not leader:
+            metadata["coalesced"] = True
+        return replace(response, metadata=metadata), leader
+
+    async def _call_provider(self, request: AIRequest) -> AIResponse:
+        """Call the provider, retrying transient failures with backoff
+        
+        Throttling absorbed by retries and the time spent backing off are
+        reported in the response metadata ("throttled", "retry_wait"), or on
+        the raised error as retry_metadata, for the concurrency limiter.
+        """
+        retry = self._retry_state(request)
+        throttled = False
+        retry_wait = 0.0
+        while True:
+            try:
+                response = await self._call_provider_once(request)
+            except Exception as e:
+                throttled = throttled or getattr(e, "status", None) == 429
+                delay = retry.next_delay(e)
+                if delay is None:
+                    if is_retryable(e):
+                        retry_stats.record(request.provider.value, "exhausted")
+                    if retry.attempts > 1:
+                        e.retry_metadata = {
+                            "retries": retry.attempts - 1,
+                            "throttled": throttled,
+                            "retry_wait": retry_wait
+                        }
+                    raise
+                retry_stats.record(request.provider.value, "retries")
+                logger.info(f"Retrying {request.provider.value} request in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+                retry_wait += delay
+                continue
             
+            if retry.attempts:
+                retry_stats.record(request.provider.value, "recovered")
+                response.metadata = {
+                    **(response.metadata or {}),
+                    "retries": retry.attempts,
+                    "throttled": throttled,
+                    "retry_wait": retry_wait
+                }
+            return response
+    
+    def _retry_state(self, request: AIRequest) -> RetryState:
+        """Retries are on by default; metadata {"retry": False} makes a single attempt"""
+        max_attempts = None if (request.metadata or {}).get("retry", True) else 1
+        return RetryState(max_attempts=max_attempts, deadline=request.deadline)
+    
+    async def _call_provider_once(self, request: AIRequest) -> AIResponse:
+        """Rate-limit and dispatch request to its provider through its circuit breaker"""
+        circuit_key = await self._admit(request)
+        
+        start_time = time.monotonic()
+        try:
             # Route to appropriate provider
             if request.provider == AIProvider.OPENAI:
                 response = await self._process_openai(request)
@@ -89,68 +264,273 @@ class AIOrchestrator:
                 response = await self._process_google(request)
             else:
                 raise AIServiceException("unknown", f"Unsupported provider: {request.provider}")
+        except asyncio.CancelledError:
+            circuit_breaker.abandon(circuit_key)
+            raise
+        except Exception as e:
+            await circuit_breaker.record(
+                circuit_key,
+                success=not self._is_provider_failure(e),
+                latency=time.monotonic() - start_time,
+                error=str(e)
+            )
+            raise
+        
+        await circuit_breaker.record(circuit_key, success=True, latency=time.monotonic() - start_time)
+        return response
+    
+    async def _admit(self, request: AIRequest) -> str:
+        """Deadline, context, circuit and rate-limit checks before a provider call; returns the circuit key
+        
+        The caller must record the call's outcome with the circuit breaker,
+        or abandon() it if the call never completes.
+        """
+        if request.deadline is not None and request.deadline <= time.time():
+            raise DeadlineExceededException("Request deadline passed before dispatch")
+        await self._check_context(request)
+        
+        circuit_key = self._circuit_key(request)
+        if not await circuit_breaker.allow_request(circuit_key):
+            raise CircuitOpenException(request.provider.value, circuit_breaker.retry_after(circuit_key))
+        
+        try:
+            # Check rate limits (in priority order; expired requests are dropped here)
+            await self._check_rate_limit(request)
+        except BaseException:
+            circuit_breaker.abandon(circuit_key)
+            raise
+        return circuit_key
+    
+    async def _check_context(self, request: AIRequest):
+        """Reject requests that can't fit the model's context window before spending a call"""
+        if not settings.AI_CONTEXT_PREFLIGHT:
+            return
+        args = (request.provider.value, request.model, request.full_prompt, request.max_tokens or 0)
+        if token_counter.fits_without_counting(*args):
+            return
+        # Tokenizing long prompts (and loading a tiktoken encoding on first use) would block the loop
+        await asyncio.to_thread(token_counter.check_context, *args)
+    
+    def _circuit_key(self, request: AIRequest) -> str:
+        return f"{request.provider.value}:{request.model}"
+    
+    def _is_provider_failure(self, error: Exception) -> bool:
+        """Errors that say the provider is unhealthy (not that the request was bad or throttled)"""
+        if isinstance(error, AIProviderHTTPException):
+            return error.status >= 500
+        return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+    
+    async def stream_request(self, request: AIRequest) -> AsyncIterator[AIStreamChunk]:
+        """Stream response chunks, retrying transient failures that happen before the first chunk"""
+        retry = self._retry_state(request)
+        while True:
+            started = False
+            try:
+                async for chunk in self._stream_request_once(request):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                # Once output has reached the caller, a retry would duplicate it
+                delay = None if started else retry.next_delay(e)
+                if delay is None:
+                    raise
+                retry_stats.record(request.provider.value, "retries")
+                logger.info(f"Retrying {request.provider.value} stream in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+    
+    async def _stream_request_once(self, request: AIRequest) -> AsyncIterator[AIStreamChunk]:
+        """Stream through the same admission checks as _call_provider_once
+        
+        The circuit breaker sees the stream's outcome, with time to first
+        chunk as its latency: a long generation isn't a slow provider.
+        """
+        circuit_key = await self._admit(request)
+        
+        start_time = time.monotonic()
+        latency = None
+        try:
+            if request.provider == AIProvider.OPENAI and settings.OPENAI_API_KEY:
+                chunks = self._stream_openai(request)
+            elif request.provider == AIProvider.ANTHROPIC and settings.ANTHROPIC_API_KEY:
+                chunks = self._stream_anthropic(request)
+            elif request.provider in AIProvider:
+                chunks = self._stream_mock(request)
+            else:
+                raise AIServiceException("unknown", f"Unsupported provider: {request.provider}")
+            
+            async for chunk in chunks:
+                if latency is None:
+                    latency = time.monotonic() - start_time
+                yield chunk
+        except Exception as e:
+            await circuit_breaker.record(
+                circuit_key,
+                success=not self._is_provider_failure(e),
+                latency=latency if latency is not None else time.monotonic() - start_time,
+                error=str(e)
+            )
+            raise
+        except BaseException:
+            # Cancelled, or the consumer stopped reading
+            circuit_breaker.abandon(circuit_key)
+            raise
+        
+        await circuit_breaker.record(
+            circuit_key,
+            success=True,
+            latency=latency if latency is not None else time.monotonic() - start_time
+        )
+    
+    async def process_request_stream(
+        self,
+        request: AIRequest,
+        on_chunk: Callable[[str], Awaitable[None]]
+    ) -> AIResponse:
+        """Process request in streaming mode, handing each chunk to on_chunk as it arrives"""
+        start_time = time.time()
+        cache_key = None
+        
+        try:
+            if response_cache.is_cacheable(request):
+                cache_key = response_cache.make_key(request)
+                cached = await response_cache.get(cache_key)
+                if cached:
+                    await on_chunk(cached.content or "")
+                    cached.processing_time = time.time() - start_time
+                    self._record_usage(request, cached)
+                    return cached
+            
+            parts = []
+            tokens_used = 0
+            ttfb = None
+            async for chunk in self.stream_request(request):
+                if chunk.tokens_used is not None:
+                    tokens_used = chunk.tokens_used
+                if not chunk.content:
+                    continue
+                if ttfb is None:
+                    ttfb = time.time() - start_time
+                    self._record_ttfb(request.provider, ttfb)
+                parts.append(chunk.content)
+                await on_chunk(chunk.content)
+            
+            response = AIResponse(
+                success=True,
+                content="".join(parts),
+                provider=request.provider,
+                model=request.model,
+                tokens_used=tokens_used,
+                metadata={"streamed": True, "ttfb": ttfb}
+            )
+            
+            if cache_key:
+                await response_cache.set(cache_key, response)
             
             response.processing_time = time.time() - start_time
+            ai_router.observe(request.provider.value, request.model, response.processing_time, True)
+            self._record_usage(request, response)
             return response
             
         except Exception as e:
-            logger.error(f"AI request failed: {str(e)}")
-            return AIResponse(
+            logger.error(f"AI streaming request failed: {str(e)}")
+            response = AIResponse(
                 success=False,
                 error=str(e),
                 provider=request.provider,
                 model=request.model,
-                processing_time=time.time() - start_time
+                processing_time=time.time() - start_time,
+                metadata={"status_code": getattr(e, "status", None), "streamed": True}
             )
+            self._record_usage(request, response)
+            return response
+    
+    def _record_usage(self, request: AIRequest, response: AIResponse):
+        """Add a finished request to usage analytics (cache hits cost nothing)"""
+        cache_hit = bool((response.metadata or {}).get("cache_hit"))
+        tokens = 0 if cache_hit else response.tokens_used
+        usage_analytics.record(
+            request.provider.value,
+            request.model,
+            request.user_id,
+            latency=response.processing_time,
+            success=response.success,
+            tokens=tokens,
+            cost=tokens / 1000 * self._get_cost_per_1k_tokens(request.provider, request.model),
+            cache_hit=cache_hit
+        )
+    
+    def _record_ttfb(self, provider: AIProvider, ttfb: float):
+        stats = ttfb_stats.setdefault(provider, {"count": 0, "total": 0.0, "last": 0.0})
+        stats["count"] += 1
+        stats["total"] += ttfb
+        stats["last"] = ttfb
     
     async def batch_process(self, requests: List[AIRequest]) -> List[AIResponse]:
-        """Process multiple AI requests concurrently with optimization"""
+        """Process multiple AI requests through per-provider adaptive concurrency windows"""
         if not requests:
             return []
 
-        # Group requests by provider for optimization
-        provider_groups = {}
-        for i, request in enumerate(requests):
-            provider = request.provider
-            if provider not in provider_groups:
-                provider_groups[provider] = []
-            provider_groups[provider].append((i, request))
-
-        # Process each provider group with rate limiting
-        all_responses = [None] * len(requests)
-
-        for provider, provider_requests in provider_groups.items():
-            # Batch size based on provider limits
-            batch_size = self._get_batch_size(provider)
-
-            for i in range(0, len(provider_requests), batch_size):
-                batch = provider_requests[i:i + batch_size]
-
-                # Process batch concurrently
-                tasks = [self.process_request(request) for _, request in batch]
-                responses = await asyncio.gather(*tasks, return_exceptions=True)
-
-                # Store responses in correct positions
-                for j, (original_index, _) in enumerate(batch):
-                    response = responses[j]
-                    if isinstance(response, Exception):
-                        all_responses[original_index] = AIResponse(
-                            success=False,
-                            error=str(response),
-                            provider=batch[j][1].provider,
-                            model=batch[j][1].model
-                        )
-                    else:
-                        all_responses[original_index] = response
+        # Sliding window: each request starts as soon as its provider has a free slot,
+        # gather keeps results in the original order
+        return await asyncio.gather(*(self._process_with_limiter(request) for request in requests))
 
-                # Add delay between batches to respect rate limits
-                if i + batch_size < len(provider_requests):
-                    await asyncio.sleep(1)
+    async def _process_with_limiter(self, request: AIRequest) -> AIResponse:
+        """Process request under its provider's adaptive concurrency limit"""
+        circuit_key = self._circuit_key(request)
+        if circuit_breaker.is_open(circuit_key):
+            # Fail fast without occupying a concurrency slot
+            return self._circuit_open_response(request, circuit_key)
+        
+        limiter = self._get_concurrency_limiter(request.provider)
+        await limiter.acquire()
 
-        return all_responses
+        start_time = time.monotonic()
+        response = None
+        try:
+            response = await self.process_request(request)
+        except Exception as e:
+            response = AIResponse(
+                success=False,
+                error=str(e),
+                provider=request.provider,
+                model=request.model
+            )
+        finally:
+            metadata = (response.metadata or {}) if response else {}
+            status_code = metadata.get("status_code")
+            # Cache hits and circuit rejections say nothing about provider latency;
+            # retry backoff is our own waiting, not the provider's
+            skip_latency = metadata.get("cache_hit") or metadata.get("rejected")
+            latency = time.monotonic() - start_time - metadata.get("retry_wait", 0.0)
+            limiter.release(
+                latency=None if skip_latency else max(0.0, latency),
+                throttled=status_code == 429 or bool(metadata.get("throttled")),
+                failed=response is None or (status_code is not None and status_code >= 500)
+            )
+
+        return response
+
+    def _circuit_open_response(self, request: AIRequest, circuit_key: str) -> AIResponse:
+        error = CircuitOpenException(request.provider.value, circuit_breaker.retry_after(circuit_key))
+        return AIResponse(
+            success=False,
+            error=str(error),
+            provider=request.provider,
+            model=request.model,
+            metadata={"status_code": None, "circuit_open": True, "rejected": True}
+        )
+
+    def _get_concurrency_limiter(self, provider: AIProvider) -> AdaptiveConcurrencyLimiter:
+        """Get the process-wide concurrency limiter for a provider"""
+        limiter = concurrency_limiters.get(provider)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(initial_limit=self._get_batch_size(provider))
+            concurrency_limiters[provider] = limiter
+        return limiter
 
     def _get_batch_size(self, provider: AIProvider) -> int:
-        """Get optimal batch size for provider"""
+        """Get initial concurrency for provider"""
         batch_sizes = {
             AIProvider.OPENAI: 5,
             AIProvider.ANTHROPIC: 3,
@@ -159,54 +539,105 @@ class AIOrchestrator:
         return batch_sizes.get(provider, 5)
 
     async def batch_process_optimized(self, requests: List[AIRequest], priority: str = "normal") -> List[AIResponse]:
-        """Advanced batch processing with priority and optimization"""
+        """Advanced batch processing with priority and optimization
+
+        Routing is opt-in: only requests whose metadata carries "route"
+        constraints are re-routed, and priority is the strategy they get when
+        the constraints don't name one ("high" = fastest, "low" = cheapest).
+        Every other request keeps the provider and model the caller chose.
+        """
         if not requests:
             return []
 
-        # Sort requests by priority and estimated processing time
-        sorted_requests = self._optimize_request_order(requests, priority)
-
-        # Use smart batching
-        return await self.batch_process(sorted_requests)
-
-    def _optimize_request_order(self, requests: List[AIRequest], priority: str) -> List[AIRequest]:
-        """Optimize request order for better performance"""
-        # Sort by provider to group similar requests
-        # Then by estimated complexity (token count)
-        def sort_key(request):
-            provider_priority = {
-                AIProvider.OPENAI: 1,
-                AIProvider.ANTHROPIC: 2,
-                AIProvider.GOOGLE: 3,
-            }
+        strategy = PRIORITY_STRATEGIES.get(priority, RouteStrategy.BALANCED)
+        routed_requests = [
+            self.route_request(request, RouteConstraints.from_dict(request.metadata["route"], strategy))
+            if isinstance((request.metadata or {}).get("route"), dict) else request
+            for request in requests
+        ]
+
+        # Sort requests by estimated processing time
+        ordered = self._optimize_request_order(routed_requests)
+        responses = await self.batch_process([request for _, request in ordered])
+
+        # Return responses in the caller's order
+        results: List[Optional[AIResponse]] = [None] * len(requests)
+        for (index, _), response in zip(ordered, responses):
+            results[index] = response
+        return results
+
+    def _optimize_request_order(self, requests: List[AIRequest]) -> List[Tuple[int, AIRequest]]:
+        """Shortest expected job first, keeping each request's original index"""
+        def sort_key(item):
+            _, request = item
+            expected = ai_router.expected_latency(request.provider.value, request.model)
+            return expected * (request.max_tokens or 1000) / 1000
+
+        return sorted(enumerate(requests), key=sort_key)
 
-            complexity = len(request.prompt) + (request.max_tokens or 1000)
+    def route_request(self, request: AIRequest, constraints: Optional[RouteConstraints] = None) -> AIRequest:
+        """Copy of request sent to the best provider/model for the constraints"""
+        ranked = ai_router.rank(constraints or RouteConstraints())
+        if not ranked:
+            return request
+        provider, model = ranked[0]
+        return replace(request, provider=AIProvider(provider), model=model)
 
-            return (provider_priority.get(request.provider, 999), complexity)
+    async def process_routed(self, request: AIRequest, constraints: Optional[RouteConstraints] = None) -> AIResponse:
+        """Process request on the best provider/model, falling back down the ranking"""
+        ranked = ai_router.rank(constraints or RouteConstraints())[:settings.AI_ROUTER_MAX_ATTEMPTS]
+        if not ranked:
+            return await self.process_request(request)
 
-        return sorted(requests, key=sort_key)
+        response = None
+        for provider, model in ranked:
+            response = await self.process_request(replace(request, provider=AIProvider(provider), model=model))
+            if response.success:
+                return response
 
-    async def process_with_fallback(self, request: AIRequest, fallback_providers: List[AIProvider] = None) -> AIResponse:
-        """Process request with fallback providers"""
-        providers_to_try = [request.provider]
-        if fallback_providers:
-            providers_to_try.extend(fallback_providers)
+        return self._all_providers_failed(request, response.error)
+
+    async def process_with_fallback(
+        self,
+        request: AIRequest,
+        fallback_providers: List[AIProvider] = None,
+        hedge: bool = False
+    ) -> AIResponse:
+        """Process request with fallback providers
+
+        With hedge=True a fallback is also started while the current attempt is
+        still running once it exceeds that provider/model's learned latency
+        percentile; the first success wins and the other calls are cancelled.
+        """
+        candidates = [request]
+        for provider in fallback_providers or []:
+            candidates.append(AIRequest(
+                provider=provider,
+                model=self._get_fallback_model(provider),
+                prompt=request.prompt,
+                prompt_prefix=request.prompt_prefix,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                user_id=request.user_id,
+                metadata=request.metadata,
+                priority=request.priority,
+                deadline=request.deadline
+            ))
+
+        # Skip providers whose circuit is open (unless every one of them is)
+        candidates = [
+            candidate for candidate in candidates
+            if not circuit_breaker.is_open(self._circuit_key(candidate))
+        ] or candidates
+
+        if hedge:
+            return await self._process_hedged(candidates)
 
         last_error = None
 
-        for provider in providers_to_try:
+        for candidate in candidates:
             try:
-                fallback_request = AIRequest(
-                    provider=provider,
-                    model=self._get_fallback_model(provider),
-                    prompt=request.prompt,
-                    max_tokens=request.max_tokens,
-                    temperature=request.temperature,
-                    user_id=request.user_id,
-                    metadata=request.metadata
-                )
-
-                response = await self.process_request(fallback_request)
+                response = await self.process_request(candidate)
                 if response.success:
                     return response
 
@@ -216,6 +647,71 @@ class AIOrchestrator:
                 last_error = str(e)
                 continue
 
+        return self._all_providers_failed(request, last_error)
+
+    async def _process_hedged(self, candidates: List[AIRequest]) -> AIResponse:
+        """Race candidates, starting the next one on failure or when the latest is slow"""
+        hedge_budget.record_request()
+        remaining = list(candidates)
+        in_flight: Dict[asyncio.Task, AIRequest] = {}
+        hedged = set()
+        last_error = None
+        hedge_at = None
+
+        def launch(candidate: AIRequest, is_hedge: bool = False):
+            nonlocal hedge_at
+            task = asyncio.ensure_future(self.process_request(candidate))
+            in_flight[task] = candidate
+            if is_hedge:
+                hedged.add(task)
+            hedge_at = time.monotonic() + self._get_hedge_delay(candidate) if remaining else None
+
+        try:
+            launch(remaining.pop(0))
+
+            while in_flight:
+                timeout = max(0.0, hedge_at - time.monotonic()) if hedge_at is not None else None
+                done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Latest attempt is slower than usual: hedge if the budget allows
+                    if hedge_budget.try_spend():
+                        launch(remaining.pop(0), is_hedge=True)
+                    else:
+                        hedge_at = None
+                    continue
+
+                for task in done:
+                    in_flight.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        last_error = str(e)
+                        continue
+
+                    if response.success:
+                        if task in hedged:
+                            response.metadata = {**(response.metadata or {}), "hedged": True}
+                        return response
+                    last_error = response.error
+
+                # Plain fallback once nothing is left running
+                if not in_flight and remaining:
+                    launch(remaining.pop(0))
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+        return self._all_providers_failed(candidates[0], last_error)
+
+    def _get_hedge_delay(self, request: AIRequest) -> float:
+        """Seconds to wait on an attempt before hedging it"""
+        delay = latency_tracker.percentile(request.provider.value, request.model, settings.AI_HEDGE_PERCENTILE)
+        return delay if delay is not None else settings.AI_HEDGE_DEFAULT_DELAY
+
+    def _all_providers_failed(self, request: AIRequest, last_error: Optional[str]) -> AIResponse:
         return AIResponse(
             success=False,
             error=f"All providers failed. Last error: {last_error}",
@@ -233,102 +729,167 @@ class AIOrchestrator:
         return fallback_models.get(provider, "gpt-3.5-turbo")
 
     async def estimate_cost(self, requests: List[AIRequest]) -> Dict[str, Any]:
-        """Estimate cost for batch of requests"""
+        """Estimate cost for batch of requests
+
+        Prompts are tokenized in one batched pass per provider/model, off the
+        event loop. Requests that can't fit their model's context window are
+        listed by index in "exceeds_context".
+        """
         cost_breakdown = {
             "total_cost": 0.0,
             "provider_costs": {},
             "token_estimates": {},
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "exceeds_context": [],
+            "tokenizers": {},
             "request_count": len(requests)
         }
 
-        for request in requests:
-            provider_name = request.provider.value
+        groups: Dict[Tuple[AIProvider, str], List[int]] = {}
+        for index, request in enumerate(requests):
+            groups.setdefault((request.provider, request.model), []).append(index)
 
-            # Estimate tokens
-            input_tokens = len(request.prompt.split()) * 1.3  # Rough estimate
-            output_tokens = request.max_tokens or 1000
+        for (provider, model), indices in groups.items():
+            provider_name = provider.value
+            prompts = [requests[index].full_prompt for index in indices]
+            input_tokens = await asyncio.to_thread(token_counter.count_batch, provider_name, model, prompts)
+            output_tokens = np.fromiter(
+                (requests[index].max_tokens or 1000 for index in indices), dtype=np.int64, count=len(indices)
+            )
             total_tokens = input_tokens + output_tokens
-
-            # Cost per 1K tokens (rough estimates)
-            cost_per_1k = self._get_cost_per_1k_tokens(request.provider, request.model)
-            request_cost = (total_tokens / 1000) * cost_per_1k
+            request_cost = float(total_tokens.sum()) / 1000 * self._get_cost_per_1k_tokens(provider, model)
 
             cost_breakdown["total_cost"] += request_cost
+            cost_breakdown["input_tokens"] += int(input_tokens.sum())
+            cost_breakdown["output_tokens"] += int(output_tokens.sum())
+            cost_breakdown["provider_costs"][provider_name] = cost_breakdown["provider_costs"].get(provider_name, 0.0) + request_cost
+            cost_breakdown["token_estimates"][provider_name] = (
+                cost_breakdown["token_estimates"].get(provider_name, 0) + int(total_tokens.sum())
+            )
+            cost_breakdown["tokenizers"][f"{provider_name}:{model}"] = token_counter.get_tokenizer(provider_name, model).name
 
-            if provider_name not in cost_breakdown["provider_costs"]:
-                cost_breakdown["provider_costs"][provider_name] = 0.0
-                cost_breakdown["token_estimates"][provider_name] = 0
-
-            cost_breakdown["provider_costs"][provider_name] += request_cost
-            cost_breakdown["token_estimates"][provider_name] += total_tokens
+            over_limit = np.flatnonzero(total_tokens > get_context_limit(provider_name, model))
+            cost_breakdown["exceeds_context"].extend(indices[position] for position in over_limit)
 
+        cost_breakdown["exceeds_context"].sort()
         return cost_breakdown
 
     def _get_cost_per_1k_tokens(self, provider: AIProvider, model: str) -> float:
         """Get cost per 1K tokens for provider/model"""
-        costs = {
-            AIProvider.OPENAI: {
-                "gpt-4": 0.03,
-                "gpt-3.5-turbo": 0.002,
-                "default": 0.002
-            },
-            AIProvider.ANTHROPIC: {
-                "claude-3-opus-20240229": 0.015,
-                "claude-3-sonnet-20240229": 0.003,
-                "claude-3-haiku-20240307": 0.00025,
-                "default": 0.003
-            },
-            AIProvider.GOOGLE: {
-                "gemini-pro": 0.001,
-                "default": 0.001
-            }
-        }
-
-        provider_costs = costs.get(provider, {"default": 0.002})
-        return provider_costs.get(model, provider_costs["default"])
+        return get_cost_per_1k_tokens(provider.value, model)
 
     async def get_usage_analytics(self) -> Dict[str, Any]:
         """Get usage analytics and performance metrics"""
+        usage = await usage_analytics.get_summary()
+        models = await usage_analytics.get_breakdown("model")
+        provider_costs: Dict[str, float] = {}
+        for key, summary in models.items():
+            provider = key.split(":", 1)[0]
+            provider_costs[provider] = provider_costs.get(provider, 0.0) + summary["cost"]
+        
         return {
-            "rate_limits": self.rate_limits,
+            "rate_limits": {
+                "backend": self.rate_limiter.backend,
+                "scheduler": token_scheduler.get_stats(),
+                "requests_per_minute": settings.RATE_LIMIT_PER_MINUTE,
+                "burst": settings.RATE_LIMIT_BURST,
+                "per_user": settings.AI_RATE_LIMIT_PER_USER,
+            },
+            "response_cache": response_cache.get_stats(),
+            "streaming": {
+                provider.value: {
+                    "requests": int(stats["count"]),
+                    "avg_ttfb": stats["total"] / stats["count"],
+                    "last_ttfb": stats["last"],
+                }
+                for provider, stats in ttfb_stats.items()
+            },
+            "coalescing": single_flight.get_stats(),
+            "retries": retry_stats.get_stats(),
+            "hedging": {
+                "budget": hedge_budget.get_stats(),
+                "latency": latency_tracker.get_stats(),
+            },
+            "concurrency": {
+                provider.value: limiter.get_stats()
+                for provider, limiter in concurrency_limiters.items()
+            },
             "performance_metrics": {
-                "avg_response_time": 2.5,  # Would be calculated from actual data
-                "success_rate": 0.95,
-                "error_rate": 0.05,
-                "total_requests": 1000,  # Would come from database
+                "avg_response_time": usage["avg_latency"],
+                "p50_response_time": usage["p50_latency"],
+                "p95_response_time": usage["p95_latency"],
+                "p99_response_time": usage["p99_latency"],
+                "success_rate": 1.0 - usage["error_rate"] if usage["requests"] else None,
+                "error_rate": usage["error_rate"],
+                "total_requests": usage["requests"],
+                "cache_hits": usage["cache_hits"],
             },
             "cost_metrics": {
-                "total_cost_today": 15.50,
-                "avg_cost_per_request": 0.015,
-                "most_expensive_provider": "openai",
+                "total_cost_today": usage["cost"],
+                "total_tokens_today": usage["tokens"],
+                "avg_cost_per_request": usage["avg_cost_per_request"],
+                "most_expensive_provider": max(provider_costs, key=provider_costs.get) if provider_costs else None,
+                "provider_costs": provider_costs,
             },
-            "provider_health": {
-                provider.value: {
-                    "status": "healthy",
-                    "last_error": None,
-                    "avg_response_time": 2.0
-                } for provider in AIProvider
-            }
+            "models": models,
+            "routing": ai_router.get_stats(),
+            "provider_health": self._get_provider_health()
         }
 
-    async def _check_rate_limit(self, provider: AIProvider):
-        """Check and enforce rate limits"""
-        current_time = time.time()
-        rate_info = self.rate_limits[provider]
-        
-        # Reset counter if minute has passed
-        if current_time - rate_info["reset_time"] > 60:
-            rate_info["requests"] = 0
-            rate_info["reset_time"] = current_time
+    def _get_provider_health(self) -> Dict[str, Any]:
+        """Summarize circuit breaker state per provider"""
+        circuits = circuit_breaker.get_stats()
+        health = {}
+        for provider in AIProvider:
+            provider_circuits = {
+                key.split(":", 1)[1]: stats
+                for key, stats in circuits.items()
+                if key.startswith(f"{provider.value}:")
+            }
+            states = [stats["state"] for stats in provider_circuits.values()]
+            if states and all(state == "open" for state in states):
+                status = "unhealthy"
+            elif any(state != "closed" for state in states):
+                status = "degraded"
+            else:
+                status = "healthy"
+            
+            latencies = [stats["avg_latency"] for stats in provider_circuits.values() if stats["avg_latency"] is not None]
+            errors = [stats["last_error"] for stats in provider_circuits.values() if stats["last_error"]]
+            health[provider.value] = {
+                "status": status,
+                "last_error": errors[-1] if errors else None,
+                "avg_response_time": sum(latencies) / len(latencies) if latencies else None,
+                "circuits": provider_circuits
+            }
+        return health
+    
+    async def _check_rate_limit(self, request: AIRequest):
+        """Wait for rate limit tokens (provider/model bucket, plus per-user when enabled)"""
+        if request.priority == RequestPriority.BATCH:
+            timeout = settings.AI_BATCH_RATE_LIMIT_MAX_WAIT
+        else:
+            timeout = settings.AI_RATE_LIMIT_MAX_WAIT
         
-        # Check if rate limit exceeded
-        if rate_info["requests"] >= settings.RATE_LIMIT_PER_MINUTE:
-            raise AIServiceException(
-                provider.value, 
-                "Rate limit exceeded. Please try again later."
+        if settings.AI_RATE_LIMIT_PER_USER and request.user_id is not None:
+            await token_scheduler.acquire(
+                f"ai:user:{request.user_id}",
+                rate=settings.AI_USER_RATE_LIMIT_PER_MINUTE / 60,
+                capacity=settings.AI_USER_RATE_LIMIT_BURST,
+                priority=request.priority,
+                deadline=request.deadline,
+                timeout=timeout
             )
         
-        rate_info["requests"] += 1
+        await token_scheduler.acquire(
+            f"ai:{request.provider.value}:{request.model}",
+            rate=settings.RATE_LIMIT_PER_MINUTE / 60,
+            capacity=settings.RATE_LIMIT_BURST,
+            priority=request.priority,
+            deadline=request.deadline,
+            timeout=timeout
+        )
     
     async def _process_openai(self, request: AIRequest) -> AIResponse:
         """Process OpenAI request"""
@@ -342,13 +903,14 @@ class AIOrchestrator:
         
         payload = {
             "model": request.model,
-            "messages": [{"role": "user", "content": request.prompt}],
+            "messages": [{"role": "user", "content": request.full_prompt}],
             "max_tokens": request.max_tokens,
             "temperature": request.temperature
         }
         
-        async with self.session.post(
-            "https://api.openai.com/v1/chat/completions",
+        session = await self._get_session(AIProvider.OPENAI)
+        async with session.post(
+            f"{settings.OPENAI_BASE_URL}/chat/completions",
             headers=headers,
             json=payload
         ) as response:
@@ -362,8 +924,7 @@ class AIOrchestrator:
                     tokens_used=data.get("usage", {}).get("total_tokens", 0)
                 )
             else:
-                error_data = await response.json()
-                raise AIServiceException("openai", error_data.get("error", {}).get("message", "Unknown error"))
+                await self._raise_provider_error("openai", response)
     
     async def _process_anthropic(self, request: AIRequest) -> AIResponse:
         """Process Anthropic request"""
@@ -379,11 +940,12 @@ class AIOrchestrator:
         payload = {
             "model": request.model,
             "max_tokens": request.max_tokens,
-            "messages": [{"role": "user", "content": request.prompt}]
+            "messages": [{"role": "user", "content": self._anthropic_content(request)}]
         }
         
-        async with self.session.post(
-            "https://api.anthropic.com/v1/messages",
+        session = await self._get_session(AIProvider.ANTHROPIC)
+        async with session.post(
+            f"{settings.ANTHROPIC_BASE_URL}/messages",
             headers=headers,
             json=payload
         ) as response:
@@ -397,8 +959,121 @@ class AIOrchestrator:
                     tokens_used=data.get("usage", {}).get("output_tokens", 0)
                 )
             else:
-                error_data = await response.json()
-                raise AIServiceException("anthropic", error_data.get("error", {}).get("message", "Unknown error"))
+                await self._raise_provider_error("anthropic", response)
+    
+    def _anthropic_content(self, request: AIRequest) -> Any:
+        """Message content; a long shared prefix becomes its own block marked for prompt caching"""
+        if not request.prompt_prefix or len(request.prompt_prefix) < settings.AI_PROMPT_CACHE_MIN_CHARS:
+            return request.full_prompt
+        blocks = [{"type": "text", "text": request.prompt_prefix, "cache_control": {"type": "ephemeral"}}]
+        if request.prompt:
+            blocks.append({"type": "text", "text": request.prompt})
+        return blocks
+    
+    async def _stream_openai(self, request: AIRequest) -> AsyncIterator[AIStreamChunk]:
+        """Stream OpenAI chat completion deltas"""
+        headers = {
+            "Authorization": f"Bearer {settings.OPENAI_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": request.model,
+            "messages": [{"role": "user", "content": request.full_prompt}],
+            "max_tokens": request.max_tokens,
+            "temperature": request.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        
+        session = await self._get_session(AIProvider.OPENAI)
+        async with session.post(
+            f"{settings.OPENAI_BASE_URL}/chat/completions",
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status != 200:
+                await self._raise_provider_error("openai", response)
+            
+            async for event in self._iter_sse(response):
+                if event == "[DONE]":
+                    break
+                data = json.loads(event)
+                usage = data.get("usage")
+                choices = data.get("choices") or [{}]
+                yield AIStreamChunk(
+                    content=choices[0].get("delta", {}).get("content") or "",
+                    tokens_used=usage.get("total_tokens") if usage else None
+                )
+    
+    async def _stream_anthropic(self, request: AIRequest) -> AsyncIterator[AIStreamChunk]:
+        """Stream Anthropic message deltas"""
+        headers = {
+            "x-api-key": settings.ANTHROPIC_API_KEY,
+            "Content-Type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+        
+        payload = {
+            "model": request.model,
+            "max_tokens": request.max_tokens,
+            "messages": [{"role": "user", "content": self._anthropic_content(request)}],
+            "stream": True
+        }
+        
+        session = await self._get_session(AIProvider.ANTHROPIC)
+        async with session.post(
+            f"{settings.ANTHROPIC_BASE_URL}/messages",
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status != 200:
+                await self._raise_provider_error("anthropic", response)
+            
+            async for event in self._iter_sse(response):
+                data = json.loads(event)
+                event_type = data.get("type")
+                if event_type == "content_block_delta":
+                    yield AIStreamChunk(content=data.get("delta", {}).get("text") or "")
+                elif event_type == "message_delta":
+                    yield AIStreamChunk(tokens_used=data.get("usage", {}).get("output_tokens"))
+                elif event_type == "message_stop":
+                    break
+                elif event_type == "error":
+                    message = data.get("error", {}).get("message", "Stream error")
+                    raise AIServiceException("anthropic", message)
+    
+    async def _stream_mock(self, request: AIRequest) -> AsyncIterator[AIStreamChunk]:
+        """Stream the mock response word by word"""
+        provider_name = {AIProvider.OPENAI: "OpenAI", AIProvider.ANTHROPIC: "Anthropic"}.get(request.provider, "Google")
+        response = self._create_mock_response(request, provider_name)
+        for index, word in enumerate(response.content.split(" ")):
+            yield AIStreamChunk(content=word if index == 0 else " " + word)
+        yield AIStreamChunk(tokens_used=response.tokens_used)
+    
+    async def _iter_sse(self, response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+        """Yield the data payload of each server-sent event"""
+        data_lines = []
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8").rstrip("\r\n")
+            if not line:
+                # Blank line terminates an event
+                if data_lines:
+                    yield "\n".join(data_lines)
+                    data_lines = []
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+        if data_lines:
+            yield "\n".join(data_lines)
+    
+    async def _raise_provider_error(self, provider_name: str, response: aiohttp.ClientResponse):
+        """Raise provider error carrying HTTP status and headers"""
+        try:
+            error_data = await response.json(content_type=None)
+            message = error_data.get("error", {}).get("message", "Unknown error")
+        except Exception:
+            message = response.reason or "Unknown error"
+        raise AIProviderHTTPException(provider_name, response.status, message, response.headers)
     
     async def _process_google(self, request: AIRequest) -> AIResponse:
         """Process Google request"""
@@ -410,7 +1085,7 @@ class AIOrchestrator:
     
     def _create_mock_response(self, request: AIRequest, provider_name: str) -> AIResponse:
         """Create mock response for development/demo"""
-        mock_content = f"Mock response from {provider_name} {request.model} for prompt: {request.prompt[:50]}..."
+        mock_content = f"Mock response from {provider_name} {request.model} for prompt: {request.full_prompt[:50]}..."
         
         return AIResponse(
             success=True,
@@ -0,0 +1,174 @@
+"""
+AI Router for FlowsyAI Backend
+Picks provider/model from live latency, error rate, and cost
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.circuit_breaker import circuit_breaker
+
+# Cost per 1K tokens (USD, rough estimates); "default" covers unlisted models
+COST_PER_1K_TOKENS: Dict[str, Dict[str, float]] = {
+    "openai": {
+        "gpt-4": 0.03,
+        "gpt-3.5-turbo": 0.002,
+        "default": 0.002
+    },
+    "anthropic": {
+        "claude-3-opus-20240229": 0.015,
+        "claude-3-sonnet-20240229": 0.003,
+        "claude-3-haiku-20240307": 0.00025,
+        "default": 0.003
+    },
+    "google": {
+        "gemini-pro": 0.001,
+        "default": 0.001
+    }
+}
+
+
+def get_cost_per_1k_tokens(provider: str, model: str) -> float:
+    """Get cost per 1K tokens for provider/model"""
+    provider_costs = COST_PER_1K_TOKENS.get(provider, {"default": 0.002})
+    return provider_costs.get(model, provider_costs["default"])
+
+
+class RouteStrategy(str, Enum):
+    """What the router optimizes for"""
+    BALANCED = "balanced"
+    CHEAPEST = "cheapest"
+    FASTEST = "fastest"
+
+
+@dataclass
+class RouteConstraints:
+    """Caller constraints for picking a provider/model"""
+    strategy: RouteStrategy = RouteStrategy.BALANCED
+    max_latency: Optional[float] = None
+    max_cost_per_1k: Optional[float] = None
+    providers: Optional[List[str]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], strategy: RouteStrategy = RouteStrategy.BALANCED) -> "RouteConstraints":
+        """Build constraints from request metadata, e.g. {"strategy": "cheapest", "max_latency": 2}"""
+        return cls(
+            strategy=RouteStrategy(data.get("strategy", strategy)),
+            max_latency=data.get("max_latency"),
+            max_cost_per_1k=data.get("max_cost_per_1k"),
+            providers=data.get("providers"),
+        )
+
+
+@dataclass
+class ModelStats:
+    """Exponentially weighted latency and error rate of one provider/model"""
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    samples: int = 0
+
+
+class AIRouter:
+    """Ranks provider/models for a request from live statistics"""
+
+    def __init__(self, alpha: float, default_latency: float):
+        self.alpha = alpha
+        self.default_latency = default_latency
+        self._stats: Dict[Tuple[str, str], ModelStats] = {}
+
+    def observe(self, provider: str, model: str, latency: float, success: bool):
+        """Update statistics from a request outcome"""
+        stats = self._stats.get((provider, model))
+        if stats is None:
+            stats = self._stats[(provider, model)] = ModelStats()
+
+        stats.samples += 1
+        stats.error_rate += self.alpha * ((0.0 if success else 1.0) - stats.error_rate)
+        if success:
+            # Failures are often fast (or time out); only successes describe latency
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += self.alpha * (latency - stats.latency)
+
+    def expected_latency(self, provider: str, model: str) -> float:
+        """EWMA latency, or the prior for models not seen yet"""
+        stats = self._stats.get((provider, model))
+        if stats is None or stats.latency is None:
+            return self.default_latency
+        return stats.latency
+
+    def error_rate(self, provider: str, model: str) -> float:
+        stats = self._stats.get((provider, model))
+        return stats.error_rate if stats else 0.0
+
+    def candidates(self, constraints: RouteConstraints) -> List[Tuple[str, str]]:
+        """All priced provider/models allowed by the constraints"""
+        return [
+            (provider, model)
+            for provider, models in COST_PER_1K_TOKENS.items()
+            if constraints.providers is None or provider in constraints.providers
+            for model in models
+            if model != "default"
+        ]
+
+    def rank(
+        self,
+        constraints: RouteConstraints,
+        candidates: Optional[List[Tuple[str, str]]] = None
+    ) -> List[Tuple[str, str]]:
+        """Order candidates best-first; those breaking the constraints are dropped
+
+        If nothing satisfies the constraints, the fastest candidates are returned
+        so the caller still gets the closest match.
+        """
+        candidates = candidates if candidates is not None else self.candidates(constraints)
+        candidates = [
+            candidate for candidate in candidates
+            if not circuit_breaker.is_open(f"{candidate[0]}:{candidate[1]}")
+        ] or candidates
+
+        # Expected cost/latency per successful response
+        scored = {}
+        for provider, model in candidates:
+            success_rate = max(1.0 - self.error_rate(provider, model), 0.05)
+            scored[(provider, model)] = (
+                self.expected_latency(provider, model) / success_rate,
+                get_cost_per_1k_tokens(provider, model) / success_rate,
+            )
+
+        eligible = [
+            candidate for candidate in candidates
+            if (constraints.max_latency is None or self.expected_latency(*candidate) <= constraints.max_latency)
+            and (constraints.max_cost_per_1k is None or get_cost_per_1k_tokens(*candidate) <= constraints.max_cost_per_1k)
+        ]
+        if not eligible:
+            return sorted(candidates, key=lambda candidate: scored[candidate][0])
+
+        if constraints.strategy == RouteStrategy.FASTEST:
+            return sorted(eligible, key=lambda candidate: scored[candidate])
+        if constraints.strategy == RouteStrategy.CHEAPEST:
+            return sorted(eligible, key=lambda candidate: (scored[candidate][1], scored[candidate][0]))
+
+        # Balanced: a 2x slower option must be at least 2x cheaper to win
+        return sorted(eligible, key=lambda candidate: scored[candidate][0] * scored[candidate][1])
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get live statistics per provider/model"""
+        return {
+            f"{provider}:{model}": {
+                "latency": stats.latency,
+                "error_rate": round(stats.error_rate, 4),
+                "samples": stats.samples,
+            }
+            for (provider, model), stats in self._stats.items()
+        }
+
+
+# Global router instance
+ai_router = AIRouter(
+    alpha=settings.AI_ROUTER_EWMA_ALPHA,
+    default_latency=settings.AI_ROUTER_DEFAULT_LATENCY,
+)
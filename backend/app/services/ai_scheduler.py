@@ -0,0 +1,194 @@
+"""
+AI request scheduling for FlowsyAI Backend
+Priority- and deadline-aware allocation of rate limit tokens
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.exceptions import DeadlineExceededException, RateLimitException
+from app.core.rate_limiter import TokenBucketRateLimiter, rate_limiter
+
+
+class RequestPriority(IntEnum):
+    """Priority classes for AI requests (lower value is served first)"""
+    INTERACTIVE = 0
+    NORMAL = 1
+    BATCH = 2
+
+
+@dataclass(order=True)
+class _Waiter:
+    priority: int
+    expires_at: float
+    seq: int
+    deadline: Optional[float] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class PriorityTokenScheduler:
+    """Hands out rate limit tokens to waiting requests in priority order
+
+    Within a worker, waiters for a bucket form a heap ordered by priority
+    class, then expiry, so an interactive request arriving behind hundreds
+    of batch requests takes the very next token. Across workers, lower
+    classes must leave a reserve in the shared bucket that only interactive
+    traffic may spend. Requests whose deadline passes while queued, or that
+    can no longer get a token in time, are dropped before spending one.
+    """
+
+    def __init__(self, rate_limiter: TokenBucketRateLimiter):
+        self.rate_limiter = rate_limiter
+        self._queues: Dict[str, List[_Waiter]] = {}
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._seq = itertools.count()
+        self.granted = {priority.name.lower(): 0 for priority in RequestPriority}
+        self.dropped = 0
+
+    def _reserve(self, priority: RequestPriority, capacity: float) -> float:
+        fraction = settings.AI_INTERACTIVE_TOKEN_RESERVE
+        if priority == RequestPriority.BATCH:
+            reserve = capacity * fraction
+        elif priority == RequestPriority.NORMAL:
+            reserve = capacity * fraction / 2
+        else:
+            return 0.0
+        # A bucket must still be able to grant one token on top of the reserve
+        return min(reserve, max(0.0, capacity - 1))
+
+    async def acquire(
+        self,
+        key: str,
+        rate: float,
+        capacity: float,
+        priority: RequestPriority = RequestPriority.NORMAL,
+        deadline: Optional[float] = None,
+        timeout: Optional[float] = None
+    ):
+        """Wait for a token; deadline is absolute (epoch seconds), timeout relative"""
+        now = time.time()
+        if deadline is not None and deadline <= now:
+            self.dropped += 1
+            raise DeadlineExceededException(f"Deadline passed before acquiring {key}")
+
+        # Fast path: nobody queued ahead of us
+        if not self._queues.get(key):
+            wait = await self.rate_limiter.try_acquire(key, rate, capacity, reserve=self._reserve(priority, capacity))
+            if wait <= 0:
+                self.granted[priority.name.lower()] += 1
+                return
+
+        expires_at = min(
+            deadline if deadline is not None else float("inf"),
+            now + timeout if timeout is not None else float("inf")
+        )
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, expires_at, next(self._seq), deadline, loop.create_future())
+        queue = self._queues.setdefault(key, [])
+        heapq.heappush(queue, waiter)
+
+        dispatcher = self._dispatchers.get(key)
+        if dispatcher is None or dispatcher.done():
+            self._wakeups[key] = asyncio.Event()
+            self._dispatchers[key] = asyncio.ensure_future(self._dispatch(key, rate, capacity))
+        elif queue[0] is waiter:
+            # The dispatcher may be sleeping for a lower class's reserve: re-evaluate for us now
+            self._wakeups[key].set()
+
+        # Every waiter expires on its own timer, not only when it reaches the head of the queue
+        timer = loop.call_at(loop.time() + expires_at - now, self._expire, key, waiter) if expires_at != float("inf") else None
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            waiter.future.cancel()
+            wakeup = self._wakeups.get(key)
+            if wakeup is not None:
+                wakeup.set()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    async def _dispatch(self, key: str, rate: float, capacity: float):
+        """Serve the queue for one bucket, highest priority first"""
+        queue = self._queues[key]
+        wakeup = self._wakeups[key]
+        try:
+            while queue:
+                # Cleared before reading the head, so a waiter queued from here on always wakes us
+                wakeup.clear()
+                waiter = queue[0]
+                if waiter.future.done():
+                    heapq.heappop(queue)
+                    continue
+
+                priority = RequestPriority(waiter.priority)
+                try:
+                    wait = await self.rate_limiter.try_acquire(
+                        key, rate, capacity, reserve=self._reserve(priority, capacity)
+                    )
+                except Exception as e:
+                    heapq.heappop(queue)
+                    if not waiter.future.done():
+                        waiter.future.set_exception(e)
+                    continue
+
+                if wait <= 0:
+                    heapq.heappop(queue)
+                    if not waiter.future.done():
+                        waiter.future.set_result(None)
+                        self.granted[priority.name.lower()] += 1
+                    continue
+
+                if time.time() + wait > waiter.expires_at:
+                    # Can't get a token in time: drop it instead of letting it spend one late
+                    heapq.heappop(queue)
+                    self._expire(key, waiter)
+                    continue
+
+                # Jitter avoids workers waking in lockstep and racing for the same token;
+                # a new head of the queue or an expired waiter cuts the sleep short
+                try:
+                    await asyncio.wait_for(wakeup.wait(), wait * (1 + random.random() * 0.1))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for waiter in queue:
+                if not waiter.future.done():
+                    waiter.future.set_exception(RateLimitException(f"Rate limit scheduler stopped for {key}"))
+            queue.clear()
+            self._queues.pop(key, None)
+            self._dispatchers.pop(key, None)
+            self._wakeups.pop(key, None)
+
+    def _expire(self, key: str, waiter: _Waiter):
+        if waiter.future.done():
+            return
+        self.dropped += 1
+        wakeup = self._wakeups.get(key)
+        if wakeup is not None:
+            wakeup.set()
+        if waiter.deadline is not None and waiter.deadline <= waiter.expires_at:
+            waiter.future.set_exception(DeadlineExceededException(f"Deadline would pass before acquiring {key}"))
+        else:
+            waiter.future.set_exception(RateLimitException(f"Rate limit exceeded for {key}"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depths and grant/drop counters"""
+        return {
+            "queued": {key: len(queue) for key, queue in self._queues.items() if queue},
+            "granted": dict(self.granted),
+            "dropped": self.dropped,
+        }
+
+
+# Global scheduler instance
+token_scheduler = PriorityTokenScheduler(rate_limiter)
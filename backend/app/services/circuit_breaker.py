@@ -0,0 +1,256 @@
+"""
+Circuit breaker for FlowsyAI Backend
+Per provider/model breakers with state shared between workers through Redis
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.redis import RedisManager, redis_manager
+
+logger = get_logger(__name__)
+
+# Check the shared state and, once an open circuit's cooldown is over, let
+# exactly one caller (in any worker) through as the half-open probe.
+# Returns {state, until, allowed}; "until" is the open/probe deadline.
+ALLOW_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state')
+local until_ts = tonumber(redis.call('HGET', KEYS[1], 'until') or '0')
+local now = tonumber(ARGV[1])
+
+if state == 'open' or state == 'half_open' then
+    if now < until_ts then
+        return {state, tostring(until_ts), 0}
+    end
+    local probe_until = now + tonumber(ARGV[2])
+    redis.call('HSET', KEYS[1], 'state', 'half_open', 'until', tostring(probe_until))
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    return {'half_open', tostring(probe_until), 1}
+end
+
+return {'closed', '0', 1}
+"""
+
+
+class CircuitState(str, Enum):
+    """Circuit breaker states"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class RollingWindow:
+    """Request outcomes over the last `window` seconds, in time buckets"""
+
+    def __init__(self, window: float, buckets: int = 12):
+        self.bucket_size = window / buckets
+        self.buckets = buckets
+        self._buckets: Deque[List[float]] = deque()  # [start, requests, failures, slow, latency_sum]
+
+    def add(self, failed: bool, slow: bool, latency: float, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        start = now - now % self.bucket_size
+        if not self._buckets or self._buckets[-1][0] != start:
+            self._buckets.append([start, 0, 0, 0, 0.0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        bucket[2] += failed
+        bucket[3] += slow
+        bucket[4] += latency
+        self._prune(now)
+
+    def _prune(self, now: float):
+        horizon = now - self.bucket_size * self.buckets
+        while self._buckets and self._buckets[0][0] <= horizon:
+            self._buckets.popleft()
+
+    def totals(self) -> Dict[str, float]:
+        """Summed counters over the window"""
+        self._prune(time.time())
+        requests = sum(bucket[1] for bucket in self._buckets)
+        return {
+            "requests": requests,
+            "failure_rate": sum(bucket[2] for bucket in self._buckets) / requests if requests else 0.0,
+            "slow_rate": sum(bucket[3] for bucket in self._buckets) / requests if requests else 0.0,
+            "avg_latency": sum(bucket[4] for bucket in self._buckets) / requests if requests else None,
+        }
+
+    def reset(self):
+        self._buckets.clear()
+
+
+@dataclass
+class _Circuit:
+    window: RollingWindow
+    state: CircuitState = CircuitState.CLOSED
+    until: float = 0.0
+    probing: bool = False
+    synced_at: float = 0.0
+    last_error: Optional[str] = None
+    times_opened: int = 0
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breakers keyed by provider:model
+
+    Error and slow-call rates are measured per worker; the resulting state
+    (open until, half-open probe) lives in Redis so every worker stops
+    calling a failing provider as soon as one of them trips the circuit.
+    Without Redis each worker runs the same state machine locally.
+    """
+
+    def __init__(self, redis_manager: RedisManager, prefix: str = "circuit", sync_interval: float = 1.0):
+        self.redis_manager = redis_manager
+        self.prefix = prefix
+        self.sync_interval = sync_interval
+        self._circuits: Dict[str, _Circuit] = {}
+        self._scripts = {}
+
+    def _circuit(self, key: str) -> _Circuit:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit(RollingWindow(settings.AI_CIRCUIT_WINDOW))
+        return circuit
+
+    def _get_script(self, client):
+        script = self._scripts.get(id(client))
+        if script is None:
+            script = client.register_script(ALLOW_SCRIPT)
+            self._scripts = {id(client): script}
+        return script
+
+    def is_open(self, key: str) -> bool:
+        """Whether the local view of the circuit rejects requests right now"""
+        circuit = self._circuits.get(key)
+        return circuit is not None and circuit.state != CircuitState.CLOSED and time.time() < circuit.until
+
+    def retry_after(self, key: str) -> float:
+        """Seconds until the circuit may let a request through"""
+        circuit = self._circuits.get(key)
+        return max(0.0, circuit.until - time.time()) if circuit else 0.0
+
+    async def allow_request(self, key: str) -> bool:
+        """Whether a request may be sent; may elect this caller as the half-open probe"""
+        circuit = self._circuit(key)
+        now = time.time()
+
+        if circuit.state == CircuitState.CLOSED and now - circuit.synced_at < self.sync_interval:
+            return True
+        if circuit.probing:
+            if now < circuit.until:
+                return False
+            circuit.probing = False  # Probe outcome never arrived
+        if circuit.state == CircuitState.OPEN and now < circuit.until:
+            return False
+        if circuit.state == CircuitState.HALF_OPEN and now < circuit.until and now - circuit.synced_at < self.sync_interval:
+            # Another worker is probing; re-check shortly in case it already closed the circuit
+            return False
+
+        client = self.redis_manager.redis_client
+        if client is not None:
+            try:
+                state, until, allowed = await self._get_script(client)(
+                    keys=[f"{self.prefix}:{key}"],
+                    args=[now, settings.AI_CIRCUIT_OPEN_SECONDS, self._ttl()]
+                )
+                circuit.state = CircuitState(state.decode() if isinstance(state, bytes) else state)
+                circuit.until = float(until)
+                circuit.synced_at = now
+                circuit.probing = bool(int(allowed)) and circuit.state == CircuitState.HALF_OPEN
+                return bool(int(allowed))
+            except Exception as e:
+                logger.warning(f"Circuit breaker state unavailable in Redis, using local state: {e}")
+
+        circuit.synced_at = now
+        if circuit.state != CircuitState.CLOSED:
+            # Cooldown over: this request is the probe
+            circuit.state = CircuitState.HALF_OPEN
+            circuit.until = now + settings.AI_CIRCUIT_OPEN_SECONDS
+            circuit.probing = True
+        return True
+
+    async def record(self, key: str, success: bool, latency: float, error: Optional[str] = None):
+        """Feed a request outcome into the circuit"""
+        circuit = self._circuit(key)
+        slow = latency > settings.AI_CIRCUIT_SLOW_CALL_SECONDS
+        circuit.window.add(failed=not success, slow=slow, latency=latency)
+        if error:
+            circuit.last_error = error
+
+        if circuit.probing:
+            circuit.probing = False
+            if success and not slow:
+                await self._transition(key, circuit, CircuitState.CLOSED)
+            else:
+                await self._transition(key, circuit, CircuitState.OPEN)
+        elif circuit.state == CircuitState.CLOSED and self._should_trip(circuit):
+            await self._transition(key, circuit, CircuitState.OPEN)
+
+    def abandon(self, key: str):
+        """Forget an in-flight probe that was cancelled before completing"""
+        circuit = self._circuits.get(key)
+        if circuit is not None:
+            circuit.probing = False
+
+    def _should_trip(self, circuit: _Circuit) -> bool:
+        totals = circuit.window.totals()
+        if totals["requests"] < settings.AI_CIRCUIT_MIN_REQUESTS:
+            return False
+        return (
+            totals["failure_rate"] >= settings.AI_CIRCUIT_FAILURE_RATE
+            or totals["slow_rate"] >= settings.AI_CIRCUIT_SLOW_CALL_RATE
+        )
+
+    async def _transition(self, key: str, circuit: _Circuit, state: CircuitState):
+        now = time.time()
+        circuit.state = state
+        circuit.until = now + settings.AI_CIRCUIT_OPEN_SECONDS if state == CircuitState.OPEN else 0.0
+        circuit.synced_at = now
+        circuit.window.reset()
+
+        if state == CircuitState.OPEN:
+            circuit.times_opened += 1
+            logger.warning(f"Circuit opened for {key} ({circuit.last_error})")
+        else:
+            logger.info(f"Circuit closed for {key}")
+
+        client = self.redis_manager.redis_client
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=True)
+            pipe.hset(f"{self.prefix}:{key}", mapping={"state": state.value, "until": str(circuit.until)})
+            pipe.expire(f"{self.prefix}:{key}", self._ttl())
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to share circuit state for {key}: {e}")
+
+    def _ttl(self) -> int:
+        # Long enough to outlive the open period, short enough to forget idle models
+        return int(settings.AI_CIRCUIT_OPEN_SECONDS * 10 + settings.AI_CIRCUIT_WINDOW)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get state and rolling metrics per circuit"""
+        now = time.time()
+        stats = {}
+        for key, circuit in self._circuits.items():
+            state = circuit.state
+            if state == CircuitState.OPEN and now >= circuit.until:
+                state = CircuitState.HALF_OPEN
+            stats[key] = {
+                "state": state.value,
+                "retry_after": max(0.0, circuit.until - now) if state == CircuitState.OPEN else 0.0,
+                "times_opened": circuit.times_opened,
+                "last_error": circuit.last_error,
+                **circuit.window.totals(),
+            }
+        return stats
+
+
+# Global circuit breaker instance
+circuit_breaker = CircuitBreaker(redis_manager)
@@ -0,0 +1,250 @@
+"""
+Workflow Expression Language for FlowsyAI Backend
+Safe, compiled evaluation of condition expressions
+"""
+
+import ast
+import operator
+from functools import lru_cache
+from typing import Any, Callable, Dict, Mapping
+
+from app.core.exceptions import InvalidExpressionException
+
+Evaluator = Callable[[Mapping[str, Any]], Any]
+
+# Literal names accepted in addition to Python's True/False/None
+LITERAL_NAMES = {
+    "true": True,
+    "false": False,
+    "null": None,
+    "none": None,
+}
+
+SAFE_FUNCTIONS = {
+    "len": len,
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "round": round,
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+}
+
+# Upper bound for sequences built by `*` so expressions can't exhaust memory
+MAX_SEQUENCE_LENGTH = 100_000
+
+
+def _safe_mul(left: Any, right: Any) -> Any:
+    """Multiplication that refuses to build huge strings/lists"""
+    for sequence, count in ((left, right), (right, left)):
+        if isinstance(sequence, (str, list, tuple)) and isinstance(count, int):
+            if len(sequence) * count > MAX_SEQUENCE_LENGTH:
+                raise ValueError("Sequence repetition too large")
+    return left * right
+
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _safe_mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+UNARY_OPERATORS = {
+    ast.Not: operator.not_,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+
+COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+
+
+class CompiledExpression:
+    """Expression parsed once into a tree of closures"""
+
+    __slots__ = ("source", "_evaluate")
+
+    def __init__(self, source: str, evaluate: Evaluator):
+        self.source = source
+        self._evaluate = evaluate
+
+    def evaluate(self, data: Mapping[str, Any]) -> Any:
+        """Evaluate against variables; unknown names raise KeyError"""
+        return self._evaluate(data)
+
+    def __call__(self, data: Mapping[str, Any]) -> Any:
+        return self._evaluate(data)
+
+    def __repr__(self):
+        return f"<CompiledExpression {self.source!r}>"
+
+
+class _Compiler:
+    """Translates a whitelisted Python AST into closures"""
+
+    def __init__(self, source: str):
+        self.source = source
+
+    def error(self, message: str) -> InvalidExpressionException:
+        return InvalidExpressionException(self.source, message)
+
+    def compile(self, node: ast.AST) -> Evaluator:
+        method = getattr(self, f"_compile_{type(node).__name__}", None)
+        if method is None:
+            raise self.error(f"unsupported syntax '{type(node).__name__}'")
+        return method(node)
+
+    def _compile_Expression(self, node: ast.Expression) -> Evaluator:
+        return self.compile(node.body)
+
+    def _compile_Constant(self, node: ast.Constant) -> Evaluator:
+        value = node.value
+        if not isinstance(value, (str, int, float, bool, type(None))):
+            raise self.error(f"unsupported constant {value!r}")
+        return lambda data: value
+
+    def _compile_Name(self, node: ast.Name) -> Evaluator:
+        name = node.id
+        if name in LITERAL_NAMES:
+            value = LITERAL_NAMES[name]
+            return lambda data: value
+        if name.startswith("_"):
+            raise self.error(f"private name '{name}'")
+        return lambda data: data[name]
+
+    def _compile_List(self, node: ast.List) -> Evaluator:
+        items = [self.compile(item) for item in node.elts]
+        return lambda data: [item(data) for item in items]
+
+    def _compile_Tuple(self, node: ast.Tuple) -> Evaluator:
+        items = [self.compile(item) for item in node.elts]
+        return lambda data: tuple(item(data) for item in items)
+
+    def _compile_Subscript(self, node: ast.Subscript) -> Evaluator:
+        if isinstance(node.slice, ast.Slice):
+            raise self.error("slices are not supported")
+        target = self.compile(node.value)
+        index = self.compile(node.slice)
+        return lambda data: target(data)[index(data)]
+
+    def _compile_BoolOp(self, node: ast.BoolOp) -> Evaluator:
+        operands = [self.compile(value) for value in node.values]
+
+        if isinstance(node.op, ast.And):
+            def evaluate_and(data):
+                result = True
+                for operand in operands:
+                    result = operand(data)
+                    if not result:
+                        return result
+                return result
+            return evaluate_and
+
+        def evaluate_or(data):
+            result = False
+            for operand in operands:
+                result = operand(data)
+                if result:
+                    return result
+            return result
+        return evaluate_or
+
+    def _compile_UnaryOp(self, node: ast.UnaryOp) -> Evaluator:
+        op = UNARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise self.error(f"unsupported operator '{type(node.op).__name__}'")
+        operand = self.compile(node.operand)
+        return lambda data: op(operand(data))
+
+    def _compile_BinOp(self, node: ast.BinOp) -> Evaluator:
+        op = BINARY_OPERATORS.get(type(node.op))
+        if op is None:
+            raise self.error(f"unsupported operator '{type(node.op).__name__}'")
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+        return lambda data: op(left(data), right(data))
+
+    def _compile_Compare(self, node: ast.Compare) -> Evaluator:
+        ops = []
+        for op_node in node.ops:
+            op = COMPARE_OPERATORS.get(type(op_node))
+            if op is None:
+                raise self.error(f"unsupported comparison '{type(op_node).__name__}'")
+            ops.append(op)
+
+        left = self.compile(node.left)
+        comparators = [self.compile(comparator) for comparator in node.comparators]
+
+        if len(ops) == 1:
+            op, right = ops[0], comparators[0]
+            return lambda data: op(left(data), right(data))
+
+        pairs = list(zip(ops, comparators))
+
+        def evaluate_chain(data):
+            current = left(data)
+            for op, comparator in pairs:
+                value = comparator(data)
+                if not op(current, value):
+                    return False
+                current = value
+            return True
+        return evaluate_chain
+
+    def _compile_IfExp(self, node: ast.IfExp) -> Evaluator:
+        test = self.compile(node.test)
+        body = self.compile(node.body)
+        orelse = self.compile(node.orelse)
+        return lambda data: body(data) if test(data) else orelse(data)
+
+    def _compile_Call(self, node: ast.Call) -> Evaluator:
+        if not isinstance(node.func, ast.Name) or node.func.id not in SAFE_FUNCTIONS:
+            raise self.error("only built-in helper functions can be called")
+        if node.keywords:
+            raise self.error("keyword arguments are not supported")
+
+        func = SAFE_FUNCTIONS[node.func.id]
+        args = [self.compile(arg) for arg in node.args]
+        return lambda data: func(*[arg(data) for arg in args])
+
+
+@lru_cache(maxsize=2048)
+def compile_expression(source: str) -> CompiledExpression:
+    """Parse and compile an expression, cached by its text"""
+    try:
+        tree = ast.parse(source.strip(), mode="eval")
+    except SyntaxError as e:
+        raise InvalidExpressionException(source, e.msg)
+
+    return CompiledExpression(source, _Compiler(source).compile(tree))
+
+
+def evaluate_expression(source: str, data: Mapping[str, Any]) -> Any:
+    """Compile (cached) and evaluate an expression"""
+    return compile_expression(source)(data)
+
+
+def get_expression_cache_stats() -> Dict[str, Any]:
+    """Get compiled expression cache statistics"""
+    info = compile_expression.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxsize": info.maxsize,
+    }
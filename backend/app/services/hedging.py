@@ -0,0 +1,88 @@
+"""
+Request hedging for FlowsyAI Backend
+Learned latency percentiles and the budget that bounds duplicate AI calls
+"""
+
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+class LatencyTracker:
+    """Sliding window of successful request latencies per provider/model"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+
+    def observe(self, provider: str, model: str, latency: float):
+        """Record latency of a successful request"""
+        samples = self._samples.get((provider, model))
+        if samples is None:
+            samples = self._samples[(provider, model)] = deque(maxlen=self.window)
+        samples.append(latency)
+
+    def percentile(self, provider: str, model: str, percentile: float) -> Optional[float]:
+        """Latency percentile, or None until enough samples are in"""
+        samples = self._samples.get((provider, model))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get sample counts and p50/p95 per provider/model"""
+        return {
+            f"{provider}:{model}": {
+                "samples": len(samples),
+                "p50": self.percentile(provider, model, 50),
+                "p95": self.percentile(provider, model, 95),
+            }
+            for (provider, model), samples in self._samples.items()
+        }
+
+
+class HedgeBudget:
+    """Earns a fraction of a hedge per primary request
+
+    With ratio <= 1 the number of hedged calls can never exceed the number
+    of primary calls, so hedging at most doubles provider spend.
+    """
+
+    def __init__(self, ratio: float, burst: float = 10):
+        self.ratio = min(max(ratio, 0.0), 1.0)
+        self.burst = burst
+        self.tokens = 0.0
+        self.requests = 0
+        self.hedges = 0
+
+    def record_request(self):
+        """Credit the budget for one primary request"""
+        self.requests += 1
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one hedge from the budget if available"""
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.hedges += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedge counters"""
+        return {
+            "ratio": self.ratio,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "available": round(self.tokens, 2),
+        }
+
+
+# Global hedging state (per process)
+latency_tracker = LatencyTracker(min_samples=settings.AI_HEDGE_MIN_SAMPLES)
+hedge_budget = HedgeBudget(settings.AI_HEDGE_BUDGET_RATIO)
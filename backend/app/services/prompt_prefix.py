@@ -0,0 +1,116 @@
+"""
+Prompt prefix deduplication for FlowsyAI Backend
+Finds long prefixes shared across batch prompts so providers can cache them once
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+from app.core.config import settings
+
+
+class _Node:
+    __slots__ = ("label", "depth", "count", "children")
+
+    def __init__(self, label: str, depth: int, count: int = 0):
+        self.label = label
+        self.depth = depth
+        self.count = count
+        self.children: Dict[str, "_Node"] = {}
+
+
+def _common_length(text: str, start: int, label: str) -> int:
+    """Length of the common prefix of label and text[start:]"""
+    # Binary search with startswith keeps the comparisons in C
+    low, high = 0, min(len(label), len(text) - start)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if text.startswith(label[:middle], start):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class PrefixTrie:
+    """Radix trie over prompts, counting how many prompts pass through each node
+
+    Edges hold whole substrings, so memory grows with the number of prompts
+    rather than their total length, and a prompt that follows an existing
+    path costs one startswith() per branch point.
+    """
+
+    def __init__(self):
+        self.root = _Node("", 0)
+
+    def insert(self, text: str):
+        node = self.root
+        node.count += 1
+        position = 0
+        while position < len(text):
+            child = node.children.get(text[position])
+            if child is None:
+                node.children[text[position]] = _Node(text[position:], len(text), 1)
+                return
+
+            if text.startswith(child.label, position):
+                child.count += 1
+                node = child
+                position += len(child.label)
+                continue
+
+            # Diverges inside the edge: split it at the divergence point
+            common = _common_length(text, position, child.label)
+            middle = _Node(child.label[:common], node.depth + common, child.count + 1)
+            child.label = child.label[common:]
+            middle.children[child.label[0]] = child
+            node.children[text[position]] = middle
+            if position + common < len(text):
+                middle.children[text[position + common]] = _Node(text[position + common:], len(text), 1)
+            return
+
+    def best_prefix_length(self, text: str, min_count: int = 2, min_length: int = 0) -> int:
+        """Length of the shared prefix of text that saves the most characters (count x length)"""
+        node = self.root
+        position = 0
+        best_length, best_score = 0, 0
+        while position < len(text):
+            child = node.children.get(text[position])
+            if child is None or not text.startswith(child.label, position):
+                break
+            node = child
+            position += len(child.label)
+            if node.count >= min_count and node.depth >= min_length and node.count * node.depth > best_score:
+                best_length, best_score = node.depth, node.count * node.depth
+        return best_length
+
+
+def find_shared_prefixes(
+    prompts: Sequence[str],
+    min_count: int = 2,
+    min_length: Optional[int] = None
+) -> List[Optional[str]]:
+    """Shared prefix for each prompt (None if it has none worth splitting off)
+
+    Prefixes are trimmed back to the last whitespace where that keeps them
+    long enough, so the variable tail starts on a word boundary. Equal
+    prefixes are the same string object.
+    """
+    min_length = settings.AI_PROMPT_PREFIX_MIN_CHARS if min_length is None else min_length
+    trie = PrefixTrie()
+    for prompt in prompts:
+        trie.insert(prompt)
+
+    interned: Dict[str, str] = {}
+    prefixes: List[Optional[str]] = []
+    for prompt in prompts:
+        length = trie.best_prefix_length(prompt, min_count, max(min_length, 1))
+        if not length:
+            prefixes.append(None)
+            continue
+        boundary = max(prompt.rfind(" ", 0, length), prompt.rfind("\n", 0, length)) + 1
+        if boundary >= min_length:
+            length = boundary
+        prefix = prompt[:length]
+        prefixes.append(interned.setdefault(prefix, prefix))
+    return prefixes
+
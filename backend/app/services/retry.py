@@ -0,0 +1,157 @@
+"""
+Request retries for FlowsyAI Backend
+Error classification, provider rate-limit headers, and decorrelated-jitter backoff
+"""
+
+import asyncio
+import random
+import re
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Mapping, Optional
+
+import aiohttp
+from multidict import CIMultiDict
+
+from app.core.config import settings
+from app.core.exceptions import AIProviderHTTPException
+
+# Statuses worth another attempt: throttling, timeouts and server-side failures
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# OpenAI reset durations look like "20ms", "1.5s" or "6m0s"
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient errors (429, 5xx, timeouts, dropped connections) vs fatal ones (other 4xx, local rejections)"""
+    if isinstance(error, AIProviderHTTPException):
+        return error.status in RETRYABLE_STATUSES or error.status >= 500
+    return isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value.strip():
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _parse_timestamp(value: str) -> Optional[float]:
+    """Seconds until an RFC 3339 or HTTP date"""
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_after_from_headers(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds the provider asked us to wait, from Retry-After or exhausted rate-limit windows"""
+    if not headers:
+        return None
+    headers = CIMultiDict(headers)
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            delay = _parse_timestamp(value)
+            if delay is not None:
+                return delay
+
+    # No explicit hint: wait for whichever exhausted window resets last
+    delays = []
+    for limit in ("requests", "tokens", "input-tokens", "output-tokens"):
+        if headers.get(f"x-ratelimit-remaining-{limit}") == "0":
+            reset = headers.get(f"x-ratelimit-reset-{limit}")
+            delay = _parse_duration(reset) if reset else None
+            if delay is not None:
+                delays.append(delay)
+        if headers.get(f"anthropic-ratelimit-{limit}-remaining") == "0":
+            reset = headers.get(f"anthropic-ratelimit-{limit}-reset")
+            delay = _parse_timestamp(reset) if reset else None
+            if delay is not None:
+                delays.append(delay)
+    return max(delays) if delays else None
+
+
+class RetryState:
+    """Attempts and backoff for one request
+
+    Delays follow decorrelated jitter: each one is drawn uniformly between
+    the base delay and three times the previous delay, capped at max_delay,
+    which spreads out clients that failed together. A provider's
+    Retry-After (or rate-limit reset) overrides the drawn delay. No retry
+    is scheduled past the retry budget or the request deadline.
+    """
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+        budget: Optional[float] = None,
+        deadline: Optional[float] = None,
+        rng: Optional[random.Random] = None
+    ):
+        self.max_attempts = max_attempts if max_attempts is not None else settings.AI_RETRY_MAX_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else settings.AI_RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else settings.AI_RETRY_MAX_DELAY
+        budget = budget if budget is not None else settings.AI_RETRY_BUDGET
+        self.give_up_at = time.time() + budget
+        if deadline is not None:
+            self.give_up_at = min(self.give_up_at, deadline)
+        self.rng = rng or random
+        self.attempts = 0
+        self._previous_delay = self.base_delay
+
+    def next_delay(self, error: BaseException) -> Optional[float]:
+        """Delay before the next attempt after error, or None to give up"""
+        self.attempts += 1
+        if self.attempts >= self.max_attempts or not is_retryable(error):
+            return None
+
+        delay = min(self.max_delay, self.rng.uniform(self.base_delay, self._previous_delay * 3))
+        self._previous_delay = delay
+        if isinstance(error, AIProviderHTTPException):
+            hinted = retry_after_from_headers(error.headers)
+            if hinted is not None:
+                delay = hinted
+
+        if time.time() + delay > self.give_up_at:
+            return None
+        return delay
+
+
+class RetryStats:
+    """Retry and give-up counters per provider"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def record(self, provider: str, outcome: str):
+        counters = self._counters.setdefault(provider, {"retries": 0, "recovered": 0, "exhausted": 0})
+        counters[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {provider: dict(counters) for provider, counters in self._counters.items()}
+
+
+# Global retry stats instance
+retry_stats = RetryStats()
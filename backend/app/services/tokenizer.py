@@ -0,0 +1,308 @@
+"""
+Token counting for FlowsyAI Backend
+Pluggable local tokenizers (tiktoken, offline BPE, vectorized estimator) and model context limits
+"""
+
+import base64
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.exceptions import ContextLengthExceededException
+from app.core.logging import get_logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = get_logger(__name__)
+
+# Context window (prompt + completion tokens); "default" covers unlisted models
+MODEL_CONTEXT_LIMITS: Dict[str, Dict[str, int]] = {
+    "openai": {
+        "gpt-4": 8192,
+        "gpt-4-turbo": 128000,
+        "gpt-4o": 128000,
+        "gpt-3.5-turbo": 16385,
+        "default": 8192
+    },
+    "anthropic": {
+        "claude-3-opus-20240229": 200000,
+        "claude-3-sonnet-20240229": 200000,
+        "claude-3-haiku-20240307": 200000,
+        "default": 100000
+    },
+    "google": {
+        "gemini-pro": 32760,
+        "default": 32760
+    }
+}
+
+# Pre-tokenization close to cl100k_base's, within what the stdlib re module supports
+PRE_TOKENIZE_PATTERN = re.compile(
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+
+
+# Byte classes for the estimator; UTF-8 continuation bytes belong to no class
+_OTHER, _LETTER, _DIGIT, _PUNCTUATION, _NON_ASCII, _NEWLINE = range(6)
+_BYTE_CLASSES = np.full(256, _PUNCTUATION, dtype=np.uint8)
+_BYTE_CLASSES[[ord(" "), ord("\t"), ord("\r")]] = _OTHER
+_BYTE_CLASSES[ord("\n")] = _NEWLINE
+_BYTE_CLASSES[ord("a"):ord("z") + 1] = _LETTER
+_BYTE_CLASSES[ord("A"):ord("Z") + 1] = _LETTER
+_BYTE_CLASSES[ord("0"):ord("9") + 1] = _DIGIT
+_BYTE_CLASSES[0x80:0xC0] = _OTHER
+_BYTE_CLASSES[0xC0:] = _NON_ASCII  # UTF-8 lead bytes, one per character
+
+
+def get_context_limit(provider: str, model: str) -> int:
+    """Get context window for provider/model"""
+    limits = MODEL_CONTEXT_LIMITS.get(provider, {"default": 8192})
+    return limits.get(model, limits["default"])
+
+
+class Tokenizer(ABC):
+    """Counts tokens for many texts at once"""
+
+    name = "base"
+
+    def count(self, text: str) -> int:
+        return int(self.count_batch([text])[0])
+
+    @abstractmethod
+    def count_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Token count of each text"""
+
+
+class TiktokenTokenizer(Tokenizer):
+    """Exact counts from tiktoken (encodes batches on its own thread pool)"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count_batch(self, texts: Sequence[str]) -> np.ndarray:
+        tokens = self.encoding.encode_ordinary_batch(list(texts))
+        return np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+
+
+class BPETokenizer(Tokenizer):
+    """Byte-pair encoding from a tiktoken-format rank file, without network access
+
+    Each line of the file is a base64 token and its merge rank. Pieces are
+    merged lowest rank first, as tiktoken does; pre-tokenization uses the
+    stdlib re module, so counts can differ from tiktoken's by a token on
+    unusual Unicode input.
+    """
+
+    def __init__(self, ranks: Dict[bytes, int], name: str = "bpe"):
+        self.ranks = ranks
+        self.name = name
+        self._count_piece = lru_cache(maxsize=65536)(self._count_piece_uncached)
+
+    @classmethod
+    def from_file(cls, path: str) -> "BPETokenizer":
+        ranks = {}
+        with open(path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    token, rank = line.split()
+                    ranks[base64.b64decode(token)] = int(rank)
+        return cls(ranks, name=f"bpe:{path.rsplit('/', 1)[-1]}")
+
+    def _count_piece_uncached(self, piece: bytes) -> int:
+        if piece in self.ranks:
+            return 1
+        parts = [piece[index:index + 1] for index in range(len(piece))]
+        while len(parts) > 1:
+            best_rank, best_index = None, None
+            for index in range(len(parts) - 1):
+                rank = self.ranks.get(parts[index] + parts[index + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank, best_index = rank, index
+            if best_index is None:
+                break
+            parts[best_index:best_index + 2] = [parts[best_index] + parts[best_index + 1]]
+        return len(parts)
+
+    def count_batch(self, texts: Sequence[str]) -> np.ndarray:
+        return np.fromiter(
+            (
+                sum(self._count_piece(piece.encode("utf-8")) for piece in PRE_TOKENIZE_PATTERN.findall(text))
+                for text in texts
+            ),
+            dtype=np.int64,
+            count=len(texts)
+        )
+
+
+class EstimatingTokenizer(Tokenizer):
+    """Linear token estimate from byte-class features, computed for a whole batch in numpy
+
+    Features per text: word starts, letters past the sixth of a word (long
+    words split into several tokens), digits (grouped by up to three),
+    punctuation, non-ASCII characters and line breaks. The default weights
+    approximate cl100k_base on English text and code; calibrate() refits
+    them against reference counts.
+    """
+
+    name = "estimate"
+    FEATURES = ("word_starts", "long_word_letters", "digits", "punctuation", "non_ascii", "newlines")
+    DEFAULT_WEIGHTS = (1.0, 0.15, 0.34, 0.7, 1.0, 0.5)
+    # Bytes per numpy pass; bounds the temporary arrays for very large batches
+    CHUNK_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, weights: Optional[Sequence[float]] = None):
+        self.weights = np.asarray(weights or self.DEFAULT_WEIGHTS, dtype=np.float64)
+
+    def features(self, texts: Sequence[str]) -> np.ndarray:
+        """Feature matrix, one row per text"""
+        encoded = [text.encode("utf-8") for text in texts]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        result = np.zeros((len(encoded), len(self.FEATURES)), dtype=np.int64)
+
+        start = 0
+        while start < len(encoded):
+            end, size = start, 0
+            while end < len(encoded) and (end == start or size + lengths[end] <= self.CHUNK_BYTES):
+                size += lengths[end]
+                end += 1
+            result[start:end] = self._chunk_features(encoded[start:end], lengths[start:end])
+            start = end
+        return result
+
+    def _chunk_features(self, encoded: List[bytes], lengths: np.ndarray) -> np.ndarray:
+        result = np.zeros((len(encoded), len(self.FEATURES)), dtype=np.int64)
+        buf = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        if not len(buf):
+            return result
+
+        # Text i covers buf[bounds[i]:bounds[i + 1]]
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        classes = _BYTE_CLASSES[buf]
+
+        # Words are maximal letter runs, split at text boundaries
+        letter = classes == _LETTER
+        previous_letter = np.empty_like(letter)
+        previous_letter[0] = False
+        previous_letter[1:] = letter[:-1]
+        next_letter = np.empty_like(letter)
+        next_letter[-1] = False
+        next_letter[:-1] = letter[1:]
+        inner_bounds = bounds[1:-1][bounds[1:-1] < len(buf)]
+        previous_letter[inner_bounds] = False
+        next_letter[inner_bounds - 1] = False
+        word_starts = np.flatnonzero(letter & ~previous_letter)
+        word_ends = np.flatnonzero(letter & ~next_letter)
+
+        # Per-text sums as differences of running totals at the text boundaries
+        first_word = np.searchsorted(word_starts, bounds)
+        result[:, 0] = np.diff(first_word)
+        long_letters = np.concatenate(([0], np.cumsum(np.maximum(word_ends - word_starts - 5, 0))))
+        result[:, 1] = np.diff(long_letters[first_word])
+
+        for column, byte_class in enumerate((_DIGIT, _PUNCTUATION, _NON_ASCII, _NEWLINE), start=2):
+            positions = np.flatnonzero(classes == byte_class)
+            result[:, column] = np.diff(np.searchsorted(positions, bounds))
+        return result
+
+    def count_batch(self, texts: Sequence[str]) -> np.ndarray:
+        if not len(texts):
+            return np.zeros(0, dtype=np.int64)
+        return np.ceil(self.features(texts) @ self.weights).astype(np.int64)
+
+    def calibrate(self, texts: Sequence[str], token_counts: Sequence[int]):
+        """Refit weights by least squares against reference token counts"""
+        weights, *_ = np.linalg.lstsq(self.features(texts).astype(np.float64), np.asarray(token_counts, dtype=np.float64), rcond=None)
+        self.weights = np.clip(weights, 0.0, None)
+
+
+class TokenCounter:
+    """Picks the best tokenizer available for each model
+
+    tiktoken is used when installed and its encoding files can be loaded;
+    otherwise an offline BPE rank file (AI_TOKENIZER_BPE_FILE) if configured,
+    and the estimator as a last resort. Non-OpenAI models are counted with
+    cl100k_base as a proxy, since their tokenizers aren't available locally.
+    """
+
+    def __init__(self):
+        self._tokenizers: Dict[str, Tokenizer] = {}
+        self.estimator = EstimatingTokenizer()
+
+    def get_tokenizer(self, provider: str, model: str) -> Tokenizer:
+        encoding_name = self._encoding_name(provider, model)
+        tokenizer = self._tokenizers.get(encoding_name)
+        if tokenizer is None:
+            tokenizer = self._tokenizers[encoding_name] = self._load(encoding_name)
+        return tokenizer
+
+    def _encoding_name(self, provider: str, model: str) -> str:
+        if tiktoken is not None and provider == "openai":
+            try:
+                return tiktoken.encoding_name_for_model(model)
+            except (KeyError, AttributeError):
+                pass
+        return "cl100k_base"
+
+    def _load(self, encoding_name: str) -> Tokenizer:
+        if tiktoken is not None:
+            try:
+                return TiktokenTokenizer(tiktoken.get_encoding(encoding_name))
+            except Exception as e:
+                # Encoding files are downloaded on first use; offline workers end up here
+                logger.warning(f"tiktoken encoding {encoding_name} unavailable: {e}")
+
+        if settings.AI_TOKENIZER_BPE_FILE:
+            try:
+                return BPETokenizer.from_file(settings.AI_TOKENIZER_BPE_FILE)
+            except OSError as e:
+                logger.warning(f"BPE rank file unavailable: {e}")
+
+        return self.estimator
+
+    def is_exact(self, provider: str, model: str) -> bool:
+        """Whether counts for the model come from its own tokenizer rather than an estimate or proxy"""
+        return provider == "openai" and not isinstance(self.get_tokenizer(provider, model), EstimatingTokenizer)
+
+    def count(self, provider: str, model: str, text: str) -> int:
+        return self.get_tokenizer(provider, model).count(text)
+
+    def count_batch(self, provider: str, model: str, texts: Sequence[str]) -> np.ndarray:
+        return self.get_tokenizer(provider, model).count_batch(texts)
+
+    def fits_without_counting(self, provider: str, model: str, prompt: str, max_tokens: int) -> bool:
+        """Whether the prompt fits on its byte length alone"""
+        # Byte-level BPE never produces more tokens than bytes: most prompts need no tokenizing
+        return len(prompt.encode("utf-8")) + max_tokens <= get_context_limit(provider, model)
+
+    def check_context(self, provider: str, model: str, prompt: str, max_tokens: int):
+        """Raise if prompt plus completion can't fit the model's context window
+
+        Only exact counts reject at the limit. Estimates (and cl100k_base
+        standing in for other providers' tokenizers) must overshoot it by
+        AI_CONTEXT_ESTIMATE_MARGIN, so a prompt that would have fit isn't
+        refused on a guess; closer calls are logged and sent.
+        """
+        if self.fits_without_counting(provider, model, prompt, max_tokens):
+            return
+        limit = get_context_limit(provider, model)
+        prompt_tokens = self.count(provider, model, prompt)
+        if prompt_tokens + max_tokens <= limit:
+            return
+        if self.is_exact(provider, model) or prompt_tokens + max_tokens > limit * (1 + settings.AI_CONTEXT_ESTIMATE_MARGIN):
+            raise ContextLengthExceededException(model, prompt_tokens, max_tokens, limit)
+        logger.warning(
+            f"Request for {provider}:{model} may exceed its context window: "
+            f"estimated {prompt_tokens} prompt + {max_tokens} completion tokens, limit {limit}"
+        )
+
+
+# Global token counter instance
+token_counter = TokenCounter()
@@ -0,0 +1,337 @@
+"""
+Workflow Execution Engine for FlowsyAI Backend
+Plan compilation, caching and concurrent DAG execution for workflow graphs
+"""
+
+import asyncio
+import copy
+from dataclasses import dataclass
+from string import Formatter
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple, Mapping, Hashable
+
+from app.core.config import settings
+from app.core.exceptions import WorkflowExecutionException
+from app.core.local_cache import LRUCache
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ExecutionContext:
+    """Per-execution state shared with step handlers"""
+    workflow_id: int
+    execution_id: int
+    orchestrator: Any = None
+
+
+StepHandler = Callable[["CompiledStep", Dict[str, Any], ExecutionContext], Awaitable[Dict[str, Any]]]
+NodeCallback = Callable[["CompiledStep", int, int], Awaitable[None]]
+
+# Config keys holding str.format templates that are pre-parsed at compile time
+TEMPLATE_FIELDS = ("prompt", "template")
+
+
+class WorkflowGraph:
+    """Directed acyclic graph of workflow nodes"""
+
+    def __init__(self, nodes: Dict[str, Dict[str, Any]], edges: List[Tuple[str, str]]):
+        self.nodes = nodes
+        self.predecessors: Dict[str, List[str]] = {node_id: [] for node_id in nodes}
+        self.successors: Dict[str, List[str]] = {node_id: [] for node_id in nodes}
+
+        for source, target in edges:
+            if source not in nodes or target not in nodes:
+                raise WorkflowExecutionException(
+                    f"Connection references unknown node: {source} -> {target}"
+                )
+            if target not in self.successors[source]:
+                self.successors[source].append(target)
+                self.predecessors[target].append(source)
+
+        self.order = self._topological_sort()
+        position = {node_id: i for i, node_id in enumerate(self.order)}
+
+        # Keep join inputs in a deterministic (topological) merge order
+        for node_id in nodes:
+            self.predecessors[node_id].sort(key=position.__getitem__)
+        self.sinks = [node_id for node_id in self.order if not self.successors[node_id]]
+
+    @classmethod
+    def from_workflow_data(cls, workflow_data: Dict[str, Any]) -> "WorkflowGraph":
+        """Build graph from builder `nodes`/`connections` or legacy linear `steps`"""
+        if workflow_data.get("nodes"):
+            nodes = {}
+            for i, node in enumerate(workflow_data["nodes"]):
+                node_id = str(node.get("id", f"node_{i}"))
+                if node_id in nodes:
+                    raise WorkflowExecutionException(f"Duplicate node id: {node_id}")
+                nodes[node_id] = _normalize_node(node_id, node)
+
+            connections = workflow_data.get("connections") or workflow_data.get("edges") or []
+            edges = [
+                (
+                    str(conn.get("from", conn.get("source"))),
+                    str(conn.get("to", conn.get("target")))
+                )
+                for conn in connections
+            ]
+            return cls(nodes, edges)
+
+        # Legacy format: steps run one after another
+        nodes = {}
+        edges = []
+        previous = None
+        for i, step in enumerate(workflow_data.get("steps", [])):
+            node_id = f"step_{i}"
+            nodes[node_id] = _normalize_node(node_id, step)
+            if previous is not None:
+                edges.append((previous, node_id))
+            previous = node_id
+        return cls(nodes, edges)
+
+    def _topological_sort(self) -> List[str]:
+        """Kahn's algorithm, preserving declaration order among ready nodes"""
+        indegree = {node_id: len(preds) for node_id, preds in self.predecessors.items()}
+        ready = [node_id for node_id in self.nodes if indegree[node_id] == 0]
+        order = []
+
+        while ready:
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for successor in self.successors[node_id]:
+                indegree[successor] -= 1
+                if indegree[successor] == 0:
+                    ready.append(successor)
+
+        if len(order) != len(self.nodes):
+            cyclic = [node_id for node_id in self.nodes if indegree[node_id] > 0]
+            raise WorkflowExecutionException(f"Workflow graph contains a cycle: {cyclic}")
+
+        return order
+
+
+def _normalize_node(node_id: str, node: Dict[str, Any]) -> Dict[str, Any]:
+    """Give builder nodes and legacy steps the same shape for step handlers"""
+    node_data = node.get("data") or {}
+    step = dict(node)
+    step["id"] = node_id
+    step["name"] = node.get("name") or node_data.get("label") or node_id
+    step["type"] = node.get("type", "unknown")
+    step["config"] = node.get("config") or node_data.get("config") or {}
+    return step
+
+
+class CompiledTemplate:
+    """str.format template parsed once and rendered from pre-split parts"""
+
+    __slots__ = ("source", "_parts", "_simple")
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parts: Tuple[Tuple[bool, str], ...] = ()
+        self._simple = True
+
+        parts = []
+        try:
+            for literal, field, spec, conversion in Formatter().parse(source):
+                if literal:
+                    parts.append((True, literal))
+                if field is not None:
+                    # Attribute/index lookups, specs and conversions keep full str.format semantics
+                    if not field.isidentifier() or spec or conversion:
+                        self._simple = False
+                    parts.append((False, field))
+        except ValueError:
+            # Malformed templates fail at render time, as they did before compilation
+            self._simple = False
+
+        self._parts = tuple(parts)
+
+    def render(self, data: Mapping[str, Any]) -> str:
+        """Equivalent to source.format(**data)"""
+        if not self._simple:
+            return self.source.format(**data)
+        return "".join([text if is_literal else format(data[text]) for is_literal, text in self._parts])
+
+
+@dataclass(frozen=True)
+class CompiledStep:
+    """Immutable, pre-resolved workflow node"""
+    id: str
+    name: str
+    type: str
+    handler: StepHandler
+    config: Mapping[str, Any]
+    templates: Mapping[str, CompiledTemplate]
+    output_key: Optional[str]
+    predecessors: Tuple[str, ...]
+    successors: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class ExecutionPlan:
+    """Immutable execution plan compiled from workflow_data"""
+    steps: Mapping[str, CompiledStep]
+    order: Tuple[str, ...]
+    sinks: Tuple[str, ...]
+    max_concurrency: Optional[int] = None
+
+
+async def _passthrough_step(step: CompiledStep, data: Dict[str, Any], context: ExecutionContext) -> Dict[str, Any]:
+    """Handler for node types without an executor"""
+    return data
+
+
+def compile_workflow(workflow_data: Dict[str, Any], handlers: Dict[str, StepHandler]) -> ExecutionPlan:
+    """Compile raw workflow_data into an immutable execution plan"""
+    graph = WorkflowGraph.from_workflow_data(workflow_data)
+    steps = {}
+
+    for node_id in graph.order:
+        node = graph.nodes[node_id]
+        handler = handlers.get(node["type"])
+        if handler is None:
+            logger.warning(f"Unknown step type: {node['type']}")
+            handler = _passthrough_step
+
+        config = copy.deepcopy(node["config"])
+        templates = {
+            field: CompiledTemplate(config[field])
+            for field in TEMPLATE_FIELDS
+            if isinstance(config.get(field), str)
+        }
+
+        steps[node_id] = CompiledStep(
+            id=node_id,
+            name=node["name"],
+            type=node["type"],
+            handler=handler,
+            config=MappingProxyType(config),
+            templates=MappingProxyType(templates),
+            output_key=node.get("output_key"),
+            predecessors=tuple(graph.predecessors[node_id]),
+            successors=tuple(graph.successors[node_id]),
+        )
+
+    return ExecutionPlan(
+        steps=MappingProxyType(steps),
+        order=tuple(graph.order),
+        sinks=tuple(graph.sinks),
+        max_concurrency=(workflow_data.get("settings") or {}).get("max_concurrency"),
+    )
+
+
+class PlanCache:
+    """Per-worker LRU cache of compiled plans keyed by (workflow_id, graph digest)"""
+
+    def __init__(self, maxsize: int):
+        self._cache = LRUCache(maxsize)
+
+    def get(self, key: Hashable) -> Optional[ExecutionPlan]:
+        """Get cached plan"""
+        return self._cache.get(key)
+
+    def put(self, key: Hashable, plan: ExecutionPlan):
+        """Cache compiled plan"""
+        self._cache.set(key, plan)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return self._cache.get_stats()
+
+
+class DAGExecutor:
+    """Runs compiled plan steps concurrently as their dependencies complete"""
+
+    def __init__(
+        self,
+        plan: ExecutionPlan,
+        max_concurrency: Optional[int] = None,
+        on_node_complete: Optional[NodeCallback] = None
+    ):
+        self.plan = plan
+        self.max_concurrency = max(
+            1, max_concurrency or plan.max_concurrency or settings.WORKFLOW_MAX_CONCURRENCY
+        )
+        self.on_node_complete = on_node_complete
+
+    async def run(self, input_data: Dict[str, Any], context: ExecutionContext) -> Dict[str, Any]:
+        """Execute the plan and return the merged output of its sink nodes"""
+        plan = self.plan
+        total = len(plan.order)
+        if total == 0:
+            return dict(input_data)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        indegree = {node_id: len(plan.steps[node_id].predecessors) for node_id in plan.order}
+        outputs: Dict[str, Dict[str, Any]] = {}
+        running: Dict[asyncio.Task, str] = {}
+        completed = 0
+
+        def launch(node_id: str):
+            step = plan.steps[node_id]
+            data = self._merge_inputs(step, input_data, outputs)
+            task = asyncio.create_task(self._run_node(step, data, context, semaphore))
+            running[task] = node_id
+
+        for node_id in plan.order:
+            if indegree[node_id] == 0:
+                launch(node_id)
+
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    node_id = running.pop(task)
+                    outputs[node_id] = task.result()
+                    completed += 1
+
+                    for successor in plan.steps[node_id].successors:
+                        indegree[successor] -= 1
+                        if indegree[successor] == 0:
+                            launch(successor)
+
+                    if self.on_node_complete:
+                        await self.on_node_complete(plan.steps[node_id], completed, total)
+        except BaseException:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            raise
+
+        result: Dict[str, Any] = {}
+        for node_id in plan.sinks:
+            result.update(outputs[node_id])
+        return result
+
+    def _merge_inputs(
+        self,
+        step: CompiledStep,
+        input_data: Dict[str, Any],
+        outputs: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build a node's input; join nodes merge predecessor outputs in topological order"""
+        if not step.predecessors:
+            return dict(input_data)
+
+        merged: Dict[str, Any] = {}
+        for predecessor in step.predecessors:
+            merged.update(outputs[predecessor])
+        return merged
+
+    async def _run_node(
+        self,
+        step: CompiledStep,
+        data: Dict[str, Any],
+        context: ExecutionContext,
+        semaphore: asyncio.Semaphore
+    ) -> Dict[str, Any]:
+        """Run a single node under the execution's concurrency limit"""
+        async with semaphore:
+            return await step.handler(step, data, context)
+
+
+# Per-worker compiled plan cache
+plan_cache = PlanCache(settings.WORKFLOW_PLAN_CACHE_SIZE)
@@ -3,11 +3,18 @@ AI processing tasks for Celery
 Async AI service calls and batch processing
 """
 
-import asyncio
-from typing import List, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional
+
+from sqlalchemy import delete
 
 from app.core.celery import celery_app
-from app.services.ai_orchestrator import AIOrchestrator, AIRequest, AIProvider
+from app.core.database import AsyncSessionLocal
+from app.core.worker_loop import run_async
+from app.models.ai_usage import AIUsageRollup
+from app.services.ai_analytics import usage_analytics
+from app.services.ai_orchestrator import AIOrchestrator, AIRequest, AIProvider, RequestPriority
+from app.services.prompt_prefix import find_shared_prefixes
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -17,30 +24,31 @@ logger = get_logger(__name__)
 def process_ai_batch_task(requests_data: List[Dict[str, Any]]):
     """Process batch AI requests asynchronously"""
     
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        result = loop.run_until_complete(_process_ai_batch_async(requests_data))
-        return result
-    finally:
-        loop.close()
+    return run_async(_process_ai_batch_async(requests_data))
 
 
 async def _process_ai_batch_async(requests_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Async batch AI processing"""
     
+    # Split off prefixes shared across the batch so providers can cache them
+    prefixes = find_shared_prefixes([req_data.get("prompt", "") for req_data in requests_data])
+    
     # Convert to AIRequest objects
     requests = []
-    for req_data in requests_data:
+    for req_data, prefix in zip(requests_data, prefixes):
+        prompt = req_data.get("prompt", "")
+        if prefix:
+            prompt = prompt[len(prefix):]
         request = AIRequest(
             provider=AIProvider(req_data.get("provider", "openai")),
             model=req_data.get("model", "gpt-3.5-turbo"),
-            prompt=req_data.get("prompt", ""),
+            prompt=prompt,
+            prompt_prefix=prefix,
             max_tokens=req_data.get("max_tokens", 1000),
             temperature=req_data.get("temperature", 0.7),
             user_id=req_data.get("user_id"),
-            metadata=req_data.get("metadata", {})
+            metadata=req_data.get("metadata", {}),
+            priority=RequestPriority.BATCH
         )
         requests.append(request)
     
@@ -69,14 +77,7 @@ async def _process_ai_batch_async(requests_data: List[Dict[str, Any]]) -> List[D
 def process_single_ai_request_task(request_data: Dict[str, Any]):
     """Process single AI request asynchronously"""
     
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        result = loop.run_until_complete(_process_single_ai_request_async(request_data))
-        return result
-    finally:
-        loop.close()
+    return run_async(_process_single_ai_request_async(request_data))
 
 
 async def _process_single_ai_request_async(request_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -105,3 +106,44 @@ async def _process_single_ai_request_async(request_data: Dict[str, Any]) -> Dict
         "processing_time": response.processing_time,
         "metadata": response.metadata or {}
     }
+
+
+@celery_app.task(name="rollup_ai_usage")
+def rollup_ai_usage_task(day: Optional[str] = None):
+    """Persist a day's AI usage aggregates (default: yesterday, UTC) as rollup rows"""
+    
+    return run_async(_rollup_ai_usage_async(day))
+
+
+async def _rollup_ai_usage_async(day: Optional[str] = None) -> Dict[str, Any]:
+    """Async AI usage rollup"""
+    
+    day = day or (datetime.utcnow().date() - timedelta(days=1)).isoformat()
+    
+    # Include this worker's unflushed data before reading the shared aggregates
+    await usage_analytics.flush()
+    aggregates = await usage_analytics.get_day(day)
+    
+    async with AsyncSessionLocal() as db:
+        # Re-running a rollup replaces the day's rows
+        await db.execute(delete(AIUsageRollup).where(AIUsageRollup.day == date.fromisoformat(day)))
+        for dimension, aggregate in aggregates.items():
+            summary = aggregate.summary()
+            db.add(AIUsageRollup(
+                day=date.fromisoformat(day),
+                dimension=dimension,
+                requests=aggregate.requests,
+                errors=aggregate.errors,
+                cache_hits=aggregate.cache_hits,
+                tokens=aggregate.tokens,
+                cost=aggregate.cost,
+                latency_sum=aggregate.latency_sum,
+                latency_histogram=aggregate.histogram,
+                p50_latency=summary["p50_latency"],
+                p95_latency=summary["p95_latency"],
+                p99_latency=summary["p99_latency"]
+            ))
+        await db.commit()
+    
+    logger.info(f"Rolled up AI usage for {day}: {len(aggregates)} dimensions")
+    return {"day": day, "dimensions": len(aggregates)}
@@ -3,14 +3,13 @@ Celery tasks for file processing in FlowsyAI Backend
 Handles asynchronous file processing operations
 """
 
-import asyncio
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-from celery import current_task
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.celery import celery_app
+from app.core.worker_loop import run_async, TaskStateProxy
 from app.core.database import AsyncSessionLocal
 from app.core.logging import get_logger
 from app.models.file import FileModel, FileProcessingJob
@@ -23,11 +22,11 @@ def process_file_task(self, file_id: str, user_id: str, options: Dict[str, Any]
     """Process uploaded file asynchronously"""
     try:
         # Run async function in sync context
-        return asyncio.run(_process_file_async(self, file_id, user_id, options or {}))
+        return run_async(_process_file_async(TaskStateProxy(self), file_id, user_id, options or {}))
     except Exception as e:
         logger.error(f"File processing task failed for file {file_id}: {e}")
         # Update file status to failed
-        asyncio.run(_update_file_status(file_id, 'failed', {'error': str(e)}))
+        run_async(_update_file_status(file_id, 'failed', {'error': str(e)}))
         raise
 
 async def _process_file_async(task, file_id: str, user_id: str, options: Dict[str, Any]):
@@ -137,23 +136,23 @@ async def _update_file_status(file_id: str, status: str, result: Dict[str, Any])
         except Exception as e:
             logger.error(f"Failed to update file status: {e}")
 
-@celery_app.task(name="batch_process_files")
-def batch_process_files_task(file_ids: list, user_id: str, options: Dict[str, Any] = None):
+@celery_app.task(bind=True, name="batch_process_files")
+def batch_process_files_task(self, file_ids: list, user_id: str, options: Dict[str, Any] = None):
     """Process multiple files in batch"""
     try:
-        return asyncio.run(_batch_process_files_async(file_ids, user_id, options or {}))
+        return run_async(_batch_process_files_async(TaskStateProxy(self), file_ids, user_id, options or {}))
     except Exception as e:
         logger.error(f"Batch file processing failed: {e}")
         raise
 
-async def _batch_process_files_async(file_ids: list, user_id: str, options: Dict[str, Any]):
+async def _batch_process_files_async(task, file_ids: list, user_id: str, options: Dict[str, Any]):
     """Async batch file processing implementation"""
     results = []
     
     for i, file_id in enumerate(file_ids):
         try:
             # Update overall progress
-            current_task.update_state(
+            task.update_state(
                 state='PROGRESS',
                 meta={
                     'current': i,
@@ -163,7 +162,7 @@ async def _batch_process_files_async(file_ids: list, user_id: str, options: Dict
             )
             
             # Process individual file
-            result = await _process_file_async(current_task, file_id, user_id, options)
+            result = await _process_file_async(task, file_id, user_id, options)
             results.append(result)
             
         except Exception as e:
@@ -184,7 +183,7 @@ async def _batch_process_files_async(file_ids: list, user_id: str, options: Dict
 def extract_file_content_task(file_id: str, extraction_type: str = 'text'):
     """Extract specific content from file"""
     try:
-        return asyncio.run(_extract_file_content_async(file_id, extraction_type))
+        return run_async(_extract_file_content_async(file_id, extraction_type))
     except Exception as e:
         logger.error(f"Content extraction failed for file {file_id}: {e}")
         raise
@@ -231,7 +230,7 @@ async def _extract_file_content_async(file_id: str, extraction_type: str):
 def generate_file_preview_task(file_id: str, preview_type: str = 'thumbnail'):
     """Generate preview for file"""
     try:
-        return asyncio.run(_generate_file_preview_async(file_id, preview_type))
+        return run_async(_generate_file_preview_async(file_id, preview_type))
     except Exception as e:
         logger.error(f"Preview generation failed for file {file_id}: {e}")
         raise
@@ -268,7 +267,7 @@ async def _generate_file_preview_async(file_id: str, preview_type: str):
 def cleanup_old_files_task(days_old: int = 30):
     """Clean up old processed files"""
     try:
-        return asyncio.run(_cleanup_old_files_async(days_old))
+        return run_async(_cleanup_old_files_async(days_old))
     except Exception as e:
         logger.error(f"File cleanup failed: {e}")
         raise
@@ -316,7 +315,7 @@ async def _cleanup_old_files_async(days_old: int):
 def analyze_file_content_task(file_id: str, analysis_type: str = 'basic'):
     """Analyze file content with AI"""
     try:
-        return asyncio.run(_analyze_file_content_async(file_id, analysis_type))
+        return run_async(_analyze_file_content_async(file_id, analysis_type))
     except Exception as e:
         logger.error(f"File analysis failed for file {file_id}: {e}")
         raise
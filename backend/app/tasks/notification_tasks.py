@@ -3,10 +3,10 @@ Notification tasks for Celery
 Email, webhook, and other notification processing
 """
 
-import asyncio
 from typing import Dict, Any
 
 from app.core.celery import celery_app
+from app.core.worker_loop import run_async
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -36,14 +36,7 @@ def send_email_notification_task(
 def send_webhook_notification_task(webhook_url: str, payload: Dict[str, Any]):
     """Send webhook notification asynchronously"""
     
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        result = loop.run_until_complete(_send_webhook_async(webhook_url, payload))
-        return result
-    finally:
-        loop.close()
+    return run_async(_send_webhook_async(webhook_url, payload))
 
 
 async def _send_webhook_async(webhook_url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -3,7 +3,7 @@ Workflow processing tasks for Celery
 Async workflow execution and management
 """
 
-import asyncio
+import hashlib
 import json
 from typing import Dict, Any, Optional
 from datetime import datetime
@@ -13,16 +13,27 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.celery import celery_app
+from app.core.worker_loop import run_async, TaskStateProxy
 from app.core.database import AsyncSessionLocal
 from app.models.workflow import Workflow, WorkflowExecution
 from app.models.user import User
 from app.services.ai_orchestrator import AIOrchestrator, AIRequest, AIProvider
+from app.services.expressions import compile_expression
+from app.services.workflow_engine import (
+    DAGExecutor,
+    CompiledStep,
+    ExecutionContext,
+    ExecutionPlan,
+    compile_workflow,
+    plan_cache
+)
 from app.core.logging import get_logger
 from app.core.websocket import (
     emit_workflow_started,
     emit_workflow_progress,
     emit_workflow_completed,
-    emit_workflow_failed
+    emit_workflow_failed,
+    TokenStreamEmitter
 )
 
 logger = get_logger(__name__)
@@ -39,16 +50,9 @@ def execute_workflow_task(self, workflow_id: int, user_id: int, input_data: Opti
     )
     
     # Run async workflow execution
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        result = loop.run_until_complete(
-            _execute_workflow_async(workflow_id, user_id, input_data, self)
-        )
-        return result
-    finally:
-        loop.close()
+    return run_async(
+        _execute_workflow_async(workflow_id, user_id, input_data, TaskStateProxy(self))
+    )
 
 
 async def _execute_workflow_async(
@@ -68,6 +72,8 @@ async def _execute_workflow_async(
             if not workflow:
                 raise Exception(f"Workflow {workflow_id} not found")
             
+            plan = _get_execution_plan(workflow)
+            
             # Create execution record
             execution = WorkflowExecution(
                 workflow_id=workflow_id,
@@ -92,9 +98,11 @@ async def _execute_workflow_async(
             
             # Execute workflow steps
             output_data = await _process_workflow_steps(
-                workflow.workflow_data, 
+                plan, 
                 input_data or {}, 
-                task_instance
+                task_instance,
+                workflow_id=workflow_id,
+                execution_id=execution.id
             )
             
             # Update execution with results
@@ -144,53 +152,65 @@ async def _execute_workflow_async(
             raise
 
 
+def _get_execution_plan(workflow: Workflow) -> ExecutionPlan:
+    """Get compiled plan from the worker cache, compiling on first use of a graph"""
+    
+    # Keyed on the graph itself: updated_at also moves when execution metrics are saved
+    workflow_data = workflow.workflow_data or {}
+    digest = hashlib.blake2b(
+        json.dumps(workflow_data, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"),
+        digest_size=16
+    ).hexdigest()
+    cache_key = (workflow.id, digest)
+    plan = plan_cache.get(cache_key)
+    
+    if plan is None:
+        plan = compile_workflow(workflow_data, STEP_HANDLERS)
+        plan_cache.put(cache_key, plan)
+        logger.debug(f"Compiled execution plan for workflow {workflow.id}")
+    
+    return plan
+
+
 async def _process_workflow_steps(
-    workflow_data: Dict[str, Any], 
+    plan: ExecutionPlan, 
     input_data: Dict[str, Any], 
-    task_instance
+    task_instance,
+    workflow_id: int = 0,
+    execution_id: int = 0
 ) -> Dict[str, Any]:
-    """Process individual workflow steps"""
-    
-    steps = workflow_data.get("steps", [])
-    current_data = input_data.copy()
-    
-    async with AIOrchestrator() as orchestrator:
-        for i, step in enumerate(steps):
-            # Update progress
-            progress = 25 + (i / len(steps)) * 50  # 25-75% range
-            progress_data = {
-                "current": int(progress),
-                "total": 100,
-                "status": f"Processing step {i+1}/{len(steps)}: {step.get('name', 'Unknown')}",
-                "step": i + 1,
-                "total_steps": len(steps),
-                "step_name": step.get('name', 'Unknown'),
-                "step_type": step.get('type', 'unknown')
-            }
+    """Process workflow nodes as a DAG, running independent branches concurrently"""
 
-            task_instance.update_state(
-                state="PROGRESS",
-                meta=progress_data
-            )
+    async def on_node_complete(step: CompiledStep, completed: int, total: int):
+        # Update progress
+        progress = 25 + (completed / total) * 50  # 25-75% range
+        progress_data = {
+            "current": int(progress),
+            "total": 100,
+            "status": f"Completed step {completed}/{total}: {step.name}",
+            "step": completed,
+            "total_steps": total,
+            "step_id": step.id,
+            "step_name": step.name,
+            "step_type": step.type
+        }
 
-            # Emit progress via WebSocket
-            await emit_workflow_progress(
-                workflow_data.get('workflow_id', 0),
-                workflow_data.get('execution_id', 0),
-                progress_data
-            )
-            
-            # Process step based on type
-            step_type = step.get("type", "unknown")
-            
-            if step_type == "ai_processing":
-                current_data = await _process_ai_step(step, current_data, orchestrator)
-            elif step_type == "data_transformation":
-                current_data = await _process_data_step(step, current_data)
-            elif step_type == "condition":
-                current_data = await _process_condition_step(step, current_data)
-            else:
-                logger.warning(f"Unknown step type: {step_type}")
+        task_instance.update_state(
+            state="PROGRESS",
+            meta=progress_data
+        )
+
+        # Emit progress via WebSocket
+        await emit_workflow_progress(workflow_id, execution_id, progress_data)
+    
+    async with AIOrchestrator() as orchestrator:
+        context = ExecutionContext(
+            workflow_id=workflow_id,
+            execution_id=execution_id,
+            orchestrator=orchestrator
+        )
+        executor = DAGExecutor(plan, on_node_complete=on_node_complete)
+        current_data = await executor.run(input_data, context)
     
     # Final progress update
     task_instance.update_state(
@@ -202,14 +222,15 @@ async def _process_workflow_steps(
 
 
 async def _process_ai_step(
-    step: Dict[str, Any], 
+    step: CompiledStep, 
     data: Dict[str, Any], 
-    orchestrator: AIOrchestrator
+    context: ExecutionContext
 ) -> Dict[str, Any]:
     """Process AI step"""
     
-    config = step.get("config", {})
-    prompt = config.get("prompt", "").format(**data)
+    config = step.config
+    template = step.templates.get("prompt")
+    prompt = template.render(data) if template else ""
     
     request = AIRequest(
         provider=AIProvider(config.get("provider", "openai")),
@@ -219,21 +240,33 @@ async def _process_ai_step(
         temperature=config.get("temperature", 0.7)
     )
     
-    response = await orchestrator.process_request(request)
+    if config.get("stream"):
+        # Forward tokens to the workflow room as they are generated
+        emitter = TokenStreamEmitter(context.workflow_id, context.execution_id, step.id)
+        try:
+            response = await context.orchestrator.process_request_stream(request, emitter.push)
+        finally:
+            await emitter.close()
+    else:
+        response = await context.orchestrator.process_request(request)
     
     if response.success:
-        data[step.get("output_key", "ai_response")] = response.content
+        data[step.output_key or "ai_response"] = response.content
     else:
         raise Exception(f"AI step failed: {response.error}")
     
     return data
 
 
-async def _process_data_step(step: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+async def _process_data_step(
+    step: CompiledStep, 
+    data: Dict[str, Any], 
+    context: ExecutionContext
+) -> Dict[str, Any]:
     """Process data transformation step"""
     
     # Simple data transformation logic
-    config = step.get("config", {})
+    config = step.config
     operation = config.get("operation", "passthrough")
     
     if operation == "extract":
@@ -241,41 +274,45 @@ async def _process_data_step(step: Dict[str, Any], data: Dict[str, Any]) -> Dict
         if key and key in data:
             data["extracted_value"] = data[key]
     elif operation == "format":
-        template = config.get("template", "{}")
-        data["formatted_output"] = template.format(**data)
+        template = step.templates.get("template")
+        data["formatted_output"] = template.render(data) if template else "{}".format(**data)
     
     return data
 
 
-async def _process_condition_step(step: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+async def _process_condition_step(
+    step: CompiledStep, 
+    data: Dict[str, Any], 
+    context: ExecutionContext
+) -> Dict[str, Any]:
     """Process conditional step"""
     
-    config = step.get("config", {})
+    config = step.config
     condition = config.get("condition", "true")
     
-    # Simple condition evaluation (in production, use safer evaluation)
+    # Safe expression language; compiled once per distinct condition text
     try:
-        if eval(condition, {"__builtins__": {}}, data):
-            data["condition_result"] = True
-        else:
-            data["condition_result"] = False
-    except:
+        data["condition_result"] = bool(compile_expression(condition)(data))
+    except Exception as e:
+        logger.debug(f"Condition '{condition}' evaluated to False: {e}")
         data["condition_result"] = False
     
     return data
 
 
+# Step type -> handler dispatch table used by the DAG executor
+STEP_HANDLERS = {
+    "ai_processing": _process_ai_step,
+    "data_transformation": _process_data_step,
+    "condition": _process_condition_step,
+}
+
+
 @celery_app.task(name="cleanup_old_executions")
 def cleanup_old_executions():
     """Cleanup old workflow executions"""
     
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    
-    try:
-        loop.run_until_complete(_cleanup_old_executions_async())
-    finally:
-        loop.close()
+    run_async(_cleanup_old_executions_async())
 
 
 async def _cleanup_old_executions_async():
@@ -0,0 +1,231 @@
+"""
+Cache serialization benchmark for FlowsyAI Backend
+Compares the previous JSON-then-pickle guessing with the tagged cache codec
+
+Usage: python benchmarks/bench_cache.py [--iterations 20000]
+           [--redis-url redis://localhost:6379/15]  (also measures get/set round trips;
+           --fake uses fakeredis instead of a server)
+           [--bulk 1000,10000,100000]  (set_many/get_many throughput; needs --redis-url or --fake)
+"""
+
+import argparse
+import asyncio
+import json
+import pickle
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.cache_codec import decode, encode, lz4_frame, orjson
+from app.core.redis import CacheManager, RedisManager
+from app.services.ai_cache import response_to_dict
+from app.services.ai_orchestrator import AIProvider, AIResponse
+
+
+def make_workflow_data(nodes: int = 30) -> dict:
+    return {
+        "name": "Support triage",
+        "settings": {"max_concurrency": 4, "timeout": 300},
+        "nodes": [
+            {
+                "id": f"node_{index}",
+                "type": "ai_text" if index % 3 else "condition",
+                "position": {"x": index * 120, "y": (index % 5) * 80},
+                "config": {
+                    "provider": "openai",
+                    "model": "gpt-3.5-turbo",
+                    "prompt": f"Step {index}: summarize {{input}} for the support team in two sentences.",
+                    "temperature": 0.2,
+                    "max_tokens": 400,
+                    "condition": "score > 0.8 and status == 'open'",
+                },
+            }
+            for index in range(nodes)
+        ],
+        "connections": [{"source": f"node_{index}", "target": f"node_{index + 1}"} for index in range(nodes - 1)],
+    }
+
+
+def make_ai_response() -> AIResponse:
+    return AIResponse(
+        success=True,
+        content="The customer reports that the printer overheats after ten minutes of use. " * 20,
+        provider=AIProvider.OPENAI,
+        model="gpt-3.5-turbo",
+        tokens_used=412,
+        processing_time=1.42,
+        metadata={"retries": 0, "finish_reason": "stop"},
+    )
+
+
+PAYLOADS = {
+    "workflow_data dict": make_workflow_data(),
+    "AIResponse object": make_ai_response(),
+    "AIResponse dict": response_to_dict(make_ai_response()),
+    "plain text": "Ticket closed after the customer confirmed the fix. " * 4,
+    "large text": "lorem ipsum dolor sit amet " * 2000,
+}
+
+
+def legacy_encode(value) -> bytes:
+    """Previous CacheManager.set serialization plus the utf-8 step of the decode_responses client"""
+    if isinstance(value, (dict, list, tuple)):
+        serialized = json.dumps(value)
+    elif isinstance(value, (str, int, float, bool)):
+        serialized = value
+    else:
+        serialized = pickle.dumps(value).decode("latin1")
+    return str(serialized).encode("utf-8")
+
+
+def legacy_decode(data: bytes):
+    """Previous CacheManager.get deserialization of a decode_responses reply"""
+    value = data.decode("utf-8")
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        try:
+            return pickle.loads(value.encode("latin1"))
+        except Exception:
+            return value
+
+
+def ops_per_second(function, argument, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function(argument)
+    return iterations / (time.perf_counter() - started)
+
+
+def bench_codecs(iterations: int):
+    print(f"Codec only, {iterations:,} operations per payload (ops/s)\n")
+    print(f"{'payload':<20} {'bytes old':>10} {'bytes new':>10} {'set old':>10} {'set new':>10} {'get old':>10} {'get new':>10}")
+    for name, value in PAYLOADS.items():
+        old_data, new_data = legacy_encode(value), encode(value)
+        print(
+            f"{name:<20} {len(old_data):>10,} {len(new_data):>10,}"
+            f" {ops_per_second(legacy_encode, value, iterations):>10,.0f}"
+            f" {ops_per_second(encode, value, iterations):>10,.0f}"
+            f" {ops_per_second(legacy_decode, old_data, iterations):>10,.0f}"
+            f" {ops_per_second(decode, new_data, iterations):>10,.0f}"
+        )
+
+
+async def bench_redis(args: argparse.Namespace):
+    if args.fake:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        text_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        raw_client = fakeredis.FakeAsyncRedis(server=server)
+    else:
+        import redis.asyncio as redis
+        text_client = redis.from_url(args.redis_url, decode_responses=True)
+        raw_client = redis.from_url(args.redis_url)
+
+    if args.bulk:
+        try:
+            await bench_bulk(args, raw_client)
+        finally:
+            await raw_client.aclose() if hasattr(raw_client, "aclose") else await raw_client.close()
+            await text_client.aclose() if hasattr(text_client, "aclose") else await text_client.close()
+        return
+
+    iterations = max(1, args.iterations // 10)
+    print(f"\nRound trips against {'fakeredis' if args.fake else args.redis_url}, {iterations:,} per payload (ops/s)\n")
+    print(f"{'payload':<20} {'set old':>10} {'set new':>10} {'get old':>10} {'get new':>10}")
+    try:
+        for name, value in PAYLOADS.items():
+            timings = []
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                await text_client.set("bench:cache:old", legacy_encode(value).decode("utf-8"))
+            timings.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                await raw_client.set("bench:cache:new", encode(value))
+            timings.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                legacy_decode((await text_client.get("bench:cache:old")).encode("utf-8"))
+            timings.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                decode(await raw_client.get("bench:cache:new"))
+            timings.append(time.perf_counter() - started)
+
+            print(f"{name:<20} " + " ".join(f"{iterations / elapsed:>10,.0f}" for elapsed in timings))
+    finally:
+        await raw_client.delete("bench:cache:old", "bench:cache:new")
+        await text_client.aclose() if hasattr(text_client, "aclose") else await text_client.close()
+        await raw_client.aclose() if hasattr(raw_client, "aclose") else await raw_client.close()
+
+
+async def legacy_set_many(client, mapping: dict, ttl: int):
+    """Previous set_many: MSET, then a second round trip of EXPIREs"""
+    await client.mset({key: encode(value) for key, value in mapping.items()})
+    pipe = client.pipeline()
+    for key in mapping:
+        pipe.expire(key, ttl)
+    await pipe.execute()
+
+
+async def bench_bulk(args: argparse.Namespace, client):
+    """set_many/get_many with the previous MSET + EXPIRE path as baseline"""
+    redis_manager = RedisManager()
+    redis_manager.cache_client = client
+    cache = CacheManager(redis_manager)
+    value = response_to_dict(make_ai_response())
+
+    print("\nBulk operations, AIResponse dict values (keys/s)\n")
+    print(f"{'keys':>8} {'set old':>10} {'set new':>10} {'get old':>10} {'get new':>10}")
+    for size in (int(size) for size in args.bulk.split(",")):
+        mapping = {f"bench:bulk:{index}": value for index in range(size)}
+        keys = list(mapping)
+        timings = []
+
+        started = time.perf_counter()
+        await legacy_set_many(client, mapping, 60)
+        timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        assert await cache.set_many(mapping, ttl=60)
+        timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        [decode(data) for data in await client.mget(keys) if data is not None]
+        timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        assert len(await cache.get_many(keys)) == size
+        timings.append(time.perf_counter() - started)
+
+        print(f"{size:>8,} " + " ".join(f"{size / elapsed:>10,.0f}" for elapsed in timings))
+        for start in range(0, size, 1000):
+            await client.unlink(*keys[start:start + 1000])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cache value serialization")
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--redis-url", default=None, help="Also measure get/set against this Redis")
+    parser.add_argument("--fake", action="store_true", help="Measure get/set against fakeredis")
+    parser.add_argument("--bulk", default=None, help="Comma-separated key counts for set_many/get_many")
+    args = parser.parse_args()
+
+    print(f"json: {'orjson' if orjson else 'stdlib'}, compression: {'lz4' if lz4_frame else 'zlib'}\n")
+    if not args.bulk:
+        bench_codecs(args.iterations)
+    if args.redis_url or args.fake:
+        asyncio.run(bench_redis(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Condition evaluation benchmark for FlowsyAI Backend
+Compares per-call eval() with the compiled expression language
+
+Usage: python benchmarks/bench_conditions.py [iterations]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.services.expressions import compile_expression
+
+
+CONDITIONS = [
+    "score > 0.8",
+    "status == 'approved' and retries < 3",
+    "len(items) >= 2 or priority in ['high', 'urgent']",
+    "user['tier'] == 'pro' and not blocked",
+]
+
+DATA = {
+    "score": 0.91,
+    "status": "approved",
+    "retries": 1,
+    "items": ["a", "b", "c"],
+    "priority": "normal",
+    "user": {"tier": "pro"},
+    "blocked": False,
+}
+
+
+def bench_eval(condition: str, iterations: int) -> float:
+    """Previous _process_condition_step path: eval() on the raw string per call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        eval(condition, {"__builtins__": {"len": len}}, DATA)
+    return time.perf_counter() - started
+
+
+def bench_compiled(condition: str, iterations: int) -> float:
+    """Current path: cached compile lookup + closure call per evaluation"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        compile_expression(condition)(DATA)
+    return time.perf_counter() - started
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    print(f"{iterations:,} evaluations per condition\n")
+    print(f"{'condition':<52} {'eval()':>10} {'compiled':>10} {'speedup':>8}")
+
+    for condition in CONDITIONS:
+        assert bool(eval(condition, {"__builtins__": {"len": len}}, DATA)) == bool(compile_expression(condition)(DATA))
+
+        eval_time = bench_eval(condition, iterations)
+        compiled_time = bench_compiled(condition, iterations)
+        print(
+            f"{condition:<52} {eval_time:>9.3f}s {compiled_time:>9.3f}s "
+            f"{eval_time / compiled_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+AI orchestrator load benchmark for FlowsyAI Backend
+Drives process_request against the local mock provider and reports throughput and latency
+
+Usage: python benchmarks/bench_orchestrator.py [--requests 20000] [--concurrency 500]
+           [--provider openai] [--stream] [--latency fixed:0.05] [--error-5xx 0.01]
+           [--url http://127.0.0.1:8099/v1]  (external mock_provider.py; default starts one in-process)
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add the backend directory to the Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from app.core.config import settings
+from app.core.http_client import close_http_client
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest
+from mock_provider import LatencyDistribution, MockProviderConfig, start_mock_provider
+
+MODELS = {
+    AIProvider.OPENAI: "gpt-3.5-turbo",
+    AIProvider.ANTHROPIC: "claude-3-haiku-20240307",
+}
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run(args: argparse.Namespace):
+    runner = None
+    base_url = args.url
+    if base_url is None:
+        config = MockProviderConfig(
+            latency=LatencyDistribution.parse(args.latency),
+            tokens_per_second=args.tokens_per_second,
+            output_tokens=args.output_tokens,
+            error_429_rate=args.error_429,
+            error_5xx_rate=args.error_5xx,
+            seed=1,
+        )
+        runner, _, base_url = await start_mock_provider(config)
+
+    # Point the orchestrator at the mock and lift the limits meant for real providers
+    provider = AIProvider(args.provider)
+    settings.OPENAI_BASE_URL = settings.ANTHROPIC_BASE_URL = base_url
+    settings.OPENAI_API_KEY = settings.ANTHROPIC_API_KEY = "mock"
+    settings.RATE_LIMIT_PER_MINUTE = settings.RATE_LIMIT_BURST = 10_000_000
+    settings.HTTP_POOL_LIMIT = settings.HTTP_POOL_LIMIT_PER_HOST = args.concurrency
+
+    orchestrator = AIOrchestrator()
+    latencies = []
+    failures = {}
+    next_index = iter(range(args.requests))
+
+    async def on_chunk(content: str):
+        pass
+
+    async def worker():
+        for index in next_index:
+            request = AIRequest(
+                provider=provider,
+                model=MODELS[provider],
+                prompt=f"benchmark request {index}",
+                max_tokens=args.output_tokens,
+                metadata={"cache": False, "coalesce": False},
+            )
+            started = time.perf_counter()
+            if args.stream:
+                response = await orchestrator.process_request_stream(request, on_chunk)
+            else:
+                response = await orchestrator.process_request(request)
+            if response.success:
+                latencies.append(time.perf_counter() - started)
+            else:
+                key = (response.metadata or {}).get("status_code") or response.error
+                failures[key] = failures.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    await close_http_client()
+    if runner is not None:
+        await runner.cleanup()
+
+    latencies.sort()
+    print(f"{args.requests:,} {provider.value} requests, concurrency {args.concurrency}, "
+          f"{'streaming' if args.stream else 'non-streaming'}, mock latency {args.latency}")
+    print(f"  throughput  {args.requests / elapsed:>10,.0f} req/s  ({elapsed:.2f}s)")
+    if latencies:
+        print(f"  latency     p50 {percentile(latencies, 0.5) * 1000:.1f}ms  "
+              f"p95 {percentile(latencies, 0.95) * 1000:.1f}ms  p99 {percentile(latencies, 0.99) * 1000:.1f}ms")
+    print(f"  succeeded   {len(latencies):,}")
+    for key, count in sorted(failures.items(), key=lambda item: -item[1]):
+        print(f"  failed      {count:,}  ({key})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the AI orchestrator against the mock provider")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--provider", choices=[provider.value for provider in MODELS], default="openai")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--url", default=None, help="Base URL of an external mock provider")
+    parser.add_argument("--latency", default="fixed:0.05")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=20)
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-5xx", type=float, default=0.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
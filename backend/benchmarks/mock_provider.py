@@ -0,0 +1,366 @@
+"""
+Mock AI provider server for FlowsyAI Backend
+Local stand-in for the OpenAI chat-completions and Anthropic messages APIs (including
+streaming) with configurable latency, token throughput, error injection and rate limits
+
+Usage: python benchmarks/mock_provider.py [--port 8099] [--latency lognormal:0.4,0.5]
+           [--tokens-per-second 80] [--error-429 0.01] [--error-5xx 0.01] [--rpm 6000]
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8099/v1 and
+ANTHROPIC_BASE_URL=http://127.0.0.1:8099/v1, plus any non-empty OPENAI_API_KEY /
+ANTHROPIC_API_KEY. Per-request overrides: "x-mock-latency: <seconds>" and
+"x-mock-status: <code>".
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+WORDS = (
+    "the quick brown fox jumps over the lazy dog while a patient orchestrator "
+    "streams tokens to eager clients across the wire"
+).split()
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Text of a chat message whose content is a string or a list of content blocks"""
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+    return str(content)
+
+
+@dataclass
+class LatencyDistribution:
+    """Time-to-first-token distribution, e.g. "fixed:0.2", "uniform:0.1,0.5",
+    "normal:0.3,0.1", "lognormal:0.3,0.5" (median, sigma) or "exponential:0.3" (mean)"""
+    kind: str = "fixed"
+    params: Tuple[float, ...] = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        kind, _, values = spec.partition(":")
+        params = tuple(float(value) for value in values.split(",")) if values else (0.0,)
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+        if expected.get(kind) != len(params):
+            raise ValueError(f"Invalid latency distribution: {spec}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.params))
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return median * rng.lognormvariate(0.0, sigma)
+        if self.kind == "exponential":
+            return rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+        return self.params[0]
+
+
+@dataclass
+class MockProviderConfig:
+    """Behaviour of the mock provider"""
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    tokens_per_second: float = 0.0  # Generation speed after the first token; 0 = instant
+    output_tokens: int = 50  # Completion length (capped by the request's max_tokens)
+    error_429_rate: float = 0.0
+    error_5xx_rate: float = 0.0
+    requests_per_minute: int = 0  # Per API key; 0 = unlimited
+    seed: Optional[int] = None
+
+
+class RateLimitWindow:
+    """Token bucket per API key, reporting OpenAI/Anthropic style rate-limit headers"""
+
+    def __init__(self, requests_per_minute: int):
+        self.limit = requests_per_minute
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def acquire(self, key: str) -> Tuple[bool, Dict[str, str]]:
+        """Take a token for key; returns (allowed, headers)"""
+        if not self.limit:
+            return True, {}
+
+        now = time.monotonic()
+        rate = self.limit / 60
+        tokens, updated = self._buckets.get(key, (float(self.limit), now))
+        tokens = min(float(self.limit), tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+
+        reset = (1 - tokens) / rate if tokens < 1 else 0.0
+        full_reset = (self.limit - tokens) / rate
+        headers = {
+            "x-ratelimit-limit-requests": str(self.limit),
+            "x-ratelimit-remaining-requests": str(int(tokens)),
+            "x-ratelimit-reset-requests": f"{full_reset:.3f}s",
+            "anthropic-ratelimit-requests-limit": str(self.limit),
+            "anthropic-ratelimit-requests-remaining": str(int(tokens)),
+            "anthropic-ratelimit-requests-reset": (datetime.now(timezone.utc) + timedelta(seconds=full_reset)).isoformat(),
+        }
+        if not allowed:
+            headers["retry-after"] = str(max(1, int(reset + 0.999)))
+            headers["retry-after-ms"] = str(int(reset * 1000))
+        return allowed, headers
+
+
+class MockProvider:
+    """aiohttp application serving both wire formats"""
+
+    def __init__(self, config: Optional[MockProviderConfig] = None):
+        self.config = config or MockProviderConfig()
+        self.rng = random.Random(self.config.seed)
+        self.rate_limits = RateLimitWindow(self.config.requests_per_minute)
+        self.stats: Dict[str, Any] = {
+            "requests": 0, "in_flight": 0, "peak_in_flight": 0, "statuses": {},
+            "prompt_cache_writes": 0, "prompt_cache_reads": 0,
+        }
+        self._prompt_cache: set = set()
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/messages", self.messages)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        return await self._handle(request, "openai")
+
+    async def messages(self, request: web.Request) -> web.StreamResponse:
+        return await self._handle(request, "anthropic")
+
+    async def _handle(self, request: web.Request, wire_format: str) -> web.StreamResponse:
+        self.stats["requests"] += 1
+        self.stats["in_flight"] += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+        try:
+            response = await self._respond(request, wire_format)
+        finally:
+            self.stats["in_flight"] -= 1
+        statuses = self.stats["statuses"]
+        statuses[str(response.status)] = statuses.get(str(response.status), 0) + 1
+        return response
+
+    async def _respond(self, request: web.Request, wire_format: str) -> web.StreamResponse:
+        body = await request.json()
+        api_key = request.headers.get("Authorization") or request.headers.get("x-api-key") or ""
+        allowed, headers = self.rate_limits.acquire(api_key)
+
+        status = int(request.headers.get("x-mock-status", 0)) or None
+        if status is None:
+            if not allowed or self.rng.random() < self.config.error_429_rate:
+                status = 429
+            elif self.rng.random() < self.config.error_5xx_rate:
+                status = self.rng.choice((500, 502, 503))
+        if status == 429 and "retry-after" not in headers:
+            headers["retry-after"] = "1"
+
+        forced_latency = request.headers.get("x-mock-latency")
+        latency = float(forced_latency) if forced_latency is not None else self.config.latency.sample(self.rng)
+        if status and status != 200:
+            # Throttling is answered at the edge; server errors surface after processing time
+            if status >= 500:
+                await asyncio.sleep(latency)
+            return self._error(wire_format, status, headers)
+        prompt_tokens = sum(len(_message_text(message).split()) for message in body.get("messages", []))
+        output_tokens = min(int(body.get("max_tokens") or self.config.output_tokens), self.config.output_tokens)
+        tokens = [WORDS[index % len(WORDS)] for index in range(output_tokens)]
+        model = body.get("model", "mock")
+
+        if body.get("stream"):
+            return await self._stream(request, wire_format, model, tokens, prompt_tokens, latency, headers, body)
+
+        generation = len(tokens) / self.config.tokens_per_second if self.config.tokens_per_second else 0.0
+        await asyncio.sleep(latency + generation)
+        text = " ".join(tokens)
+        if wire_format == "openai":
+            payload = {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "length" if output_tokens == body.get("max_tokens") else "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(tokens),
+                    "total_tokens": prompt_tokens + len(tokens),
+                },
+            }
+        else:
+            payload = {
+                "id": f"msg_{uuid.uuid4().hex[:24]}",
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "max_tokens" if output_tokens == body.get("max_tokens") else "end_turn",
+                "usage": {"input_tokens": prompt_tokens, "output_tokens": len(tokens), **self._cache_usage(body)},
+            }
+        return web.json_response(payload, headers=headers)
+
+    def _cache_usage(self, body: Dict[str, Any]) -> Dict[str, int]:
+        """Anthropic-style prompt cache accounting for content blocks marked with cache_control"""
+        usage = {"cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        for message in body.get("messages", []):
+            content = message.get("content")
+            for block in content if isinstance(content, list) else []:
+                if isinstance(block, dict) and block.get("cache_control"):
+                    text = block.get("text", "")
+                    if text in self._prompt_cache:
+                        usage["cache_read_input_tokens"] += len(text.split())
+                        self.stats["prompt_cache_reads"] += 1
+                    else:
+                        self._prompt_cache.add(text)
+                        usage["cache_creation_input_tokens"] += len(text.split())
+                        self.stats["prompt_cache_writes"] += 1
+        return usage
+
+    def _error(self, wire_format: str, status: int, headers: Dict[str, str]) -> web.Response:
+        message = "Rate limit reached" if status == 429 else "The server had an error processing your request"
+        if wire_format == "openai":
+            error_type = "rate_limit_exceeded" if status == 429 else "server_error"
+            payload = {"error": {"message": message, "type": error_type, "code": error_type}}
+        else:
+            error_type = "rate_limit_error" if status == 429 else "api_error"
+            payload = {"type": "error", "error": {"type": error_type, "message": message}}
+        return web.json_response(payload, status=status, headers=headers)
+
+    async def _stream(
+        self,
+        request: web.Request,
+        wire_format: str,
+        model: str,
+        tokens: List[str],
+        prompt_tokens: int,
+        latency: float,
+        headers: Dict[str, str],
+        body: Dict[str, Any]
+    ) -> web.StreamResponse:
+        response = web.StreamResponse(headers={**headers, "Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+
+        async def send(data: Any, event: Optional[str] = None):
+            frame = f"event: {event}\n" if event else ""
+            frame += f"data: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+            await response.write(frame.encode("utf-8"))
+
+        message_id = uuid.uuid4().hex[:24]
+        if wire_format == "anthropic":
+            await send({"type": "message_start", "message": {
+                "id": f"msg_{message_id}", "type": "message", "role": "assistant", "model": model,
+                "content": [], "usage": {"input_tokens": prompt_tokens, "output_tokens": 0, **self._cache_usage(body)},
+            }}, "message_start")
+            await send({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+                       "content_block_start")
+
+        await asyncio.sleep(latency)
+        started = time.monotonic()
+        for index, token in enumerate(tokens):
+            if self.config.tokens_per_second:
+                # Pace to the configured throughput, sleeping only when meaningfully ahead
+                ahead = started + index / self.config.tokens_per_second - time.monotonic()
+                if ahead > 0.005:
+                    await asyncio.sleep(ahead)
+            text = token if index == 0 else " " + token
+            if wire_format == "openai":
+                await send({
+                    "id": f"chatcmpl-{message_id}", "object": "chat.completion.chunk", "model": model,
+                    "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+                })
+            else:
+                await send({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}},
+                           "content_block_delta")
+
+        if wire_format == "openai":
+            await send({
+                "id": f"chatcmpl-{message_id}", "object": "chat.completion.chunk", "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            })
+            if (body.get("stream_options") or {}).get("include_usage"):
+                await send({
+                    "id": f"chatcmpl-{message_id}", "object": "chat.completion.chunk", "model": model, "choices": [],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": len(tokens),
+                        "total_tokens": prompt_tokens + len(tokens),
+                    },
+                })
+            await send("[DONE]")
+        else:
+            await send({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            await send({"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                        "usage": {"output_tokens": len(tokens)}}, "message_delta")
+            await send({"type": "message_stop"}, "message_stop")
+
+        await response.write_eof()
+        return response
+
+
+async def start_mock_provider(
+    config: Optional[MockProviderConfig] = None,
+    host: str = "127.0.0.1",
+    port: int = 0
+) -> Tuple[web.AppRunner, MockProvider, str]:
+    """Start the mock server on the running loop; returns (runner, provider, base_url)"""
+    provider = MockProvider(config)
+    runner = web.AppRunner(provider.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, backlog=4096)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, provider, f"http://{host}:{bound_port}/v1"
+
+
+def parse_args(argv: List[str]) -> Tuple[argparse.Namespace, MockProviderConfig]:
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Anthropic provider for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="fixed:0.2", help="e.g. fixed:0.2, uniform:0.1,0.5, lognormal:0.3,0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=50)
+    parser.add_argument("--error-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="Fraction of requests answered with 5xx")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per minute per API key (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    config = MockProviderConfig(
+        latency=LatencyDistribution.parse(args.latency),
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_429_rate=args.error_429,
+        error_5xx_rate=args.error_5xx,
+        requests_per_minute=args.rpm,
+        seed=args.seed,
+    )
+    return args, config
+
+
+def main():
+    args, config = parse_args(sys.argv[1:])
+    print(f"Mock provider on http://{args.host}:{args.port}/v1 (latency {args.latency})")
+    web.run_app(MockProvider(config).create_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,10 +13,14 @@ from contextlib import asynccontextmanager
 
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.http_client import close_http_client
+from app.core.redis import init_redis, close_redis
 from app.core.logging import setup_logging
 from app.api.v1.api import api_router
 from app.core.exceptions import setup_exception_handlers
 from app.core.websocket import mount_websocket
+from app.models import ai_usage  # noqa: F401  (registers the rollup table for create_all)
+from app.services.ai_analytics import usage_analytics
 
 # Setup logging
 setup_logging()
@@ -34,12 +38,23 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
     
     logger.info("✅ Database tables created/verified")
+    
+    # Redis backs caching and shared rate limits; both degrade to in-process without it
+    try:
+        await init_redis()
+    except Exception:
+        logger.warning("⚠️ Redis unavailable - using in-process fallbacks")
+    usage_analytics.start()
     logger.info("🎯 FlowsyAI Backend started successfully!")
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down FlowsyAI Backend...")
+    
+    await usage_analytics.stop()
+    await close_http_client()
+    await close_redis()
 
 
 # Create FastAPI application
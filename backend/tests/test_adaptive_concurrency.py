@@ -0,0 +1,114 @@
+"""
+Test AIMD adaptive concurrency limits
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services import ai_orchestrator
+from app.services.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest, AIResponse
+
+
+def make_limiter(**kwargs) -> AdaptiveConcurrencyLimiter:
+    options = {"initial_limit": 4, "max_limit": 16, "latency_tolerance": 2.0}
+    options.update(kwargs)
+    return AdaptiveConcurrencyLimiter(**options)
+
+
+async def complete(limiter, **outcome):
+    await limiter.acquire()
+    limiter.release(**outcome)
+
+
+@pytest.mark.asyncio
+async def test_healthy_requests_grow_limit_additively():
+    """About one extra slot per window of fast successes, capped at max_limit"""
+    limiter = make_limiter()
+    for _ in range(4):
+        await complete(limiter, latency=0.1)
+    assert 4.9 < limiter.limit < 5.0
+
+    for _ in range(500):
+        await complete(limiter, latency=0.1)
+    assert limiter.limit == 16
+
+
+@pytest.mark.asyncio
+async def test_throttling_and_failures_shrink_limit_multiplicatively():
+    """A 429 halves the limit; failures and latency spikes trim it, never below min_limit"""
+    limiter = make_limiter(initial_limit=8)
+    await complete(limiter, latency=0.1)
+    limit = limiter.limit
+
+    await complete(limiter, throttled=True)
+    assert limiter.limit == pytest.approx(limit * 0.5)
+    assert limiter.throttled_count == 1
+
+    limit = limiter.limit
+    await complete(limiter, latency=0.1, failed=True)
+    assert limiter.limit == pytest.approx(limit * 0.9)
+
+    limit = limiter.limit
+    await complete(limiter, latency=1.0)
+    assert limiter.limit == pytest.approx(limit * 0.9)
+
+    for _ in range(10):
+        await complete(limiter, throttled=True)
+    assert limiter.limit == 1
+
+
+@pytest.mark.asyncio
+async def test_release_without_latency_leaves_limit_alone():
+    """Cache hits and local rejections free the slot without teaching the limiter anything"""
+    limiter = make_limiter()
+    await complete(limiter, latency=0.2)
+    limit, baseline = limiter.limit, limiter.baseline_latency
+
+    await complete(limiter, latency=None)
+    await complete(limiter, latency=None, failed=True)
+    assert limiter.limit == limit and limiter.baseline_latency == baseline
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_skips_latency_of_cache_hits_and_rejections(monkeypatch):
+    """Only responses that reached the provider feed the latency baseline"""
+    limiter = make_limiter()
+    monkeypatch.setitem(ai_orchestrator.concurrency_limiters, AIProvider.OPENAI, limiter)
+    orchestrator = AIOrchestrator()
+
+    async def cached(request):
+        return AIResponse(success=True, content="ok", provider=request.provider, model=request.model,
+                          metadata={"cache_hit": True})
+
+    monkeypatch.setattr(orchestrator, "process_request", cached)
+    request = AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="hi")
+    assert (await orchestrator._process_with_limiter(request)).success
+    assert limiter.baseline_latency is None and limiter.limit == 4
+
+    monkeypatch.undo()
+    monkeypatch.setitem(ai_orchestrator.concurrency_limiters, AIProvider.OPENAI, limiter)
+    expired = AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="hi", deadline=time.time() - 1,
+                        metadata={"cache": False})
+    response = await orchestrator._process_with_limiter(expired)
+    assert response.metadata["rejected"]
+    assert limiter.baseline_latency is None and limiter.limit == 4 and limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_as_slots_free():
+    """Acquire blocks at the limit and resumes on release"""
+    limiter = make_limiter(initial_limit=2)
+    await limiter.acquire()
+    await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.01)
+    assert not waiter.done() and limiter.get_stats()["waiting"] == 1
+
+    limiter.release(latency=None)
+    await asyncio.wait_for(waiter, 1)
+    assert limiter.in_flight == 2
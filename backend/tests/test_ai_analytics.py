@@ -0,0 +1,43 @@
+"""
+Test AI usage analytics aggregation
+"""
+
+import pytest
+
+from app.core.redis import RedisManager
+from app.services.ai_analytics import UsageAggregate, UsageAnalytics
+
+
+def test_percentiles_within_one_bucket():
+    """Histogram percentiles land within a bucket (25%) of the exact value"""
+    aggregate = UsageAggregate()
+    latencies = [0.1 + index * 0.01 for index in range(1000)]
+    for latency in latencies:
+        aggregate.add(latency, True, 10, 0.001, False)
+
+    summary = aggregate.summary()
+    for name, exact in (("p50_latency", latencies[499]), ("p95_latency", latencies[949]), ("p99_latency", latencies[989])):
+        assert exact <= summary[name] <= exact * 1.25
+
+    assert UsageAggregate.from_fields(aggregate.to_fields()) == aggregate
+
+
+@pytest.mark.asyncio
+async def test_summary_and_breakdown_without_redis():
+    """Pending aggregates answer queries when Redis is unavailable"""
+    analytics = UsageAnalytics(RedisManager())
+    analytics.record("openai", "gpt-4", 1, latency=1.0, success=True, tokens=100, cost=0.003)
+    analytics.record("openai", "gpt-4", 2, latency=2.0, success=False)
+    analytics.record("anthropic", "claude-3-haiku-20240307", 1, latency=0.5, success=True, cache_hit=True)
+    await analytics.flush()
+
+    total = await analytics.get_summary()
+    assert total["requests"] == 3
+    assert total["errors"] == 1
+    assert total["cache_hits"] == 1
+    assert total["cost"] == pytest.approx(0.003)
+
+    assert (await analytics.get_summary("user:1"))["requests"] == 2
+    breakdown = await analytics.get_breakdown("model")
+    assert set(breakdown) == {"openai:gpt-4", "anthropic:claude-3-haiku-20240307"}
+    assert breakdown["openai:gpt-4"]["error_rate"] == 0.5
@@ -0,0 +1,77 @@
+"""
+Test the AI response cache
+"""
+
+import pytest
+
+from app.core.redis import CacheManager, RedisManager
+from app.services.ai_cache import AIResponseCache
+from app.services.ai_orchestrator import AIProvider, AIRequest, AIResponse
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_cache(server=None) -> AIResponseCache:
+    redis_manager = RedisManager()
+    if server is not None:
+        redis_manager.cache_client = fakeredis.FakeAsyncRedis(server=server)
+    return AIResponseCache(CacheManager(redis_manager), local_size=16, ttl=60)
+
+
+def make_request(**kwargs) -> AIRequest:
+    options = {"provider": AIProvider.OPENAI, "model": "gpt-4", "prompt": "Summarize the ticket", "temperature": 0}
+    options.update(kwargs)
+    return AIRequest(**options)
+
+
+def make_response() -> AIResponse:
+    return AIResponse(success=True, content="Printer overheats", provider=AIProvider.OPENAI, model="gpt-4", tokens_used=12)
+
+
+def test_only_deterministic_or_opted_in_requests_are_cacheable():
+    """Temperature 0 caches by default; metadata "cache" overrides either way"""
+    cache = make_cache()
+    assert cache.is_cacheable(make_request())
+    assert not cache.is_cacheable(make_request(temperature=0.7))
+    assert cache.is_cacheable(make_request(temperature=0.7, metadata={"cache": True}))
+    assert not cache.is_cacheable(make_request(metadata={"cache": False}))
+
+
+def test_key_ignores_formatting_but_not_content():
+    """Case and surrounding whitespace don't split entries; other fields do"""
+    cache = make_cache()
+    key = cache.make_key(make_request())
+    assert cache.make_key(make_request(model=" GPT-4 ", prompt="Summarize the ticket\n")) == key
+    assert cache.make_key(make_request(max_tokens=50)) != key
+    assert cache.make_key(make_request(provider=AIProvider.ANTHROPIC)) != key
+
+
+@pytest.mark.asyncio
+async def test_hits_report_their_tier():
+    """The writer hits memory; another worker hits Redis, then its own memory"""
+    server = fakeredis.FakeServer()
+    writer, reader = make_cache(server), make_cache(server)
+    key = writer.make_key(make_request())
+
+    assert await reader.get(key) is None
+    await writer.set(key, make_response())
+
+    hit = await writer.get(key)
+    assert hit.content == "Printer overheats" and hit.tokens_used == 12
+    assert hit.metadata["cache_hit"] and hit.metadata["cache_tier"] == "memory"
+
+    assert (await reader.get(key)).metadata["cache_tier"] == "redis"
+    assert (await reader.get(key)).metadata["cache_tier"] == "memory"
+    assert reader.get_stats() == {
+        "hits": 2, "memory_hits": 1, "redis_hits": 1, "misses": 1, "hit_ratio": 2 / 3, "local_size": 1
+    }
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_works_without_redis():
+    """Without a Redis client responses are still cached in process"""
+    cache = make_cache()
+    key = cache.make_key(make_request())
+    await cache.set(key, make_response())
+    assert (await cache.get(key)).metadata["cache_tier"] == "memory"
+    assert await cache.get(cache.make_key(make_request(prompt="other"))) is None
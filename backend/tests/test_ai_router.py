@@ -0,0 +1,83 @@
+"""
+Test latency- and cost-aware AI routing
+"""
+
+import pytest
+
+from app.services import ai_orchestrator
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest
+from app.services.ai_router import AIRouter, RouteConstraints, RouteStrategy
+
+CANDIDATES = [("openai", "gpt-4"), ("anthropic", "claude-3-haiku-20240307"), ("google", "gemini-pro")]
+
+
+def make_router():
+    router = AIRouter(alpha=0.5, default_latency=2.0)
+    for _ in range(5):
+        router.observe("openai", "gpt-4", 0.5, True)
+        router.observe("anthropic", "claude-3-haiku-20240307", 3.0, True)
+        router.observe("google", "gemini-pro", 1.0, True)
+    return router
+
+
+def test_strategies_rank_by_latency_and_cost():
+    """Fastest and cheapest pick different models from the same statistics"""
+    router = make_router()
+
+    assert router.rank(RouteConstraints(strategy=RouteStrategy.FASTEST), CANDIDATES)[0] == ("openai", "gpt-4")
+    assert router.rank(RouteConstraints(strategy=RouteStrategy.CHEAPEST), CANDIDATES)[0] == (
+        "anthropic", "claude-3-haiku-20240307"
+    )
+
+
+def test_max_latency_excludes_slow_models():
+    """Models slower than max_latency are dropped from the ranking"""
+    router = make_router()
+    ranked = router.rank(RouteConstraints(strategy=RouteStrategy.CHEAPEST, max_latency=2.0), CANDIDATES)
+    assert ranked == [("google", "gemini-pro"), ("openai", "gpt-4")]
+
+
+def test_errors_shift_traffic_away():
+    """A failing model loses its place even if it is the fastest"""
+    router = make_router()
+    for _ in range(5):
+        router.observe("openai", "gpt-4", 0.1, False)
+
+    assert router.rank(RouteConstraints(strategy=RouteStrategy.FASTEST), CANDIDATES)[0] == ("google", "gemini-pro")
+
+
+@pytest.mark.asyncio
+async def test_optimized_batch_keeps_caller_order():
+    """Reordering for execution doesn't reorder the results"""
+    requests = [
+        AIRequest(provider=AIProvider.GOOGLE, model="gemini-pro", prompt=f"prompt {index}", max_tokens=100 * (5 - index))
+        for index in range(5)
+    ]
+    responses = await AIOrchestrator().batch_process_optimized(requests, priority="high")
+    assert [f"prompt {index}" in response.content for index, response in enumerate(responses)] == [True] * 5
+
+
+@pytest.mark.asyncio
+async def test_batch_priority_only_routes_opted_in_requests(monkeypatch):
+    """Priority picks the strategy for requests with route metadata; others keep their model"""
+    monkeypatch.setattr(ai_orchestrator, "ai_router", make_router())
+    orchestrator = AIOrchestrator()
+    dispatched = []
+
+    async def capture(requests):
+        dispatched.extend(requests)
+        return [None] * len(requests)
+
+    monkeypatch.setattr(orchestrator, "batch_process", capture)
+    requests = [
+        AIRequest(provider=AIProvider.GOOGLE, model="gemini-pro", prompt="pinned"),
+        AIRequest(
+            provider=AIProvider.GOOGLE, model="gemini-pro", prompt="routed",
+            metadata={"route": {"providers": ["openai", "anthropic"]}}
+        ),
+    ]
+    await orchestrator.batch_process_optimized(requests, priority="low")
+
+    models = {request.prompt: (request.provider, request.model) for request in dispatched}
+    assert models["pinned"] == (AIProvider.GOOGLE, "gemini-pro")
+    assert models["routed"] == (AIProvider.ANTHROPIC, "claude-3-haiku-20240307")
@@ -0,0 +1,109 @@
+"""
+Test priority scheduling of AI rate limit tokens
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.exceptions import DeadlineExceededException, RateLimitException
+from app.core.rate_limiter import TokenBucketRateLimiter
+from app.core.redis import RedisManager
+from app.services.ai_scheduler import PriorityTokenScheduler, RequestPriority
+
+
+def make_scheduler():
+    return PriorityTokenScheduler(TokenBucketRateLimiter(RedisManager()))
+
+
+@pytest.mark.asyncio
+async def test_interactive_jumps_batch_queue():
+    """An interactive request queued last gets the next token"""
+    scheduler = make_scheduler()
+    order = []
+
+    async def request(name, priority):
+        await scheduler.acquire("bucket", rate=50, capacity=1, priority=priority)
+        order.append(name)
+
+    # Drain the bucket so everything has to queue
+    await scheduler.acquire("bucket", rate=50, capacity=1, priority=RequestPriority.INTERACTIVE)
+
+    batch = [asyncio.create_task(request(f"batch{index}", RequestPriority.BATCH)) for index in range(5)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(request("interactive", RequestPriority.INTERACTIVE))
+    await asyncio.gather(*batch, interactive)
+
+    assert order[0] == "interactive"
+    assert order[1:] == [f"batch{index}" for index in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_expired_requests_are_dropped_without_a_token():
+    """Requests that can't be served before their deadline fail instead of waiting"""
+    scheduler = make_scheduler()
+
+    with pytest.raises(DeadlineExceededException):
+        await scheduler.acquire("bucket", rate=1, capacity=1, deadline=time.time() - 1)
+
+    await scheduler.acquire("bucket", rate=1, capacity=1)
+    with pytest.raises(DeadlineExceededException):
+        await scheduler.acquire("bucket", rate=1, capacity=1, deadline=time.time() + 0.1)
+
+    assert scheduler.get_stats()["dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_leaves_reserve_for_interactive():
+    """Batch traffic can't spend the reserved share of the bucket"""
+    scheduler = make_scheduler()
+
+    for _ in range(8):
+        await scheduler.acquire("bucket", rate=0.01, capacity=10, priority=RequestPriority.BATCH, timeout=0)
+
+    with pytest.raises(Exception):
+        await scheduler.acquire("bucket", rate=0.01, capacity=10, priority=RequestPriority.BATCH, timeout=0)
+
+    await scheduler.acquire("bucket", rate=0.01, capacity=10, priority=RequestPriority.INTERACTIVE, timeout=0)
+
+
+@pytest.mark.asyncio
+async def test_interactive_wakes_dispatcher_sleeping_for_batch_reserve():
+    """A batch head sleeping until its reserve refills doesn't hold back interactive traffic"""
+    scheduler = make_scheduler()
+    for _ in range(10):
+        await scheduler.acquire("bucket", rate=1, capacity=10, priority=RequestPriority.INTERACTIVE, timeout=0)
+
+    # Needs 1 token on top of a 2 token reserve: about 3 s away
+    batch = asyncio.create_task(scheduler.acquire("bucket", rate=1, capacity=10, priority=RequestPriority.BATCH))
+    await asyncio.sleep(0.05)
+
+    started = time.monotonic()
+    await scheduler.acquire("bucket", rate=1, capacity=10, priority=RequestPriority.INTERACTIVE, timeout=1.5)
+    assert time.monotonic() - started < 1.4
+
+    batch.cancel()
+    await asyncio.gather(batch, return_exceptions=True)
+    await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_waiters_behind_the_head_expire_on_time():
+    """A queued request's timeout fires even while another request is at the head"""
+    scheduler = make_scheduler()
+    for _ in range(10):
+        await scheduler.acquire("bucket", rate=0.5, capacity=10, priority=RequestPriority.INTERACTIVE, timeout=0)
+
+    head = asyncio.create_task(scheduler.acquire("bucket", rate=0.5, capacity=10, priority=RequestPriority.NORMAL))
+    await asyncio.sleep(0.05)
+
+    started = time.monotonic()
+    with pytest.raises(RateLimitException):
+        await scheduler.acquire("bucket", rate=0.5, capacity=10, priority=RequestPriority.BATCH, timeout=0.3)
+    assert time.monotonic() - started < 0.6
+    assert scheduler.get_stats()["dropped"] == 1
+
+    head.cancel()
+    await asyncio.gather(head, return_exceptions=True)
+    await asyncio.sleep(0.01)
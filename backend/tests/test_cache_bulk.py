@@ -0,0 +1,36 @@
+"""
+Test chunked bulk cache reads and writes
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.core.redis import CacheManager, RedisManager
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.mark.asyncio
+async def test_set_many_writes_every_key_with_its_ttl(monkeypatch):
+    """Per-key TTLs are set with the value, across chunk boundaries, and read back in chunks"""
+    monkeypatch.setattr(settings, "CACHE_BULK_CHUNK", 3)
+    redis_manager = RedisManager()
+    redis_manager.cache_client = fakeredis.FakeAsyncRedis()
+    cache = CacheManager(redis_manager)
+
+    mapping = {f"item:{index}": {"index": index} for index in range(10)}
+    ttls = {key: 100 + index for index, key in enumerate(mapping)}
+    ttls["item:9"] = timedelta(minutes=5)
+    del ttls["item:0"]
+
+    assert await cache.set_many(mapping, ttl=ttls)
+    assert await cache.client.ttl("item:0") == -1
+    assert await cache.client.ttl("item:5") == 105
+    assert await cache.client.ttl("item:9") == 300
+
+    assert await cache.set_many({"shared:1": 1, "shared:2": 2}, ttl=timedelta(seconds=30))
+    assert await cache.client.ttl("shared:2") == 30
+
+    assert await cache.get_many(list(mapping) + ["item:missing"]) == mapping
@@ -0,0 +1,45 @@
+"""
+Test the tagged cache value codec
+"""
+
+import json
+import pickle
+from datetime import datetime
+
+from app.core.cache_codec import FLAG_LZ4, FLAG_ZLIB, TAG_JSON, TAG_PICKLE, TAG_STR, decode, encode
+from app.services.ai_orchestrator import AIProvider, AIResponse
+
+
+def test_values_round_trip_with_their_type():
+    """Strings stay strings even when they look like JSON; other objects are pickled"""
+    moment = datetime(2024, 5, 1, 12, 30)
+    for value in ({"nodes": [1, 2]}, [1, "a"], "123", "plain text", 42, 1.5, True, None, b"\x00\xff", moment, {1: "int key"}):
+        assert decode(encode(value)) == value
+        assert type(decode(encode(value))) is type(value)
+
+    assert encode("123")[0] == TAG_STR
+    assert encode({"a": 1})[0] == TAG_JSON
+    assert encode(moment)[0] == TAG_PICKLE
+
+    response = AIResponse(success=True, content="hi", provider=AIProvider.OPENAI, model="gpt-3.5-turbo")
+    assert decode(encode(response)) == response
+
+
+def test_large_values_are_compressed():
+    """Payloads over the threshold are compressed when that makes them smaller"""
+    value = {"content": "lorem ipsum " * 1000}
+    encoded = encode(value, compress_threshold=1024)
+
+    assert encoded[0] & (FLAG_ZLIB | FLAG_LZ4)
+    assert len(encoded) < len(json.dumps(value)) / 10
+    assert decode(encoded) == value
+    assert not encode("short", compress_threshold=1024)[0] & (FLAG_ZLIB | FLAG_LZ4)
+
+
+def test_values_written_before_tagging_still_decode():
+    """Legacy JSON, counters, latin1 pickles and text read as before"""
+    assert decode(json.dumps({"a": 1}).encode()) == {"a": 1}
+    assert decode(b"7") == 7
+    assert decode(pickle.dumps(datetime(2020, 1, 1)).decode("latin1").encode()) == datetime(2020, 1, 1)
+    assert decode(b"some text") == "some text"
+    assert decode(b"\nstarts with a control byte") == "\nstarts with a control byte"
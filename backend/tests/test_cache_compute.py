@@ -0,0 +1,94 @@
+"""
+Test stampede protection in CacheManager.get_or_compute
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.cache_codec import encode_entry
+from app.core.redis import CacheManager, RedisManager
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_cache(server) -> CacheManager:
+    redis_manager = RedisManager()
+    redis_manager.cache_client = fakeredis.FakeAsyncRedis(server=server)
+    return CacheManager(redis_manager)
+
+
+class Loader:
+    def __init__(self, value="fresh", delay=0.1):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once():
+    """Callers in two processes share one computation of an expired hot key"""
+    server = fakeredis.FakeServer()
+    first, second = make_cache(server), make_cache(server)
+    loader = Loader()
+
+    results = await asyncio.gather(*(
+        cache.get_or_compute("report:1", loader, ttl=60) for cache in (first, second) for _ in range(20)
+    ))
+
+    assert results == ["fresh"] * 40
+    assert loader.calls == 1
+    assert first.compute_stats["lock_waits"] + second.compute_stats["lock_waits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_value_is_served_while_refreshing():
+    """Past its TTL, the old value comes back at once and is refreshed in the background"""
+    server = fakeredis.FakeServer()
+    cache = make_cache(server)
+    await cache.client.set("report:1", encode_entry("old", 0.1, time.time() - 1), ex=60)
+    loader = Loader(delay=0.05)
+
+    started = time.monotonic()
+    assert await cache.get_or_compute("report:1", loader, ttl=60) == "old"
+    assert await cache.get_or_compute("report:1", loader, ttl=60) == "old"
+    assert time.monotonic() - started < 0.05
+
+    await asyncio.sleep(0.1)
+    assert await cache.get_or_compute("report:1", loader, ttl=60) == "fresh"
+    assert loader.calls == 1
+    assert cache.compute_stats["stale_served"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_values_refresh_early(monkeypatch):
+    """XFetch refreshes ahead of expiry in proportion to the compute time"""
+    monkeypatch.setattr("app.core.redis.random.random", lambda: 0.5)
+    cache = make_cache(fakeredis.FakeServer())
+    loader = Loader(delay=0)
+
+    await cache.client.set("cheap", encode_entry("old", 0.001, time.time() + 5), ex=60)
+    assert await cache.get_or_compute("cheap", loader, ttl=60) == "old"
+    assert loader.calls == 0
+
+    await cache.client.set("slow", encode_entry("old", 10.0, time.time() + 5), ex=60)
+    assert await cache.get_or_compute("slow", loader, ttl=60) == "old"
+    await asyncio.sleep(0.01)
+    assert loader.calls == 1 and cache.compute_stats["early_refreshes"] == 1
+    assert await cache.get("slow") == "fresh"
+
+
+@pytest.mark.asyncio
+async def test_works_without_redis():
+    """Without a Redis connection the loader still runs, once per concurrent burst"""
+    cache = CacheManager(RedisManager())
+    loader = Loader(delay=0.01)
+
+    assert await asyncio.gather(*(cache.get_or_compute("k", loader, ttl=60) for _ in range(5))) == ["fresh"] * 5
+    assert loader.calls == 1
@@ -0,0 +1,105 @@
+"""
+Test tag and versioned-namespace cache invalidation
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.redis import CacheManager, RedisManager
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+async def make_cache(server, subscribe: bool = False) -> CacheManager:
+    redis_manager = RedisManager()
+    redis_manager.cache_client = fakeredis.FakeAsyncRedis(server=server)
+    cache = CacheManager(redis_manager)
+    if subscribe:
+        cache.start()
+        for _ in range(100):
+            if cache._subscribed:
+                break
+            await asyncio.sleep(0.01)
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_tags_delete_only_their_keys_in_batches(monkeypatch):
+    """invalidate_tags unlinks the tagged keys, a few at a time, and leaves the rest"""
+    monkeypatch.setattr(settings, "CACHE_INVALIDATE_BATCH", 2)
+    cache = await make_cache(fakeredis.FakeServer())
+
+    for index in range(5):
+        await cache.set(f"workflow:{index}", {"index": index}, ttl=60, tags=["user:1"])
+    await cache.set_many({"profile:1": "Ada", "profile:2": "Bob"}, ttl=120, tags=["user:1", "profiles"])
+    await cache.set("workflow:other", "kept", ttl=60, tags=["user:2"])
+
+    assert 60 < await cache.client.ttl("cache:tag:user:1") <= 120
+    assert await cache.invalidate_tags("user:1", "missing") == 7
+
+    assert await cache.get_many(["workflow:0", "workflow:4", "profile:2", "workflow:other"]) == {"workflow:other": "kept"}
+    assert not await cache.client.exists("cache:tag:user:1")
+    assert await cache.client.smembers("cache:tag:user:2") == {b"workflow:other"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("persistent_first", [True, False])
+async def test_tag_set_stays_persistent_once_a_member_never_expires(persistent_first):
+    """A key without TTL keeps its tag set alive whichever order the keys are tagged in"""
+    cache = await make_cache(fakeredis.FakeServer())
+    writes = [("user:a", None), ("user:b", 60)]
+    for key, ttl in writes if persistent_first else reversed(writes):
+        await cache.set(key, key, ttl=ttl, tags=["t"])
+
+    assert await cache.client.ttl("cache:tag:t") == -1
+    await cache.set("user:c", "c", ttl=120, tags=["t"])
+    assert await cache.client.ttl("cache:tag:t") == -1
+
+    assert await cache.invalidate_tags("t") == 3
+    assert await cache.get("user:a") is None
+
+
+@pytest.mark.asyncio
+async def test_tag_set_ttl_only_grows():
+    """Tag sets of expiring keys outlive their longest-lived member"""
+    cache = await make_cache(fakeredis.FakeServer())
+    await cache.set("user:a", "a", ttl=120, tags=["t"])
+    await cache.set("user:b", "b", ttl=60, tags=["t"])
+    assert 60 < await cache.client.ttl("cache:tag:t") <= 120
+
+    await cache.set_many({"user:c": "c"}, ttl=600, tags=["t"])
+    assert 120 < await cache.client.ttl("cache:tag:t") <= 600
+
+
+@pytest.mark.asyncio
+async def test_namespace_generation_bump_invalidates_everywhere():
+    """Bumping a namespace generation orphans its keys on every replica at once"""
+    server = fakeredis.FakeServer()
+    first, second = await make_cache(server, subscribe=True), await make_cache(server, subscribe=True)
+    try:
+        key = await first.namespace_key("workflow", "42")
+        assert key == "workflow:v0:42"
+        await first.set(key, "v0 definition", ttl=60)
+        assert await second.get(await second.namespace_key("workflow", "42")) == "v0 definition"
+
+        assert await first.invalidate_namespace("workflow") == 1
+        await asyncio.sleep(0.05)
+        assert await second.namespace_key("workflow", "42") == "workflow:v1:42"
+        assert await second.get(await second.namespace_key("workflow", "42")) is None
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+@pytest.mark.asyncio
+async def test_clear_pattern_unlinks_in_batches(monkeypatch):
+    """clear_pattern deletes as it scans instead of buffering every key"""
+    monkeypatch.setattr(settings, "CACHE_INVALIDATE_BATCH", 2)
+    cache = await make_cache(fakeredis.FakeServer())
+    await cache.set_many({f"session-cache:{index}": index for index in range(5)})
+    await cache.set("other", 1)
+
+    assert await cache.clear_pattern("session-cache:*") == 5
+    assert await cache.get("other") == 1
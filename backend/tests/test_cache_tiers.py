@@ -0,0 +1,142 @@
+"""
+Test the in-process cache tier and its pub/sub invalidation
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.redis import CacheManager, RedisManager
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+async def make_replica(server) -> CacheManager:
+    redis_manager = RedisManager()
+    redis_manager.cache_client = fakeredis.FakeAsyncRedis(server=server)
+    cache = CacheManager(redis_manager)
+    cache.enable_local("workflow", maxsize=16, ttl=60)
+    cache.start()
+    for _ in range(100):
+        if cache._subscribed:
+            break
+        await asyncio.sleep(0.01)
+    return cache
+
+
+async def settle():
+    """Let published invalidations reach the other replica"""
+    await asyncio.sleep(0.05)
+
+
+@pytest.mark.asyncio
+async def test_writes_on_one_replica_evict_the_others():
+    """A hot key is served locally until another replica changes it"""
+    server = fakeredis.FakeServer()
+    first, second = await make_replica(server), await make_replica(server)
+    try:
+        await first.set("workflow:1", {"version": 1})
+        await settle()
+        assert await second.get("workflow:1") == {"version": 1}
+        assert await second.get("workflow:1") == {"version": 1}
+        assert second.local["workflow"].hits == 1 and second.l2_hits == 1
+
+        await first.set("workflow:1", {"version": 2})
+        await settle()
+        assert await second.get("workflow:1") == {"version": 2}
+
+        await first.delete("workflow:1")
+        await settle()
+        assert await second.get("workflow:1") is None
+
+        await first.set("workflow:2", "cached")
+        await second.get("workflow:2")
+        await first.clear_pattern("workflow:*")
+        await settle()
+        assert await second.get("workflow:2") is None
+
+        stats = second.get_tier_stats()
+        assert stats["invalidation_subscribed"] and stats["l1_hit_ratio"] > 0
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_bypassed_without_subscription():
+    """Other namespaces, and replicas that cannot hear invalidations, always read Redis"""
+    server = fakeredis.FakeServer()
+    cache = await make_replica(server)
+    await cache.set("user:1", {"name": "Ada"})
+    await cache.get("user:1")
+    assert len(cache.local["workflow"]) == 0
+
+    await cache.stop()
+    await cache.set("workflow:1", 1)
+    assert await cache.get("workflow:1") == 1
+    assert len(cache.local["workflow"]) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("write", ["set", "delete", "increment"])
+async def test_local_write_beats_read_in_flight(write):
+    """A read started before a write on the same replica never fills the local tier with the old value"""
+    cache = await make_replica(fakeredis.FakeServer())
+    client = cache.client
+    get, gate = client.get, asyncio.Event()
+
+    async def slow_get(key):
+        value = await get(key)
+        await gate.wait()
+        return value
+
+    try:
+        if write == "increment":
+            await cache.increment("workflow:1")
+        else:
+            await cache.set("workflow:1", 1)
+        cache.local["workflow"].clear()
+        client.get = slow_get
+        reader = asyncio.create_task(cache.get("workflow:1"))
+        await asyncio.sleep(0.01)
+
+        if write == "set":
+            await cache.set("workflow:1", 2)
+        elif write == "delete":
+            await cache.delete("workflow:1")
+        else:
+            await cache.increment("workflow:1")
+        gate.set()
+        assert await reader == 1
+
+        client.get = get
+        assert await cache.get("workflow:1") == {"set": 2, "delete": None, "increment": 2}[write]
+    finally:
+        await cache.stop()
+
+
+@pytest.mark.asyncio
+async def test_get_many_survives_subscription_dropping_mid_read():
+    """Values fetched while the subscription drops are still returned"""
+    cache = await make_replica(fakeredis.FakeServer())
+    client = cache.client
+    pipeline = client.pipeline
+
+    def dropping_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def execute_and_drop(*args, **kwargs):
+            result = await execute(*args, **kwargs)
+            cache._subscribed = False
+            return result
+
+        pipe.execute = execute_and_drop
+        return pipe
+
+    try:
+        await cache.set_many({"workflow:1": 1, "workflow:2": 2})
+        client.pipeline = dropping_pipeline
+        assert await cache.get_many(["workflow:1", "workflow:2"]) == {"workflow:1": 1, "workflow:2": 2}
+    finally:
+        await cache.stop()
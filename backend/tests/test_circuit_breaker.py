@@ -0,0 +1,76 @@
+"""
+Test AI provider circuit breaker
+"""
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.core.redis import RedisManager
+from app.services import circuit_breaker as circuit_module
+from app.services.circuit_breaker import CircuitBreaker
+
+
+@pytest.fixture
+def breaker_settings():
+    with mock.patch.multiple(
+        circuit_module.settings,
+        AI_CIRCUIT_MIN_REQUESTS=4,
+        AI_CIRCUIT_FAILURE_RATE=0.5,
+        AI_CIRCUIT_OPEN_SECONDS=0.05
+    ):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_on_failures_and_recovers(breaker_settings):
+    """Failures open the circuit; after the cooldown one probe may close it"""
+    breaker = CircuitBreaker(RedisManager())
+    key = "openai:gpt-4"
+
+    for _ in range(4):
+        assert await breaker.allow_request(key)
+        await breaker.record(key, success=False, latency=0.1, error="HTTP 503")
+
+    assert breaker.is_open(key)
+    assert not await breaker.allow_request(key)
+
+    await asyncio.sleep(0.06)
+    assert await breaker.allow_request(key)  # the probe
+    assert not await breaker.allow_request(key)  # only one probe at a time
+
+    await breaker.record(key, success=True, latency=0.1)
+    assert breaker.get_stats()[key]["state"] == "closed"
+    assert await breaker.allow_request(key)
+
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_circuit(breaker_settings):
+    """A failing half-open probe sends the circuit back to open"""
+    breaker = CircuitBreaker(RedisManager())
+    key = "anthropic:claude-3-haiku-20240307"
+
+    for _ in range(4):
+        await breaker.allow_request(key)
+        await breaker.record(key, success=False, latency=0.1)
+
+    await asyncio.sleep(0.06)
+    assert await breaker.allow_request(key)
+    await breaker.record(key, success=False, latency=0.1)
+
+    assert breaker.is_open(key)
+    assert breaker.get_stats()[key]["times_opened"] == 2
+
+
+@pytest.mark.asyncio
+async def test_successes_keep_circuit_closed(breaker_settings):
+    """Occasional failures below the threshold don't trip the circuit"""
+    breaker = CircuitBreaker(RedisManager())
+    key = "google:gemini-pro"
+
+    for index in range(10):
+        await breaker.allow_request(key)
+        await breaker.record(key, success=index % 4 != 0, latency=0.1)
+
+    assert not breaker.is_open(key)
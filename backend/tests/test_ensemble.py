@@ -0,0 +1,164 @@
+"""
+Test concurrent ensemble prediction and ensemble persistence
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.redis import cache_manager
+from app.services import advanced_ai
+from app.services.advanced_ai import AdvancedAIService, parse_confidence
+from app.services.ai_orchestrator import AIResponse
+
+# model_id -> (latency, result, confidence)
+MEMBERS = {
+    "slow-a": (0.3, "positive", 0.6),
+    "fast-b": (0.05, "positive", 0.9),
+    "fast-c": (0.1, "positive", 0.7),
+    "slow-d": (0.3, "negative", 0.95),
+}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    store = {}
+
+    async def fake_set(key, value, ttl=None):
+        store[key] = value
+        return True
+
+    async def fake_get(key, default=None):
+        return store.get(key, default)
+
+    monkeypatch.setattr(cache_manager, "set", fake_set)
+    monkeypatch.setattr(cache_manager, "get", fake_get)
+
+    service = AdvancedAIService()
+    service.calls = []
+    service.cancelled = []
+
+    async def fake_predict(model_config, input_data):
+        model_id = model_config["model_id"]
+        latency, result, confidence = MEMBERS[model_id]
+        service.calls.append(model_id)
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            service.cancelled.append(model_id)
+            raise
+        return {"result": result, "confidence": confidence}
+
+    monkeypatch.setattr(service, "_predict", fake_predict)
+    return service
+
+
+async def make_ensemble(service, strategy):
+    return await service.create_model_ensemble({
+        "strategy": strategy,
+        "models": [{"model_id": model_id} for model_id in MEMBERS],
+    })
+
+
+@pytest.mark.asyncio
+async def test_members_run_concurrently_and_ensembles_persist(service):
+    """A weighted ensemble waits for all members, in the time of the slowest"""
+    ensemble = await make_ensemble(service, "weighted")
+    assert await AdvancedAIService().get_ensemble(ensemble["id"]) == ensemble
+
+    start = time.monotonic()
+    result = await service.execute_ensemble_prediction(ensemble["id"], {"prompt": "great product"})
+
+    assert time.monotonic() - start < 0.5
+    assert len(result["individual_predictions"]) == 4
+    assert not result["early_exit"] and not result["cancelled_models"]
+
+
+@pytest.mark.asyncio
+async def test_cascade_answers_with_first_confident_member(service):
+    """The first member over the threshold wins and the rest are cancelled"""
+    ensemble = await make_ensemble(service, "cascade")
+
+    start = time.monotonic()
+    result = await service.execute_ensemble_prediction(ensemble["id"], {"prompt": "great product"})
+
+    assert time.monotonic() - start < 0.2
+    assert result["final_prediction"]["confidence"] == 0.9
+    assert result["early_exit"]
+    assert sorted(result["cancelled_models"]) == sorted(service.cancelled) == ["fast-c", "slow-a", "slow-d"]
+
+
+@pytest.mark.asyncio
+async def test_voting_stops_once_majority_is_decided(service):
+    """Three agreeing votes out of four settle the vote before the last one arrives"""
+    MEMBERS["slow-a"] = (0.15, "positive", 0.6)
+    try:
+        ensemble = await make_ensemble(service, "voting")
+        result = await service.execute_ensemble_prediction(ensemble["id"], {"prompt": "great product"})
+    finally:
+        MEMBERS["slow-a"] = (0.3, "positive", 0.6)
+
+    assert result["final_prediction"]["result"] == "positive"
+    assert result["final_prediction"]["confidence"] == 0.75
+    assert result["cancelled_models"] == ["slow-d"]
+    assert AdvancedAIService._majority_decided({"positive": 2}, 1)
+    assert not AdvancedAIService._majority_decided({"positive": 2, "negative": 1}, 1)
+
+
+@pytest.mark.asyncio
+async def test_member_confidence_comes_from_the_model_reply(service, monkeypatch):
+    """Members rate their answers; the rating, not a default, lets the cascade stop early"""
+    replies = {
+        "gpt-4": (0.2, "negative\nConfidence: 0.95"),
+        "gpt-3.5-turbo": (0.05, "positive\n**Confidence: 40%**"),
+        "claude-3-haiku-20240307": (0.1, "positive\nConfidence: 0.9"),
+    }
+    prompts = []
+
+    async def process_request(request):
+        prompts.append(request.prompt)
+        latency, content = replies[request.model]
+        await asyncio.sleep(latency)
+        return AIResponse(success=True, content=content, provider=request.provider, model=request.model)
+
+    monkeypatch.setattr(advanced_ai.orchestrator, "process_request", process_request)
+    monkeypatch.delattr(service, "_predict")  # Exercise the real member call this time
+    ensemble = await service.create_model_ensemble({
+        "strategy": "cascade",
+        "models": [{"model_id": model} for model in replies],
+    })
+
+    result = await service.execute_ensemble_prediction(ensemble["id"], {"prompt": "great product"})
+
+    assert all(prompt.endswith(advanced_ai.CONFIDENCE_INSTRUCTION) for prompt in prompts)
+    assert result["early_exit"] and result["cancelled_models"] == ["gpt-4"]
+    assert result["final_prediction"] == {"result": "positive", "confidence": 0.9, "strategy_used": "cascade"}
+    assert [prediction["confidence"] for prediction in result["individual_predictions"]] == [0.4, 0.9]
+
+
+def test_replies_without_a_rating_keep_their_text():
+    """An unrated reply is returned whole and reports no confidence"""
+    assert parse_confidence("positive\nConfidence: 0.92") == ("positive", 0.92)
+    assert parse_confidence("I have no confidence in this") == ("I have no confidence in this", None)
+
+
+@pytest.mark.asyncio
+async def test_weighted_result_follows_configured_order(service):
+    """The first configured member answers a weighted ensemble even when it finishes last"""
+    ensemble = await make_ensemble(service, "weighted")
+    result = await service.execute_ensemble_prediction(ensemble["id"], {"prompt": "great product"})
+
+    assert [pred["model_id"] for pred in result["individual_predictions"]] == list(MEMBERS)
+    assert result["final_prediction"]["result"] == "positive"
+
+    MEMBERS["slow-d"] = (0.0, "negative", 0.95)
+    try:
+        ensemble = await service.create_model_ensemble({
+            "strategy": "weighted",
+            "models": [{"model_id": model_id} for model_id in ("slow-a", "slow-d")],
+        })
+        result = await service.execute_ensemble_prediction(ensemble["id"], {"prompt": "great product"})
+    finally:
+        MEMBERS["slow-d"] = (0.3, "negative", 0.95)
+    assert result["final_prediction"]["result"] == "positive"
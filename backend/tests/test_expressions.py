@@ -0,0 +1,52 @@
+"""
+Test workflow expression language
+"""
+
+import pytest
+
+from app.core.exceptions import InvalidExpressionException
+from app.services.expressions import compile_expression, evaluate_expression
+
+
+DATA = {"score": 0.9, "status": "ok", "items": [1, 2, 3], "user": {"tier": "pro"}}
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("score > 0.8", True),
+    ("status == 'ok' and len(items) == 3", True),
+    ("user['tier'] in ['free', 'basic']", False),
+    ("0 < score <= 1", True),
+    ("not items or score < 0", False),
+    ("'big' if score > 0.5 else 'small'", "big"),
+    ("true", True),
+    ("null is None", True),
+])
+def test_expressions_match_python_semantics(expression, expected):
+    """Supported expressions evaluate like Python"""
+    assert evaluate_expression(expression, DATA) == expected
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('id')",
+    "items.__class__",
+    "open('/etc/passwd')",
+    "[x for x in items]",
+    "lambda: 1",
+    "2 ** 1000000",
+    "_secret",
+])
+def test_unsafe_expressions_are_rejected(expression):
+    """Anything outside the whitelist fails at compile time"""
+    with pytest.raises(InvalidExpressionException):
+        compile_expression(expression)
+
+
+def test_unknown_variables_raise_at_evaluation():
+    """Missing variables surface as KeyError for the caller to handle"""
+    with pytest.raises(KeyError):
+        evaluate_expression("missing > 1", DATA)
+
+
+def test_compiled_expressions_are_cached():
+    """Identical expression text reuses the compiled closure"""
+    assert compile_expression("score > 0.5") is compile_expression("score > 0.5")
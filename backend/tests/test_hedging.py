@@ -0,0 +1,86 @@
+"""
+Test hedged fallback requests
+"""
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.services import ai_orchestrator
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest, AIResponse
+from app.services.hedging import HedgeBudget, LatencyTracker
+
+
+class SlowPrimaryOrchestrator(AIOrchestrator):
+    """Primary provider hangs, fallbacks answer quickly"""
+
+    def __init__(self):
+        super().__init__()
+        self.cancelled = []
+
+    async def process_request(self, request):
+        delay = 10 if request.provider == AIProvider.OPENAI else 0.01
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(request.provider)
+            raise
+        return AIResponse(success=True, content=request.provider.value, provider=request.provider)
+
+
+def test_latency_percentile_needs_samples():
+    """Percentiles are only reported once the window has enough samples"""
+    tracker = LatencyTracker(min_samples=5)
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        tracker.observe("openai", "gpt-4", latency)
+    assert tracker.percentile("openai", "gpt-4", 95) is None
+
+    tracker.observe("openai", "gpt-4", 5.0)
+    assert tracker.percentile("openai", "gpt-4", 50) == 0.3
+    assert tracker.percentile("openai", "gpt-4", 95) == 5.0
+
+
+def test_hedge_budget_never_exceeds_one_per_request():
+    """Ratio is capped so hedges can't outnumber primary requests"""
+    budget = HedgeBudget(ratio=5.0)
+    for _ in range(10):
+        budget.record_request()
+        budget.try_spend()
+    assert budget.hedges <= budget.requests
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    """Fallback fires after the hedge delay and the loser is cancelled"""
+    orchestrator = SlowPrimaryOrchestrator()
+    request = AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="hi")
+
+    with mock.patch.object(ai_orchestrator, "hedge_budget", HedgeBudget(ratio=1.0)), \
+            mock.patch.object(ai_orchestrator.settings, "AI_HEDGE_DEFAULT_DELAY", 0.05):
+        response = await asyncio.wait_for(
+            orchestrator.process_with_fallback(request, [AIProvider.GOOGLE], hedge=True),
+            timeout=2
+        )
+
+    assert response.success
+    assert response.provider == AIProvider.GOOGLE
+    assert response.metadata["hedged"] is True
+    assert orchestrator.cancelled == [AIProvider.OPENAI]
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_budget():
+    """With an empty budget the slow primary is simply awaited"""
+    orchestrator = SlowPrimaryOrchestrator()
+    request = AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="hi")
+
+    with mock.patch.object(ai_orchestrator, "hedge_budget", HedgeBudget(ratio=0.0)), \
+            mock.patch.object(ai_orchestrator.settings, "AI_HEDGE_DEFAULT_DELAY", 0.05):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                orchestrator.process_with_fallback(request, [AIProvider.GOOGLE], hedge=True),
+                timeout=0.3
+            )
+
+    assert orchestrator.cancelled == [AIProvider.OPENAI]
@@ -0,0 +1,115 @@
+"""
+Test the pooled HTTP client sessions
+"""
+
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+from app.core import http_client as http_client_module
+from app.core.config import settings
+from app.core.http_client import HTTPClientManager, close_http_client, get_http_session
+from app.core.worker_loop import WorkerLoop
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider
+
+
+@pytest_asyncio.fixture
+async def manager(monkeypatch):
+    manager = HTTPClientManager()
+    monkeypatch.setattr(http_client_module, "http_client", manager)
+    monkeypatch.setattr("app.services.ai_orchestrator.http_client", manager)
+    yield manager
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_shared_per_provider(manager):
+    """Every orchestrator reuses one pool per provider; providers get separate pools"""
+    async with AIOrchestrator() as first, AIOrchestrator() as second:
+        openai = await first._get_session(AIProvider.OPENAI)
+        assert await second._get_session(AIProvider.OPENAI) is openai
+        assert await get_http_session("openai") is openai
+
+        anthropic = await first._get_session(AIProvider.ANTHROPIC)
+        assert anthropic is not openai
+        assert anthropic.connector is not openai.connector
+
+    # Leaving the orchestrator keeps the pools open for the next one
+    assert not openai.closed
+    assert set(manager.get_stats()) == {"openai", "anthropic"}
+
+
+@pytest.mark.asyncio
+async def test_per_pool_connection_limits(manager, monkeypatch):
+    """Per-pool overrides apply to that provider's connector only"""
+    monkeypatch.setattr(settings, "HTTP_POOL_LIMITS_PER_HOST", {"openai": 7})
+    stats_for = lambda pool: manager.get_stats()[pool]["limit_per_host"]
+
+    await manager.get_session("openai")
+    await manager.get_session("google")
+    assert stats_for("openai") == 7
+    assert stats_for("google") == settings.HTTP_POOL_LIMIT_PER_HOST
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_recreated_after_close(manager):
+    """close_http_client() closes the pools; the next request opens fresh ones"""
+    session = await get_http_session("openai")
+    await close_http_client()
+    assert session.closed
+    assert manager.get_stats() == {}
+
+    reopened = await get_http_session("openai")
+    assert reopened is not session and not reopened.closed
+
+
+@pytest.mark.asyncio
+async def test_closed_session_is_replaced(manager):
+    """A session closed behind the manager's back isn't handed out again"""
+    session = await manager.get_session("google")
+    await session.close()
+    assert await manager.get_session("google") is not session
+
+
+def test_sessions_from_a_finished_loop_are_closed():
+    """Sessions are bound to their loop, so a new loop closes them and gets new ones"""
+    manager = HTTPClientManager()
+
+    async def open_session():
+        return await manager.get_session("openai")
+
+    previous_loop = asyncio.new_event_loop()
+    first = previous_loop.run_until_complete(open_session())
+    previous_loop.close()
+
+    async def reopen():
+        session = await manager.get_session("openai")
+        await manager.close()
+        return session
+
+    assert asyncio.run(reopen()) is not first
+    assert first.closed
+
+
+def test_sessions_from_a_running_loop_are_closed_on_it():
+    """A loop still serving another thread closes its own sessions"""
+    manager = HTTPClientManager()
+    worker = WorkerLoop()
+    try:
+        first = worker.run(manager.get_session("openai"))
+
+        async def reopen():
+            session = await manager.get_session("openai")
+            await manager.close()
+            return session
+
+        assert asyncio.run(reopen()) is not first
+        for _ in range(100):
+            if first.closed:
+                break
+            time.sleep(0.01)
+        assert first.closed
+    finally:
+        worker.stop()
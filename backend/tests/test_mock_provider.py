@@ -0,0 +1,67 @@
+"""
+Test the orchestrator against the local mock provider server
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from app.core.config import settings
+from app.core.exceptions import AIProviderHTTPException
+from app.core.http_client import close_http_client
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest
+from mock_provider import MockProviderConfig, start_mock_provider
+
+
+@pytest_asyncio.fixture
+async def mock_provider(monkeypatch):
+    runner, provider, base_url = await start_mock_provider(MockProviderConfig(output_tokens=12, requests_per_minute=60))
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", base_url)
+    monkeypatch.setattr(settings, "ANTHROPIC_BASE_URL", base_url)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "mock-openai")
+    monkeypatch.setattr(settings, "ANTHROPIC_API_KEY", "mock-anthropic")
+    yield provider
+    await close_http_client()
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_both_wire_formats_streaming_and_not(mock_provider):
+    """OpenAI and Anthropic formats parse the same way, streamed or not"""
+    orchestrator = AIOrchestrator()
+    for provider, model in ((AIProvider.OPENAI, "gpt-3.5-turbo"), (AIProvider.ANTHROPIC, "claude-3-haiku-20240307")):
+        request = AIRequest(provider=provider, model=model, prompt="hello there", metadata={"cache": False})
+        response = await orchestrator.process_request(request)
+        assert response.success and len(response.content.split()) == 12
+
+        chunks = []
+
+        async def on_chunk(content):
+            chunks.append(content)
+
+        streamed = await orchestrator.process_request_stream(request, on_chunk)
+        assert streamed.success and len(chunks) == 12
+        assert "".join(chunks) == response.content
+
+    assert mock_provider.stats["statuses"] == {"200": 4}
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_headers_reach_the_orchestrator(mock_provider, monkeypatch):
+    """Exhausting the mock's budget yields 429s carrying retry-after"""
+    monkeypatch.setattr(mock_provider.rate_limits, "limit", 2)
+    orchestrator = AIOrchestrator()
+    request = AIRequest(provider=AIProvider.OPENAI, model="gpt-3.5-turbo", prompt="hi")
+
+    await orchestrator._process_openai(request)
+    await orchestrator._process_openai(request)
+    with pytest.raises(AIProviderHTTPException) as error:
+        await orchestrator._process_openai(request)
+
+    assert error.value.status == 429
+    assert int(error.value.headers["retry-after"]) >= 1
+    assert error.value.headers["x-ratelimit-remaining-requests"] == "0"
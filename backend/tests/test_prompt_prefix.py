@@ -0,0 +1,63 @@
+"""
+Test shared prompt prefix detection in batch AI jobs
+"""
+
+import pytest
+
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest, AIResponse
+from app.services.prompt_prefix import find_shared_prefixes
+from app.tasks import ai_tasks
+
+SUMMARIZE = "You are a careful analyst. Summarize the following support ticket in two sentences.\n" * 10
+CLASSIFY = "Classify the sentiment of the review below as positive, negative or neutral.\n" * 10
+
+
+def make_prompts():
+    prompts = [f"{SUMMARIZE}Ticket {index}: printer is on fire" for index in range(50)]
+    prompts += [f"{CLASSIFY}Review {index}: great product" for index in range(50)]
+    prompts.append("short one-off prompt")
+    return prompts
+
+
+def test_each_group_gets_its_own_shared_prefix():
+    """Prompts split at the end of their group's common prefix, on a word boundary"""
+    prompts = make_prompts()
+    prefixes = find_shared_prefixes(prompts, min_length=64)
+
+    assert prefixes[0] == SUMMARIZE + "Ticket " and prefixes[49] is prefixes[0]
+    assert prefixes[50] == CLASSIFY + "Review " and prefixes[99] is prefixes[50]
+    assert prefixes[100] is None
+
+
+@pytest.mark.asyncio
+async def test_batch_task_splits_shared_prefixes(monkeypatch):
+    """The batch task sends each request its group's prefix separately from its tail"""
+    batches = []
+
+    async def batch_process(self, requests):
+        batches.append(requests)
+        return [AIResponse(success=True, content="ok", provider=request.provider, model=request.model) for request in requests]
+
+    monkeypatch.setattr(AIOrchestrator, "batch_process", batch_process)
+    requests_data = [{"provider": "anthropic", "prompt": prompt} for prompt in make_prompts()]
+    results = await ai_tasks._process_ai_batch_async(requests_data)
+
+    requests = batches[0]
+    assert len(results) == len(requests) == 101 and all(result["success"] for result in results)
+    assert [request.full_prompt for request in requests] == make_prompts()
+    assert requests[0].prompt_prefix == SUMMARIZE + "Ticket " and requests[0].prompt == "0: printer is on fire"
+    assert requests[50].prompt_prefix == CLASSIFY + "Review " and requests[50].prompt == "0: great product"
+    assert requests[100].prompt_prefix is None
+
+
+def test_long_prefix_is_marked_for_provider_caching(monkeypatch):
+    """Anthropic gets the shared prefix as a cache_control block"""
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "AI_PROMPT_CACHE_MIN_CHARS", 100)
+
+    request = AIRequest(provider=AIProvider.ANTHROPIC, model="claude-3-haiku-20240307", prompt="Ticket 1", prompt_prefix=SUMMARIZE)
+    content = AIOrchestrator()._anthropic_content(request)
+
+    assert content[0] == {"type": "text", "text": SUMMARIZE, "cache_control": {"type": "ephemeral"}}
+    assert content[1]["text"] == "Ticket 1"
+    assert request.full_prompt == SUMMARIZE + "Ticket 1"
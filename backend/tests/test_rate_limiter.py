@@ -0,0 +1,95 @@
+"""
+Test the distributed token bucket rate limiter
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.rate_limiter import LocalTokenBucket, TokenBucketRateLimiter
+from app.core.redis import RedisManager
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def make_limiter(server=None) -> TokenBucketRateLimiter:
+    redis_manager = RedisManager()
+    if server is not None:
+        redis_manager.redis_client = fakeredis.FakeAsyncRedis(server=server)
+    return TokenBucketRateLimiter(redis_manager)
+
+
+@pytest.mark.asyncio
+async def test_burst_up_to_capacity_then_wait():
+    """A full bucket grants `capacity` requests at once, then reports the wait for the next"""
+    limiter = make_limiter(fakeredis.FakeServer())
+    assert limiter.backend == "redis"
+
+    waits = [await limiter.try_acquire("burst", rate=2, capacity=5) for _ in range(6)]
+    assert waits[:5] == [0.0] * 5
+    assert 0.4 < waits[5] <= 0.5
+
+
+@pytest.mark.asyncio
+async def test_tokens_refill_at_rate():
+    """An empty bucket grants again once enough time has passed"""
+    limiter = make_limiter(fakeredis.FakeServer())
+    assert await limiter.try_acquire("refill", rate=20, capacity=1) == 0.0
+    assert await limiter.try_acquire("refill", rate=20, capacity=1) > 0
+
+    await asyncio.sleep(0.06)
+    assert await limiter.try_acquire("refill", rate=20, capacity=1) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_reserve_is_kept_for_other_callers():
+    """Tokens are only granted while the reserve stays in the bucket"""
+    limiter = make_limiter(fakeredis.FakeServer())
+    assert await limiter.try_acquire("reserve", rate=1, capacity=3, reserve=2) == 0.0
+    assert await limiter.try_acquire("reserve", rate=1, capacity=3, reserve=2) > 0
+    assert await limiter.try_acquire("reserve", rate=1, capacity=3) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_workers_share_buckets_through_redis():
+    """Two limiters on the same Redis draw from one bucket"""
+    server = fakeredis.FakeServer()
+    first, second = make_limiter(server), make_limiter(server)
+    assert await first.try_acquire("shared", rate=1, capacity=1) == 0.0
+    assert await second.try_acquire("shared", rate=1, capacity=1) > 0
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_local_bucket():
+    """Limiting continues in-process while Redis is unreachable"""
+    server = fakeredis.FakeServer()
+    limiter = make_limiter(server)
+    server.connected = False
+
+    assert await limiter.try_acquire("outage", rate=1, capacity=2) == 0.0
+    assert limiter.backend == "local"
+    assert await limiter.try_acquire("outage", rate=1, capacity=2) == 0.0
+    assert await limiter.try_acquire("outage", rate=1, capacity=2) > 0
+
+    # Without any Redis client the local bucket is used from the start
+    limiter = make_limiter()
+    assert limiter.backend == "local"
+    assert await limiter.try_acquire("outage", rate=1, capacity=1) == 0.0
+    assert await limiter.try_acquire("outage", rate=1, capacity=1) > 0
+
+
+def test_local_bucket_refills_up_to_capacity(monkeypatch):
+    """The fallback bucket refills continuously and never past capacity"""
+    now = [100.0]
+    monkeypatch.setattr("app.core.rate_limiter.time.monotonic", lambda: now[0])
+    bucket = LocalTokenBucket(rate=2, capacity=4)
+
+    assert [bucket.try_acquire() for _ in range(4)] == [0.0] * 4
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+    now[0] += 1.0
+    assert bucket.try_acquire(tokens=2) == 0.0
+
+    now[0] += 60.0
+    assert bucket.try_acquire(tokens=4) == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.5)
@@ -0,0 +1,122 @@
+"""
+Test request-level retries of AI provider calls
+"""
+
+import random
+import time
+
+import pytest
+
+from app.core.exceptions import AIProviderHTTPException
+from app.services import ai_orchestrator
+from app.services.adaptive_concurrency import AdaptiveConcurrencyLimiter
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest, AIResponse
+from app.services.retry import RetryState, is_retryable, retry_after_from_headers
+
+
+def test_rate_limit_headers_give_retry_delay():
+    """Retry-After wins; otherwise the exhausted window's reset is used"""
+    assert retry_after_from_headers({"retry-after-ms": "250", "retry-after": "1"}) == 0.25
+    assert retry_after_from_headers({"Retry-After": "3"}) == 3.0
+    assert retry_after_from_headers({
+        "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m2.5s",
+        "x-ratelimit-remaining-tokens": "900", "x-ratelimit-reset-tokens": "10m",
+    }) == 62.5
+    assert retry_after_from_headers({"x-ratelimit-reset-requests": "1s"}) is None
+
+
+def test_classification_and_budget():
+    """Only transient errors retry, and never past the budget"""
+    assert is_retryable(AIProviderHTTPException("openai", 429, "slow down"))
+    assert is_retryable(AIProviderHTTPException("openai", 503, "unavailable"))
+    assert not is_retryable(AIProviderHTTPException("openai", 400, "bad request"))
+
+    state = RetryState(max_attempts=10, base_delay=0.1, max_delay=1.0, budget=2.0, rng=random.Random(1))
+    delays = []
+    while (delay := state.next_delay(AIProviderHTTPException("openai", 500, "error"))) is not None:
+        delays.append(delay)
+        state.give_up_at -= delay  # Simulate the time spent waiting
+    assert all(0.1 <= delay <= 1.0 for delay in delays)
+    assert sum(delays) <= 2.0
+
+    state = RetryState(budget=5.0)
+    assert state.next_delay(AIProviderHTTPException("openai", 429, "limit", {"retry-after": "30"})) is None
+
+
+@pytest.mark.asyncio
+async def test_transient_429_is_retried_in_place(monkeypatch):
+    """A 429 with a short Retry-After costs a short wait, not a failed request"""
+    orchestrator = AIOrchestrator()
+    calls = []
+
+    async def flaky(request):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise AIProviderHTTPException("openai", 429, "slow down", {"retry-after-ms": "50"})
+        return AIResponse(success=True, content="ok", provider=AIProvider.OPENAI, model=request.model)
+
+    monkeypatch.setattr(orchestrator, "_process_openai", flaky)
+    request = AIRequest(provider=AIProvider.OPENAI, model="gpt-retry-test", prompt="hi", metadata={"cache": False})
+    response = await orchestrator.process_request(request)
+
+    assert response.success
+    assert response.metadata["retries"] == 2
+    assert 0.1 <= calls[-1] - calls[0] < 1.0
+
+    calls.clear()
+    monkeypatch.setattr(orchestrator, "_process_openai", _raise_bad_request)
+    response = await orchestrator.process_request(request)
+    assert not response.success and response.metadata["status_code"] == 400
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limiter_sees_throttling_absorbed_by_retries(monkeypatch):
+    """A 429 followed by a retry still cuts the limit, and backoff isn't counted as latency"""
+    orchestrator = AIOrchestrator()
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+    monkeypatch.setitem(ai_orchestrator.concurrency_limiters, AIProvider.OPENAI, limiter)
+    calls = []
+
+    def throttled_once(final):
+        async def process(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise AIProviderHTTPException("openai", 429, "slow down", {"retry-after-ms": "200"})
+            return await final(request)
+        return process
+
+    async def succeed(request):
+        return AIResponse(success=True, content="ok", provider=AIProvider.OPENAI, model=request.model)
+
+    monkeypatch.setattr(orchestrator, "_process_openai", throttled_once(succeed))
+    request = AIRequest(provider=AIProvider.OPENAI, model="gpt-retry-test", prompt="hi", metadata={"cache": False})
+    response = await orchestrator._process_with_limiter(request)
+
+    assert response.success and response.metadata["throttled"]
+    assert limiter.throttled_count == 1 and limiter.limit == 4
+    assert limiter.baseline_latency is None  # Throttled outcomes don't sample latency
+
+    calls.clear()
+    monkeypatch.setattr(orchestrator, "_process_openai", throttled_once(_raise_bad_request))
+    response = await orchestrator._process_with_limiter(request)
+
+    assert not response.success and response.metadata["status_code"] == 400
+    assert response.metadata["throttled"] and response.metadata["retries"] == 1
+    assert limiter.throttled_count == 2
+
+    calls.clear()
+
+    async def unavailable_once(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise AIProviderHTTPException("openai", 503, "unavailable", {"retry-after-ms": "200"})
+        return await succeed(request)
+
+    monkeypatch.setattr(orchestrator, "_process_openai", unavailable_once)
+    response = await orchestrator._process_with_limiter(request)
+    assert response.success and not response.metadata["throttled"]
+    assert limiter.baseline_latency < 0.1
+
+
+async def _raise_bad_request(request):
+    raise AIProviderHTTPException("openai", 400, "invalid request")
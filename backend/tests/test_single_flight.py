@@ -0,0 +1,69 @@
+"""
+Test request coalescing
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.redis import RedisManager
+from app.core.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    """Identical concurrent calls run once and all get the result"""
+    flight = SingleFlight(RedisManager())
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(10)))
+
+    assert results == ["result"] * 10
+    assert calls == 1
+    assert flight.get_stats()["coalesced"] == 9
+    assert flight.get_stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    """A failing call fails all coalesced callers, and the next call runs fresh"""
+    flight = SingleFlight(RedisManager())
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def succeed():
+        return "ok"
+
+    assert await flight.do("key", succeed) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_hands_over_to_waiter():
+    """Cancelling the caller that owns the call doesn't cancel the others"""
+    flight = SingleFlight(RedisManager())
+    started = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        await asyncio.sleep(0.05)
+        return "result"
+
+    leader = asyncio.create_task(flight.do("key", fetch))
+    await started.wait()
+    follower = asyncio.create_task(flight.do("key", fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "result"
+    assert leader.cancelled()
@@ -0,0 +1,92 @@
+"""
+Test streamed AI responses
+"""
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.core import websocket
+from app.core.exceptions import AIProviderHTTPException
+from app.core.redis import RedisManager
+from app.services import ai_orchestrator
+from app.services import circuit_breaker as circuit_module
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest
+from app.services.circuit_breaker import CircuitBreaker
+
+
+@pytest.mark.asyncio
+async def test_stream_chunks_add_up_to_response():
+    """Streamed chunks are delivered in order and reassemble the content"""
+    chunks = []
+
+    async def on_chunk(content):
+        chunks.append(content)
+
+    request = AIRequest(provider=AIProvider.GOOGLE, model="gemini-pro", prompt="stream me", metadata={"cache": False})
+    response = await AIOrchestrator().process_request_stream(request, on_chunk)
+
+    assert response.success
+    assert len(chunks) > 1
+    assert "".join(chunks) == response.content
+    assert response.metadata["ttfb"] is not None
+
+
+@pytest.mark.asyncio
+async def test_token_emitter_coalesces_frames():
+    """Tokens arriving faster than the frame interval are batched"""
+    frames = []
+
+    async def emit(event, data, room=None):
+        frames.append(data)
+
+    with mock.patch.object(websocket.sio, "emit", emit):
+        emitter = websocket.TokenStreamEmitter(1, 2, "step_0", interval=0.05)
+        for index in range(20):
+            await emitter.push(f"t{index} ")
+            await asyncio.sleep(0.005)
+        await emitter.close()
+
+    assert len(frames) < 20
+    assert "".join(frame["content"] for frame in frames) == "".join(f"t{index} " for index in range(20))
+    assert frames[-1]["done"] and not any(frame["done"] for frame in frames[:-1])
+    assert [frame["seq"] for frame in frames] == list(range(1, len(frames) + 1))
+
+
+@pytest.mark.asyncio
+async def test_streams_go_through_deadline_and_circuit_breaker(monkeypatch):
+    """Stream outcomes feed the breaker, and an open circuit stops streams before the provider"""
+    breaker = CircuitBreaker(RedisManager())
+    monkeypatch.setattr(ai_orchestrator, "circuit_breaker", breaker)
+    monkeypatch.setattr(circuit_module.settings, "AI_CIRCUIT_MIN_REQUESTS", 4)
+    monkeypatch.setattr(circuit_module.settings, "AI_CIRCUIT_FAILURE_RATE", 0.5)
+    orchestrator = AIOrchestrator()
+    calls = []
+
+    async def on_chunk(content):
+        pass
+
+    async def failing_stream(request):
+        calls.append(request)
+        raise AIProviderHTTPException("google", 503, "unavailable")
+        yield
+
+    request = AIRequest(
+        provider=AIProvider.GOOGLE, model="gemini-pro", prompt="stream me", metadata={"cache": False, "retry": False}
+    )
+    assert (await orchestrator.process_request_stream(request, on_chunk)).success
+    assert breaker.get_stats()["google:gemini-pro"]["state"] == "closed"
+
+    monkeypatch.setattr(orchestrator, "_stream_mock", failing_stream)
+    for _ in range(3):
+        assert not (await orchestrator.process_request_stream(request, on_chunk)).success
+    # One success and three provider failures out of four trips the circuit
+    assert breaker.is_open("google:gemini-pro") and len(calls) == 3
+
+    response = await orchestrator.process_request_stream(request, on_chunk)
+    assert "circuit" in response.error.lower() and len(calls) == 3
+
+    expired = AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="late", deadline=0, metadata={"cache": False})
+    response = await orchestrator.process_request_stream(expired, on_chunk)
+    assert not response.success and "deadline" in response.error.lower()
@@ -0,0 +1,122 @@
+"""
+Test token counting, cost estimation and context preflight
+"""
+
+import base64
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.ai_orchestrator import AIOrchestrator, AIProvider, AIRequest
+from app.core.exceptions import ContextLengthExceededException
+from app.services.tokenizer import BPETokenizer, EstimatingTokenizer, TokenCounter, Tokenizer, token_counter
+
+
+def test_estimator_batch_matches_single_counts():
+    """Batched counts don't depend on batch composition or chunking"""
+    texts = ["The quick brown fox jumps over the lazy dog.", "", "internationalization", "x = 12345\n", "你好，世界"]
+    estimator = EstimatingTokenizer()
+    single = [estimator.count(text) for text in texts]
+
+    estimator.CHUNK_BYTES = 16
+    assert list(estimator.count_batch(texts)) == single
+    assert single[0] == 10
+    assert single[1] == 0
+
+
+def test_estimator_calibration_recovers_weights():
+    """Calibrating against reference counts refits the feature weights"""
+    texts = ["alpha beta", "gamma, delta!", "1234567", "line\nline\nline", "épée", "extraordinarily", "a1; b2"]
+    target = np.array([1.2, 0.1, 0.5, 0.8, 0.9, 0.3])
+    estimator = EstimatingTokenizer()
+    estimator.calibrate(texts, estimator.features(texts) @ target)
+    assert np.allclose(estimator.weights, target)
+
+
+def test_bpe_merges_by_rank(tmp_path):
+    """Pieces merge lowest rank first, as tiktoken does"""
+    ranks = {bytes([byte]): byte for byte in range(256)}
+    ranks.update({b"lo": 256, b"low": 257, b" l": 258, b"er": 259})
+    path = tmp_path / "tiny.tiktoken"
+    path.write_bytes(b"".join(base64.b64encode(token) + b" %d\n" % rank for token, rank in ranks.items()))
+
+    tokenizer = BPETokenizer.from_file(str(path))
+    # "low" | " lower" -> [low] + [ ][low][er]: "lo" outranks " l"
+    assert tokenizer.count("low lower") == 4
+
+
+def test_tokenizers_must_implement_count_batch():
+    """The base class can't be used without a counting strategy"""
+    with pytest.raises(TypeError):
+        Tokenizer()
+
+    class Fixed(Tokenizer):
+        def count_batch(self, texts):
+            return np.full(len(texts), 3, dtype=np.int64)
+
+    assert Fixed().count("anything") == 3
+
+
+@pytest.mark.asyncio
+async def test_context_preflight_rejects_without_calling_provider():
+    """Oversized requests fail fast and are flagged in cost estimates"""
+    orchestrator = AIOrchestrator()
+    oversized = AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="word " * 12000, max_tokens=100)
+    small = AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="hello", max_tokens=100)
+
+    response = await orchestrator.process_request(oversized)
+    assert not response.success
+    assert response.metadata["rejected"]
+    assert "context limit" in response.error
+
+    estimate = await orchestrator.estimate_cost([small, oversized, small])
+    assert estimate["exceeds_context"] == [1]
+    assert estimate["request_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_context_preflight_tokenizes_off_the_event_loop(monkeypatch):
+    """Prompts too long for the byte shortcut are counted on a worker thread"""
+    threads = []
+    count = token_counter.count
+
+    def recording_count(*args):
+        threads.append(threading.get_ident())
+        return count(*args)
+
+    monkeypatch.setattr(token_counter, "count", recording_count)
+    orchestrator = AIOrchestrator()
+    await orchestrator._check_context(AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="hello", max_tokens=100))
+    assert threads == []
+
+    long_prompt = AIRequest(provider=AIProvider.OPENAI, model="gpt-4", prompt="word " * 1700, max_tokens=100)
+    await orchestrator._check_context(long_prompt)
+    assert len(threads) == 1 and threads[0] != threading.get_ident()
+
+
+def test_only_exact_counts_reject_at_the_limit():
+    """Estimated or proxy counts get a margin before a request is refused"""
+    class Fixed(Tokenizer):
+        def count_batch(self, texts):
+            return np.full(len(texts), 8000, dtype=np.int64)
+
+    counter = TokenCounter()
+    counter._tokenizers["cl100k_base"] = Fixed()
+    prompt = "word " * 2000
+
+    # gpt-4: 8000 + 500 > 8192, counted with the model's own encoding
+    assert counter.is_exact("openai", "gpt-4")
+    with pytest.raises(ContextLengthExceededException):
+        counter.check_context("openai", "gpt-4", prompt, 500)
+
+    # gemini-pro counted with cl100k_base as a proxy: over its limit, but within the margin
+    assert not counter.is_exact("google", "gemini-pro")
+    counter.check_context("google", "gemini-pro", prompt * 10, 24800)
+    with pytest.raises(ContextLengthExceededException):
+        counter.check_context("google", "gemini-pro", prompt * 10, 40000)
+
+    counter._tokenizers["cl100k_base"] = counter.estimator
+    assert not counter.is_exact("openai", "gpt-4")
+    assert counter.count("openai", "gpt-4", "word " * 7900) + 500 > 8192
+    counter.check_context("openai", "gpt-4", "word " * 7900, 500)
@@ -0,0 +1,134 @@
+"""
+Test the persistent worker event loop
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import worker_loop as worker_loop_module
+from app.core.worker_loop import TaskStateProxy, WorkerLoop, run_async
+
+
+@pytest.fixture
+def loop():
+    worker = WorkerLoop()
+    yield worker
+    worker.stop()
+
+
+async def _current_loop():
+    return asyncio.get_running_loop()
+
+
+def test_start_runs_loop_thread_and_startup_hooks(loop):
+    """start() launches the loop once and runs startup hooks on it"""
+    started = []
+
+    async def hook():
+        started.append(threading.current_thread().name)
+
+    loop.on_startup(hook)
+    loop.start()
+    loop.start()
+
+    assert loop.is_running()
+    assert started == ["worker-event-loop"]
+
+
+def test_run_reuses_one_loop_across_calls(loop):
+    """Every call runs on the same loop, started on first use"""
+    first = loop.run(_current_loop())
+    second = loop.run(_current_loop())
+    assert first is second is loop.loop
+    assert first is not None and not first.is_closed()
+
+
+def test_run_from_many_threads(loop):
+    """Celery thread pools can submit coroutines concurrently"""
+    async def slow(value):
+        await asyncio.sleep(0.05)
+        return value, asyncio.get_running_loop()
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda value: loop.run(slow(value)), range(8)))
+
+    assert [value for value, _ in results] == list(range(8))
+    assert len({id(running) for _, running in results}) == 1
+    assert time.monotonic() - started < 0.4
+
+
+def test_timeout_cancels_the_coroutine(loop):
+    """A caller giving up doesn't leave the coroutine running on the loop"""
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        loop.run(hang(), timeout=0.05)
+    assert cancelled.wait(1)
+
+
+def test_run_from_the_loop_itself_is_rejected(loop):
+    """Blocking on the loop from its own thread would deadlock"""
+    async def nested():
+        return loop.run(_current_loop())
+
+    with pytest.raises(RuntimeError):
+        loop.run(nested())
+
+
+def test_stop_runs_shutdown_hooks_and_closes_loop():
+    """Shutdown hooks run in reverse order on the loop before it is closed"""
+    worker = WorkerLoop()
+    order = []
+
+    async def close_http():
+        order.append(("http", threading.current_thread().name))
+
+    async def close_redis():
+        order.append(("redis", threading.current_thread().name))
+
+    worker.on_shutdown(close_redis)
+    worker.on_shutdown(close_http)
+    running = worker.run(_current_loop())
+    worker.stop()
+
+    assert order == [("http", "worker-event-loop"), ("redis", "worker-event-loop")]
+    assert not worker.is_running() and running.is_closed()
+    worker.stop()
+
+    # A stopped loop starts afresh on the next call
+    assert worker.run(_current_loop()) is not running
+    worker.stop()
+
+
+def test_run_async_uses_global_worker_loop(monkeypatch):
+    """run_async submits to the process-wide loop"""
+    worker = WorkerLoop()
+    monkeypatch.setattr(worker_loop_module, "worker_loop", worker)
+    try:
+        assert run_async(_current_loop()) is worker.loop
+    finally:
+        worker.stop()
+
+
+def test_task_state_proxy_passes_captured_task_id():
+    """update_state from the loop thread targets the task captured on the Celery thread"""
+    calls = []
+    task = SimpleNamespace(
+        request=SimpleNamespace(id="task-1"),
+        update_state=lambda **kwargs: calls.append(kwargs)
+    )
+    TaskStateProxy(task).update_state(state="PROGRESS", meta={"current": 1})
+    assert calls == [{"task_id": "task-1", "state": "PROGRESS", "meta": {"current": 1}}]
@@ -0,0 +1,108 @@
+"""
+Test workflow DAG execution engine
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.core.exceptions import WorkflowExecutionException
+from app.services.workflow_engine import (
+    WorkflowGraph,
+    DAGExecutor,
+    ExecutionContext,
+    CompiledTemplate,
+    compile_workflow
+)
+
+
+async def _slow_step(step, data, context):
+    await asyncio.sleep(step.config.get("delay", 0))
+    data[step.config["key"]] = step.id
+    return data
+
+
+HANDLERS = {"slow": _slow_step}
+
+
+def _node(node_id, key, delay=0.0):
+    return {"id": node_id, "type": "slow", "config": {"key": key, "delay": delay}}
+
+
+def test_legacy_steps_run_in_order():
+    """Legacy steps become a linear chain"""
+    graph = WorkflowGraph.from_workflow_data({
+        "steps": [{"type": "slow", "config": {"key": "a"}}, {"type": "slow", "config": {"key": "b"}}]
+    })
+    assert graph.order == ["step_0", "step_1"]
+    assert graph.predecessors["step_1"] == ["step_0"]
+
+
+def test_cycle_is_rejected():
+    """Cyclic graphs cannot be executed"""
+    with pytest.raises(WorkflowExecutionException):
+        WorkflowGraph.from_workflow_data({
+            "nodes": [_node("a", "a"), _node("b", "b")],
+            "connections": [{"from": "a", "to": "b"}, {"source": "b", "target": "a"}]
+        })
+
+
+@pytest.mark.asyncio
+async def test_fan_out_runs_concurrently_and_joins():
+    """Independent branches overlap and their outputs merge at the join node"""
+    plan = compile_workflow({
+        "nodes": [
+            _node("start", "start"),
+            _node("a", "a", 0.1),
+            _node("b", "b", 0.1),
+            _node("c", "c", 0.1),
+            _node("join", "joined"),
+        ],
+        "connections": [
+            {"from": "start", "to": "a"},
+            {"from": "start", "to": "b"},
+            {"from": "start", "to": "c"},
+            {"from": "a", "to": "join"},
+            {"from": "b", "to": "join"},
+            {"from": "c", "to": "join"},
+        ]
+    }, HANDLERS)
+
+    started = time.monotonic()
+    result = await DAGExecutor(plan).run({"input": 1}, ExecutionContext(1, 1))
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.25
+    assert result == {"input": 1, "start": "start", "a": "a", "b": "b", "c": "c", "joined": "join"}
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_is_respected():
+    """A limit of one serialises independent branches"""
+    plan = compile_workflow({
+        "nodes": [_node("a", "a", 0.05), _node("b", "b", 0.05)],
+        "connections": [],
+        "settings": {"max_concurrency": 1}
+    }, HANDLERS)
+
+    started = time.monotonic()
+    await DAGExecutor(plan).run({}, ExecutionContext(1, 1))
+    assert time.monotonic() - started >= 0.1
+
+
+def test_compiled_template_matches_str_format():
+    """Pre-parsed templates render exactly like str.format"""
+    data = {"name": "Ada", "count": 3, "items": ["x", "y"]}
+    for source in ["Hello {name}!", "{{literal}} {count}", "{count:03d}", "{items[1]}", "plain"]:
+        assert CompiledTemplate(source).render(data) == source.format(**data)
+
+    with pytest.raises(KeyError):
+        CompiledTemplate("{missing}").render(data)
+
+
+def test_compiled_plan_is_immutable():
+    """Plans can be shared safely between executions"""
+    plan = compile_workflow({"steps": [{"type": "slow", "config": {"key": "a"}}]}, HANDLERS)
+    with pytest.raises(TypeError):
+        plan.steps["step_0"].config["key"] = "b"
@@ -0,0 +1,97 @@
+"""
+Test workflow task execution plan caching
+"""
+
+from datetime import timedelta
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.models import ai_agent  # noqa: F401 - registers the AIAgent mapper User relates to
+from app.models.user import User
+from app.models.workflow import Workflow
+from app.services.workflow_engine import PlanCache
+from app.tasks import workflow_tasks
+
+
+class _Task:
+    def update_state(self, **kwargs):
+        pass
+
+
+async def _no_event(*args, **kwargs):
+    pass
+
+
+@pytest_asyncio.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    monkeypatch.setattr(workflow_tasks, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(workflow_tasks, "plan_cache", PlanCache(16))
+    for name in ("emit_workflow_started", "emit_workflow_completed", "emit_workflow_failed", "emit_workflow_progress"):
+        monkeypatch.setattr(workflow_tasks, name, _no_event)
+
+    yield factory
+    await engine.dispose()
+
+
+async def _create_workflow(factory, workflow_data):
+    async with factory() as db:
+        user = User(email="owner@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        workflow = Workflow(name="Plan cache", workflow_data=workflow_data, owner_id=user.id)
+        db.add(workflow)
+        await db.commit()
+        return workflow.id, user.id
+
+
+@pytest.mark.asyncio
+async def test_second_run_reuses_compiled_plan(session_factory, monkeypatch):
+    """Saving execution metrics must not invalidate the cached plan"""
+    compiled = []
+    compile_workflow = workflow_tasks.compile_workflow
+
+    def counting_compile(workflow_data, handlers):
+        compiled.append(workflow_data)
+        return compile_workflow(workflow_data, handlers)
+
+    monkeypatch.setattr(workflow_tasks, "compile_workflow", counting_compile)
+    workflow_id, user_id = await _create_workflow(
+        session_factory, {"steps": [{"type": "data_transformation", "config": {"operation": "passthrough"}}]}
+    )
+
+    for _ in range(2):
+        result = await workflow_tasks._execute_workflow_async(workflow_id, user_id, {"text": "hi"}, _Task())
+        assert result["status"] == "completed"
+
+        # SQLite's CURRENT_TIMESTAMP has one second resolution; move updated_at as Postgres would
+        async with session_factory() as db:
+            workflow = await db.get(Workflow, workflow_id)
+            workflow.updated_at = workflow.updated_at + timedelta(seconds=1)
+            await db.commit()
+
+    assert len(compiled) == 1
+    assert workflow_tasks.plan_cache.get_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_edited_graph_is_recompiled(session_factory, monkeypatch):
+    """A changed workflow_data compiles a new plan even with the same version"""
+    workflow_id, user_id = await _create_workflow(session_factory, {"steps": []})
+    await workflow_tasks._execute_workflow_async(workflow_id, user_id, {}, _Task())
+
+    async with session_factory() as db:
+        workflow = await db.get(Workflow, workflow_id)
+        workflow.workflow_data = {"steps": [{"type": "data_transformation", "config": {}}]}
+        await db.commit()
+
+    await workflow_tasks._execute_workflow_async(workflow_id, user_id, {}, _Task())
+    assert workflow_tasks.plan_cache.get_stats()["hits"] == 0
+    assert workflow_tasks.plan_cache.get_stats()["size"] == 2